@@ -0,0 +1,506 @@
+import atexit
+import logging
+import multiprocessing
+import os
+import subprocess
+import sys
+import threading
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from config import ALIGNMENT_WORKER_MAX_JOBS, ALIGNMENT_WORKER_MAX_MEMORY_MB, ALIGNMENT_PARALLEL_PROCESSES, ALIGNMENT_WINDOW_SECONDS
+from utils import find_ffmpeg_path
+
+logger = logging.getLogger("PodcastGenerator.Demo")
+
+ASR_MODEL = "small"
+DEVICE = "cpu"
+COMPUTE_TYPE = "int8"  # Optimized for CPU
+
+# Parallel mode: audio is decoded as 16 kHz mono, like whisperx.load_audio, and split at the
+# quietest point near each window boundary found with a 20 ms frame energy VAD
+SAMPLE_RATE = 16000
+VAD_FRAME_SECONDS = 0.02
+VAD_SMOOTHING_SECONDS = 0.3
+WINDOW_OVERLAP_SECONDS = 1.0
+SPLIT_SEARCH_FRACTION = 0.1  # split points are looked for within ±10% of the window length
+SPEECH_RANGE_DB = 35.0  # frames quieter than the loudest frame by more than this are silence
+LANGUAGE_DETECTION_SECONDS = 30.0  # Whisper detects the language from the first 30 seconds it hears
+
+
+def _import_whisperx():
+    """Imports WhisperX with the settings that keep torch stable on CPU (notably on macOS Intel)."""
+    # Must run BEFORE whisperx imports torchaudio: the torchaudio C++ extensions crash
+    # on some systems (notably macOS with Conda)
+    import torio._extension.utils as torio_utils
+    torio_utils._TORIO_EXTENSION_AVAILABLE = False
+
+    import torch
+    torch.set_num_threads(1)
+    os.environ['OMP_NUM_THREADS'] = '1'
+    os.environ['MKL_NUM_THREADS'] = '1'
+
+    import whisperx
+    return whisperx
+
+
+def _current_memory_mb() -> float:
+    """Resident memory of this process in MB (peak resident memory where the current value is not available)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, IndexError, AttributeError):
+        pass
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Reported in bytes on macOS, in KB on Linux
+        return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+    except (ImportError, OSError):
+        return 0.0
+
+
+def _to_plain_result(result: Dict[str, Any]) -> Dict[str, Any]:
+    """Keeps the parts of a WhisperX result the demo builder reads, as plain Python types (no numpy)."""
+    segments = []
+    for segment in result.get("segments", []):
+        words = [
+            {"word": str(word["word"]), "start": float(word["start"]), "end": float(word["end"])}
+            for word in segment.get("words", [])
+            if word.get("word") and word.get("start") is not None and word.get("end") is not None
+        ]
+        segments.append({"text": str(segment.get("text", "")), "words": words})
+    return {"language": result.get("language"), "segments": segments}
+
+
+class _ModelCache:
+    """The ASR model and the per-language alignment models, loaded on first use and kept in memory."""
+
+    def __init__(self):
+        self.whisperx = None
+        self.asr_model = None
+        self.align_models: Dict[str, Any] = {}
+
+    def _load_whisperx(self):
+        if self.whisperx is None:
+            try:
+                self.whisperx = _import_whisperx()
+            except ImportError as e:
+                raise RuntimeError(f"Une bibliothèque requise pour la démo est manquante : {e}.\n\nInstallez 'whisperx' et ses dépendances (torch, etc.).")
+        return self.whisperx
+
+    def _load_models(self, status_callback: Callable[[str], None]):
+        self._load_whisperx()
+        if self.asr_model is None:
+            status_callback("Chargement du modèle WhisperX...")
+            self.asr_model = self.whisperx.load_model(ASR_MODEL, DEVICE, compute_type=COMPUTE_TYPE)
+            status_callback(f"Modèle WhisperX chargé (device: {DEVICE}, type: {COMPUTE_TYPE})")
+        return self.whisperx
+
+    def align(self, audio_filepath: str, language: str, status_callback: Callable[[str], None]) -> Dict[str, Any]:
+        whisperx = self._load_models(status_callback)
+        status_callback("Chargement de l'audio...")
+        audio = whisperx.load_audio(audio_filepath)
+        return self.align_audio(audio, language, status_callback)
+
+    def align_audio(self, audio, language: str, status_callback: Callable[[str], None], allow_empty: bool = False) -> Dict[str, Any]:
+        """Transcribes and aligns 16 kHz mono samples. With allow_empty, audio without speech gives no segments instead of an error."""
+        whisperx = self._load_models(status_callback)
+
+        status_callback("Transcription avec WhisperX (ceci peut prendre du temps sur CPU)...")
+        transcribe_params = {"batch_size": 4, "verbose": True, "task": "transcribe"}  # Batch size réduit pour CPU
+        if language != "auto":
+            transcribe_params["language"] = language
+            status_callback(f"Transcription forcée en {language}")
+        else:
+            status_callback("Transcription avec détection automatique de langue")
+        result = self.asr_model.transcribe(audio, **transcribe_params)
+
+        detected_language = result.get('language', 'inconnu')
+        status_callback(f"Transcription terminée. Langue détectée: {detected_language}")
+        if not result.get('segments'):
+            if allow_empty:
+                return {"language": result.get("language"), "segments": []}
+            raise RuntimeError("Aucun segment trouvé dans la transcription. Vérifiez votre fichier audio.")
+
+        alignment_language = language if language != "auto" else detected_language
+        model_a, metadata = self._get_align_model(alignment_language, status_callback)
+
+        status_callback("Alignement des mots...")
+        aligned_result = whisperx.align(result["segments"], model_a, metadata, audio, DEVICE, return_char_alignments=False)
+        result.update(aligned_result)
+        return _to_plain_result(result)
+
+    def detect_language(self, audio, status_callback: Callable[[str], None]) -> str:
+        """Detects the spoken language from the first 30 seconds of 16 kHz mono samples."""
+        self._load_models(status_callback)
+        language = self.asr_model.detect_language(audio)
+        status_callback(f"Langue détectée: {language}")
+        return language
+
+    def force_align(self, audio_filepath: str, segments: List[Dict[str, Any]], language: str,
+                    status_callback: Callable[[str], None]) -> Dict[str, Any]:
+        """
+        Aligns known text ({"text", "start", "end"} segments) on the audio, without transcription:
+        the ASR model is never loaded and the language is not detected.
+        """
+        whisperx = self._load_whisperx()
+        status_callback("Chargement de l'audio...")
+        audio = whisperx.load_audio(audio_filepath)
+        model_a, metadata = self._get_align_model(language, status_callback)
+
+        status_callback(f"Alignement forcé du script ({len(segments)} répliques, sans transcription)...")
+        aligned_result = whisperx.align(segments, model_a, metadata, audio, DEVICE, return_char_alignments=False)
+        return _to_plain_result(dict(aligned_result, language=language))
+
+    def _get_align_model(self, language: str, status_callback: Callable[[str], None]):
+        if language in self.align_models:
+            return self.align_models[language]
+        status_callback("Chargement du modèle d'alignement...")
+        try:
+            self.align_models[language] = self.whisperx.load_align_model(language_code=language, device=DEVICE)
+            status_callback(f"Modèle d'alignement chargé pour: {language}")
+            return self.align_models[language]
+        except Exception as e:
+            status_callback(f"Erreur avec {language}: {e}")
+            status_callback("Tentative avec anglais par défaut...")
+        if "en" not in self.align_models:
+            self.align_models["en"] = self.whisperx.load_align_model(language_code="en", device=DEVICE)
+        return self.align_models["en"]
+
+
+def _worker_main(conn, max_jobs: int, max_memory_mb: float) -> None:
+    """
+    Entry point of the worker process. Receives (audio_filepath, language, segments) jobs, where
+    segments are script segments to force-align or None to transcribe first, and answers with
+    ("status", message) messages followed by ("result", result, recycle) or ("error", message, recycle).
+    The worker exits after a job once it has run max_jobs jobs or uses more than max_memory_mb.
+    """
+    models = _ModelCache()
+    jobs_done = 0
+    while True:
+        try:
+            job = conn.recv()
+        except (EOFError, OSError):
+            break
+        if job is None:
+            break
+        audio_filepath, language, segments = job
+        status_callback = lambda message: conn.send(("status", message))
+        try:
+            if segments is None:
+                result = models.align(audio_filepath, language, status_callback)
+            else:
+                result = models.force_align(audio_filepath, segments, language, status_callback)
+            reply = ("result", result)
+        except Exception as e:
+            reply = ("error", str(e))
+        jobs_done += 1
+        recycle = jobs_done >= max_jobs or (max_memory_mb > 0 and _current_memory_mb() > max_memory_mb)
+        conn.send(reply + (recycle,))
+        if recycle:
+            break
+    conn.close()
+
+
+class AlignmentWorker:
+    """
+    Client of a resident WhisperX process that keeps the ASR and alignment models loaded
+    between demos.
+
+    The process is started on the first job, so torch and WhisperX never load in the web or
+    GUI process. Jobs run one at a time. The process is replaced after max_jobs jobs or once
+    it uses more than max_memory_mb, so model memory growth stays bounded.
+    """
+
+    def __init__(self, max_jobs: int = ALIGNMENT_WORKER_MAX_JOBS, max_memory_mb: float = ALIGNMENT_WORKER_MAX_MEMORY_MB):
+        self.max_jobs = max(1, max_jobs)
+        self.max_memory_mb = max_memory_mb
+        self._process: Optional[multiprocessing.Process] = None
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _ensure_started(self) -> None:
+        if self._process is not None and self._process.is_alive():
+            return
+        self._stop_process()
+        # spawn: forking a process that runs Tk or web server threads is unsafe
+        context = multiprocessing.get_context("spawn")
+        parent_conn, child_conn = context.Pipe()
+        self._process = context.Process(target=_worker_main, args=(child_conn, self.max_jobs, self.max_memory_mb), name="alignment-worker", daemon=True)
+        self._process.start()
+        child_conn.close()
+        self._conn = parent_conn
+        logger.info(f"Started alignment worker (pid {self._process.pid}).")
+
+    def _stop_process(self) -> None:
+        if self._conn is not None:
+            try:
+                self._conn.send(None)
+            except (OSError, ValueError):
+                pass
+            self._conn.close()
+            self._conn = None
+        if self._process is not None:
+            self._process.join(timeout=10)
+            if self._process.is_alive():
+                self._process.kill()
+                self._process.join()
+            self._process = None
+
+    def align(self, audio_filepath: str, language: str = "auto", status_callback=print) -> Dict[str, Any]:
+        """
+        Transcribes and aligns an audio file in the worker process. Returns a WhisperX-style result
+        ({"language", "segments": [{"text", "words": [{"word", "start", "end"}]}]}).
+        Raises RuntimeError if the job failed or the worker died.
+        """
+        return self._run((os.path.abspath(audio_filepath), language, None), status_callback)
+
+    def force_align(self, audio_filepath: str, segments: List[Dict[str, Any]], language: str, status_callback=print) -> Dict[str, Any]:
+        """
+        Aligns known text segments ({"text", "start", "end"}, times in seconds) on an audio file in
+        the worker process, skipping transcription. language must be a language code, not "auto".
+        Returns the same structure as align().
+        """
+        return self._run((os.path.abspath(audio_filepath), language, segments), status_callback)
+
+    def _run(self, job: Tuple[str, str, Optional[List[Dict[str, Any]]]], status_callback) -> Dict[str, Any]:
+        with self._lock:
+            self._ensure_started()
+            self._conn.send(job)
+            while True:
+                try:
+                    # Poll so that a crashed worker is noticed instead of waiting forever
+                    if not self._conn.poll(1.0):
+                        if not self._process.is_alive():
+                            raise EOFError
+                        continue
+                    message = self._conn.recv()
+                except (EOFError, OSError):
+                    self._stop_process()
+                    raise RuntimeError("The alignment worker stopped unexpectedly.")
+                if message[0] == "status":
+                    status_callback(message[1])
+                    continue
+                kind, payload, recycle = message
+                if recycle:
+                    logger.info("Recycling the alignment worker.")
+                    self._stop_process()
+                if kind == "error":
+                    raise RuntimeError(payload)
+                return payload
+
+    def shutdown(self) -> None:
+        with self._lock:
+            self._stop_process()
+
+
+_worker: Optional[AlignmentWorker] = None
+_worker_lock = threading.Lock()
+
+
+def get_alignment_worker() -> AlignmentWorker:
+    """Returns the alignment worker shared by this process (the web app or the GUI)."""
+    global _worker
+    with _worker_lock:
+        if _worker is None:
+            _worker = AlignmentWorker()
+            atexit.register(_worker.shutdown)
+        return _worker
+
+
+def _ffmpeg_pcm(audio_filepath: str, start: Optional[float] = None, duration: Optional[float] = None) -> subprocess.Popen:
+    """Starts FFmpeg decoding (part of) an audio file to 16 kHz mono s16le on its stdout."""
+    ffmpeg_path = find_ffmpeg_path()
+    if not ffmpeg_path:
+        raise FileNotFoundError("FFmpeg executable not found.")
+    command = [ffmpeg_path, "-nostdin", "-v", "error"]
+    if start is not None:
+        command += ["-ss", f"{start:.3f}"]
+    if duration is not None:
+        command += ["-t", f"{duration:.3f}"]
+    command += ["-i", audio_filepath, "-f", "s16le", "-ac", "1", "-ar", str(SAMPLE_RATE), "-"]
+    creation_flags = 0 if sys.platform != "win32" else subprocess.CREATE_NO_WINDOW
+    return subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, creationflags=creation_flags)
+
+
+def frame_energies(audio_filepath: str) -> np.ndarray:
+    """
+    Energy (dB) of every VAD_FRAME_SECONDS frame of an audio file. The audio is decoded as a
+    stream, a few seconds at a time, so the whole waveform is never held in memory.
+    """
+    frame_bytes = int(SAMPLE_RATE * VAD_FRAME_SECONDS) * 2
+    process = _ffmpeg_pcm(audio_filepath)
+    energies = []
+    pending = b""
+    while True:
+        data = process.stdout.read(frame_bytes * 500)
+        if not data:
+            break
+        data = pending + data
+        usable = len(data) - len(data) % frame_bytes
+        samples = np.frombuffer(data[:usable], dtype="<i2").astype(np.float32).reshape(-1, frame_bytes // 2)
+        energies.append(10 * np.log10(np.mean(samples ** 2, axis=1) + 1.0))
+        pending = data[usable:]
+    stderr = process.stderr.read()
+    if process.wait() != 0:
+        raise RuntimeError(f"FFmpeg could not decode {os.path.basename(audio_filepath)}: {stderr.decode('utf-8', 'ignore').strip()}")
+    return np.concatenate(energies) if energies else np.zeros(0, dtype=np.float32)
+
+
+def plan_windows(energies: np.ndarray, window_seconds: float, overlap_seconds: float = WINDOW_OVERLAP_SECONDS,
+                 frame_seconds: float = VAD_FRAME_SECONDS) -> List[Tuple[float, float, float, float]]:
+    """
+    Splits audio into windows of about window_seconds, cutting at the quietest point (smoothed
+    frame energy) within SPLIT_SEARCH_FRACTION of each target boundary. Returns
+    (start, end, keep_from, keep_to) per window: the window covers start..end, i.e. its share
+    keep_from..keep_to plus overlap_seconds on both sides, and owns the words starting in its share.
+    """
+    total = len(energies) * frame_seconds
+    if total <= window_seconds * 1.5:
+        return [(0.0, total, 0.0, float("inf"))]
+
+    smoothing = max(1, int(VAD_SMOOTHING_SECONDS / frame_seconds))
+    smoothed = np.convolve(energies, np.ones(smoothing) / smoothing, mode="same")
+    search = max(1, int(window_seconds * SPLIT_SEARCH_FRACTION / frame_seconds))
+    splits = [0]
+    while (len(energies) - splits[-1]) * frame_seconds > window_seconds * 1.5:
+        target = splits[-1] + int(window_seconds / frame_seconds)
+        low, high = target - search, min(len(energies), target + search)
+        splits.append(low + int(np.argmin(smoothed[low:high])))
+
+    bounds = [split * frame_seconds for split in splits] + [total]
+    windows = []
+    for index in range(len(bounds) - 1):
+        keep_from = bounds[index] if index else 0.0
+        keep_to = bounds[index + 1] if index + 2 < len(bounds) else float("inf")
+        windows.append((max(0.0, bounds[index] - overlap_seconds), min(total, bounds[index + 1] + overlap_seconds), keep_from, keep_to))
+    return windows
+
+
+def estimate_turn_spans(energies: np.ndarray, weights: List[float], frame_seconds: float = VAD_FRAME_SECONDS) -> List[Tuple[float, float]]:
+    """
+    Rough (start, end) spans in seconds of consecutive speaker turns, from frame energies and each
+    turn's weight (its length in characters). The speech between the leading and trailing silence
+    is shared in proportion to the weights, and each boundary is moved to the quietest point
+    within a quarter of the shorter neighbouring turn.
+    """
+    if not weights:
+        return []
+    total = len(energies) * frame_seconds
+    speech = np.flatnonzero(energies > np.max(energies, initial=0.0) - SPEECH_RANGE_DB) if len(energies) else np.zeros(0, dtype=np.int64)
+    if not speech.size:
+        return [(0.0, total)] * len(weights)
+    first, last = int(speech[0]), int(speech[-1]) + 1
+
+    smoothing = max(1, int(VAD_SMOOTHING_SECONDS / frame_seconds))
+    smoothed = np.convolve(energies, np.ones(smoothing) / smoothing, mode="same")
+    cumulative = np.concatenate([[0.0], np.cumsum(np.maximum(weights, 1e-9))])
+    targets = first + (last - first) * cumulative / cumulative[-1]
+
+    bounds = [first]
+    for k in range(1, len(weights)):
+        search = max(1, int(min(targets[k] - targets[k - 1], targets[k + 1] - targets[k]) / 4))
+        low = max(bounds[-1], int(targets[k]) - search)
+        high = max(low + 1, min(last, int(targets[k]) + search))
+        bounds.append(low + int(np.argmin(smoothed[low:high])) if high <= len(smoothed) else low)
+    bounds.append(last)
+    return [(round(bounds[k] * frame_seconds, 3), round(bounds[k + 1] * frame_seconds, 3)) for k in range(len(weights))]
+
+
+def merge_window_results(windows: List[Tuple[float, float, float, float]], results: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Joins the results of the windows of plan_windows() into one WhisperX-style result: word
+    times are shifted by the window start, and a word seen by two overlapping windows is kept
+    only by the window whose share it starts in.
+    """
+    segments = []
+    for (start, _, keep_from, keep_to), result in zip(windows, results):
+        for segment in result.get("segments", []):
+            words = [
+                {"word": word["word"], "start": round(word["start"] + start, 3), "end": round(word["end"] + start, 3)}
+                for word in segment.get("words", [])
+                if keep_from <= word["start"] + start < keep_to
+            ]
+            if words:
+                segments.append({"text": " ".join(word["word"] for word in words), "words": words})
+    languages = Counter(result.get("language") for result in results if result.get("language"))
+    return {"language": languages.most_common(1)[0][0] if languages else None, "segments": segments}
+
+
+_window_models: Optional[_ModelCache] = None
+
+
+def _load_window(audio_filepath: str, start: float, end: float):
+    """Runs in a pool process: decodes one window to 16 kHz mono samples and returns them with the process's models."""
+    global _window_models
+    if _window_models is None:
+        _window_models = _ModelCache()
+    process = _ffmpeg_pcm(audio_filepath, start, end - start)
+    data, stderr = process.communicate()
+    if process.returncode != 0:
+        raise RuntimeError(f"FFmpeg could not decode {os.path.basename(audio_filepath)}: {stderr.decode('utf-8', 'ignore').strip()}")
+    return np.frombuffer(data, dtype="<i2").astype(np.float32) / 32768.0, _window_models
+
+
+def _detect_window_language(audio_filepath: str, start: float, end: float) -> str:
+    """Runs in a pool process: detects the language spoken in one window."""
+    audio, models = _load_window(audio_filepath, start, end)
+    return models.detect_language(audio, lambda message: None)
+
+
+def _align_window(audio_filepath: str, start: float, end: float, language: str) -> Dict[str, Any]:
+    """Runs in a pool process: decodes one window and transcribes and aligns it (times relative to the window)."""
+    audio, models = _load_window(audio_filepath, start, end)
+    return models.align_audio(audio, language, lambda message: None, allow_empty=True)
+
+
+def pick_language_window(energies: np.ndarray, windows: List[Tuple[float, float, float, float]],
+                         frame_seconds: float = VAD_FRAME_SECONDS) -> int:
+    """
+    Index of the window to detect the language on: the first one whose first 30 seconds (what
+    Whisper listens to) are mostly speech, else the one with the most speech in them.
+    """
+    speech = energies > np.max(energies, initial=0.0) - SPEECH_RANGE_DB
+    fractions = []
+    for start, end, _, _ in windows:
+        first, last = int(start / frame_seconds), int(min(end, start + LANGUAGE_DETECTION_SECONDS) / frame_seconds)
+        fractions.append(float(np.mean(speech[first:last])) if last > first else 0.0)
+    return next((index for index, fraction in enumerate(fractions) if fraction >= 0.5), int(np.argmax(fractions)))
+
+
+def align_parallel(audio_filepath: str, language: str = "auto", status_callback=print,
+                   processes: int = ALIGNMENT_PARALLEL_PROCESSES, window_seconds: float = ALIGNMENT_WINDOW_SECONDS) -> Dict[str, Any]:
+    """
+    Transcribes and aligns a long audio file in windows cut at silences, in a pool of processes
+    (one per CPU core by default), and merges the word timings. Each process decodes only its
+    window. With language "auto", the language is detected once, on a window that is mostly
+    speech, and every window is transcribed in it. Audio too short to split is aligned by the
+    resident worker instead.
+    """
+    status_callback("Analyse de l'énergie audio (découpage aux silences)...")
+    energies = frame_energies(audio_filepath)
+    windows = plan_windows(energies, window_seconds)
+    if len(windows) == 1:
+        return get_alignment_worker().align(audio_filepath, language=language, status_callback=status_callback)
+
+    processes = min(processes or os.cpu_count() or 1, len(windows))
+    status_callback(f"Transcription parallèle: {len(windows)} fenêtres sur {processes} processus (chaque processus charge ses modèles)")
+    results: List[Optional[Dict[str, Any]]] = [None] * len(windows)
+    audio_filepath = os.path.abspath(audio_filepath)
+    # spawn: forking a process that runs Tk or web server threads is unsafe
+    with ProcessPoolExecutor(max_workers=processes, mp_context=multiprocessing.get_context("spawn")) as pool:
+        if language == "auto":
+            # Windows detecting their own language could disagree on short or noisy stretches
+            start, end, _, _ = windows[pick_language_window(energies, windows)]
+            language = pool.submit(_detect_window_language, audio_filepath, start, end).result()
+            status_callback(f"Langue détectée: {language} (utilisée pour toutes les fenêtres)")
+        futures = {pool.submit(_align_window, audio_filepath, start, end, language): index
+                   for index, (start, end, _, _) in enumerate(windows)}
+        for done, future in enumerate(as_completed(futures), 1):
+            results[futures[future]] = future.result()
+            status_callback(f"Fenêtre {done}/{len(windows)} transcrite et alignée")
+    return merge_window_results(windows, results)
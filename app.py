@@ -1,9 +1,16 @@
-from flask import Flask, render_template, request, jsonify, send_from_directory
-from generate_podcast import generate, DEFAULT_INSTRUCTION, DEFAULT_SCRIPT, setup_logging, validate_speakers, update_elevenlabs_quota
+from flask import Flask, render_template, request, jsonify, send_from_directory, Response, stream_with_context
+from audio_cache import get_default_audio_cache
+from generate_podcast import generate, DEFAULT_INSTRUCTION, DEFAULT_SCRIPT, setup_logging, validate_speakers, update_elevenlabs_quota, fetch_elevenlabs_character_quota, count_elevenlabs_characters
 from utils import sanitize_text, get_asset_path, get_app_data_dir
-from config import AVAILABLE_VOICES, DEFAULT_APP_SETTINGS, DEMO_AVAILABLE
-from create_demo import create_html_demo_whisperx
+from config import AVAILABLE_VOICES, DEFAULT_APP_SETTINGS, DEMO_AVAILABLE, ELEVENLABS_QUOTA_CHECK, ELEVENLABS_TIMESTAMPS, INCREMENTAL_REGENERATION, STATUS_CACHE_TTL, VOICES_CACHE_TTL, METADATA_MAX_STALE
+from create_demo import create_html_demo, has_word_timings
 from transcript_analyzer import generate_analysis_docx, get_analysis_prompt_path
+from job_queue import JobStore, WorkerPool, JobCancelled
+from clients import ELEVENLABS_API_URL, get_http_session
+from quota_budget import CharacterBudget, QuotaExceededError
+from ttl_cache import TTLCache
+from rate_limiter import GenerationStopped
+from settings_store import SettingsStore
 import os
 import tempfile
 import json
@@ -13,7 +20,9 @@ import shutil
 from elevenlabs.core import ApiError
 import re
 import uuid
+import hashlib
 import threading
+import time
 import json
 from flask import jsonify
 
@@ -21,9 +30,6 @@ from flask import jsonify
 app = Flask(__name__)
 logger = setup_logging()
 
-# --- In-Memory Task Manager ---
-tasks = {}
-
 # --- Version & License ---
 try:
     from _version import __version__
@@ -39,26 +45,38 @@ except FileNotFoundError:
 
 
 # --- Configuration ---
-TEMP_DIR = tempfile.mkdtemp(prefix="podcast_generator_")
+# PODCAST_OUTPUT_DIR must point to a shared directory when running several workers
+TEMP_DIR = os.getenv("PODCAST_OUTPUT_DIR") or tempfile.mkdtemp(prefix="podcast_generator_")
+os.makedirs(TEMP_DIR, exist_ok=True)
 DEMOS_DIR = os.path.join(app.instance_path, 'demos')
 os.makedirs(DEMOS_DIR, exist_ok=True)
 app.config['TEMP_DIR'] = TEMP_DIR
 app.config['DEMOS_DIR'] = DEMOS_DIR
 
+# --- Job Queue ---
+# Jobs live in SQLite so that every gunicorn worker sees the same state and
+# queued jobs survive a restart. Each process runs a fixed number of workers.
+JOBS_DB_PATH = os.getenv("JOBS_DB_PATH") or os.path.join(app.instance_path, 'jobs.sqlite3')
+GENERATION_WORKERS = int(os.getenv("GENERATION_WORKERS", "2"))
+# Demos are CPU-heavy (WhisperX alignment): cap how many run at once so they cannot starve synthesis
+DEMO_WORKERS = int(os.getenv("DEMO_WORKERS", "1"))
+job_store = JobStore(JOBS_DB_PATH)
+# Finished jobs, and the per-turn artifacts of their tasks, are kept this long
+JOB_RETENTION_SECONDS = 7 * 24 * 3600
+PRUNE_INTERVAL_SECONDS = 3600
+
 
 def get_settings_path():
     return os.path.join(get_app_data_dir(), "settings.json")
 
+# Parsed once and re-read only when settings.json changes on disk
+settings_store = SettingsStore(get_settings_path, DEFAULT_APP_SETTINGS)
+
 def load_settings():
-    try:
-        with open(get_settings_path(), 'r') as f:
-            return json.load(f)
-    except (FileNotFoundError, json.JSONDecodeError):
-        return DEFAULT_APP_SETTINGS
+    return settings_store.load()
 
 def save_settings(settings):
-    with open(get_settings_path(), 'w') as f:
-        json.dump(settings, f, indent=4)
+    settings_store.save(settings)
 
 def extract_filename_from_script(script_text, extension, max_length=50):
     """
@@ -138,7 +156,9 @@ def index():
     return render_template('index.html', 
                            default_instruction=DEFAULT_INSTRUCTION, 
                            default_script=DEFAULT_SCRIPT, 
-                           demo_available=DEMO_AVAILABLE)
+                           # Demos need WhisperX, or the word timings saved by timestamped synthesis
+                           demo_available=DEMO_AVAILABLE or ELEVENLABS_TIMESTAMPS,
+                           whisperx_available=DEMO_AVAILABLE)
 
 @app.route('/assets/<path:filename>')
 def get_asset(filename):
@@ -159,6 +179,16 @@ def version():
     except Exception:
         return "unknown"
 
+# Upstream lookups shared by every browser tab; ?refresh=1 bypasses the cache
+status_cache = TTLCache(ttl=STATUS_CACHE_TTL, max_stale=METADATA_MAX_STALE)
+voices_cache = TTLCache(ttl=VOICES_CACHE_TTL, max_stale=METADATA_MAX_STALE)
+
+def api_key_fingerprint(api_key):
+    return hashlib.sha256(api_key.encode()).hexdigest()[:16]
+
+def wants_refresh():
+    return request.args.get('refresh', '').lower() in ('1', 'true', 'yes')
+
 @app.route('/api/status', methods=['GET'])
 def get_status():
     """Returns the current TTS provider and quota info."""
@@ -170,7 +200,12 @@ def get_status():
     if provider == "elevenlabs":
         api_key = os.environ.get("ELEVENLABS_API_KEY")
         if api_key:
-            quota_text = update_elevenlabs_quota(api_key)
+            quota_text = status_cache.get(
+                ('elevenlabs_quota', api_key_fingerprint(api_key)),
+                lambda: update_elevenlabs_quota(api_key),
+                refresh=wants_refresh(),
+                cacheable=lambda text: text not in (None, "Network error")
+            )
         else:
             quota_text = "ElevenLabs API Key not set."
         # ElevenLabs uses Eleven v3 for text-to-dialogue
@@ -202,9 +237,7 @@ def update_settings():
         return jsonify({'error': 'Invalid settings format.'}), 400
     new_settings.pop('has_elevenlabs_key', None)
     new_settings.pop('has_gemini_key', None)
-    current_settings = load_settings()
-    current_settings.update(new_settings)
-    save_settings(current_settings)
+    settings_store.update(new_settings)
     return jsonify({'status': 'success'})
 
 @app.route('/api/voices', methods=['GET'])
@@ -213,11 +246,13 @@ def get_voices():
     elevenlabs_voices = []
     api_key = os.environ.get("ELEVENLABS_API_KEY")
     if api_key:
+        def fetch_voices():
+            response = get_http_session("elevenlabs", api_key).get(f"{ELEVENLABS_API_URL}/voices", timeout=10)
+            response.raise_for_status()
+            return response.json().get('voices', [])
+
         try:
-            headers = {"xi-api-key": api_key}
-            response = requests.get("https://api.elevenlabs.io/v1/voices", headers=headers, timeout=10)
-            if response.ok:
-                elevenlabs_voices = response.json().get('voices', [])
+            elevenlabs_voices = voices_cache.get(('elevenlabs_voices', api_key_fingerprint(api_key)), fetch_voices, refresh=wants_refresh())
         except requests.RequestException as e:
             logger.error(f"Could not fetch ElevenLabs voices: {e}")
     return jsonify({'gemini': gemini_voices, 'elevenlabs': elevenlabs_voices})
@@ -277,26 +312,72 @@ def get_elevenlabs_voice_classifications():
         logger.error(f"Error loading ElevenLabs voice classifications: {e}")
         return jsonify({'error': 'Could not load classifications'}), 500
 
-def run_generation_task(task_id, script_text, app_settings, output_filepath, api_key):
-    """The target function for the generation thread."""
-    stop_event = tasks[task_id]['stop_event']
+def get_artifacts_dir(task_id):
+    """Per-turn audio kept by a generation task for incremental re-generation."""
+    return os.path.join(app.config['TEMP_DIR'], 'artifacts', task_id)
+
+last_prune = 0.0
+
+def prune_jobs(force=False):
+    """
+    Deletes finished jobs older than JOB_RETENTION_SECONDS, then the artifacts directory of
+    every task that is no longer in the job store. Runs at most once per PRUNE_INTERVAL_SECONDS.
+    """
+    global last_prune
+    now = time.time()
+    if not force and now - last_prune < PRUNE_INTERVAL_SECONDS:
+        return
+    last_prune = now
+    removed = job_store.prune(JOB_RETENTION_SECONDS)
+    artifacts_root = os.path.join(app.config['TEMP_DIR'], 'artifacts')
+    try:
+        task_ids = os.listdir(artifacts_root)
+    except OSError:
+        task_ids = []
+    swept = 0
+    for task_id in task_ids:
+        if job_store.get(task_id) is None:
+            shutil.rmtree(os.path.join(artifacts_root, task_id), ignore_errors=True)
+            swept += 1
+    if removed or swept:
+        logger.info(f"Pruned {removed} old job(s) and {swept} artifacts folder(s).")
+
+prune_jobs(force=True)
+
+def make_status_callback(job_id):
+    """Returns a status_callback that logs a job's progress messages and records them in the job store."""
+    def status_callback(message):
+        logger.info(message)
+        # Shared through the job store so any worker can push it to the browser
+        if message and str(message).strip():
+            job_store.add_event(job_id, str(message).strip())
+    return status_callback
+
+def run_generation_task(job, stop_event):
+    """Job handler for podcast generation, run by the generation worker pool."""
+    payload = job['payload']
+    output_filepath = payload['output_filepath']
+    previous_task_id = payload.get('previous_task_id')
+    provider = payload['app_settings'].get("tts_provider", "elevenlabs")
+    api_key = os.environ.get("ELEVENLABS_API_KEY" if provider == "elevenlabs" else "GEMINI_API_KEY")
+    status_callback = make_status_callback(job['id'])
+
     try:
         generated_file = generate(
-            script_text=script_text,
-            app_settings=app_settings,
+            script_text=payload['script'],
+            app_settings=payload['app_settings'],
             output_filepath=output_filepath,
             api_key=api_key,
-            status_callback=logger.info,
-            stop_event=stop_event
+            status_callback=status_callback,
+            stop_event=stop_event,
+            artifacts_dir=get_artifacts_dir(job['id']) if INCREMENTAL_REGENERATION else None,
+            previous_artifacts_dir=get_artifacts_dir(previous_task_id) if INCREMENTAL_REGENERATION and previous_task_id else None
         )
-        if generated_file:
-            tasks[task_id]['status'] = 'completed'
-            tasks[task_id]['result'] = {'download_url': f'/temp/{os.path.basename(generated_file)}', 'filename': os.path.basename(generated_file)}
+        return {'download_url': f'/temp/{os.path.basename(generated_file)}', 'filename': os.path.basename(generated_file),
+                'word_timings': has_word_timings(generated_file)}
     except Exception as e:
         # If the exception is due to the stop event, set a specific status
-        if "stopped by user" in str(e):
-            tasks[task_id]['status'] = 'cancelled'
-            tasks[task_id]['error'] = 'Generation cancelled by user.'
+        if isinstance(e, GenerationStopped):
             # Clean up the partially created file
             if os.path.exists(output_filepath):
                 try:
@@ -304,16 +385,22 @@ def run_generation_task(task_id, script_text, app_settings, output_filepath, api
                     logger.info(f"Removed partial file for stopped task: {output_filepath}")
                 except OSError as err:
                     logger.error(f"Error removing partial file for stopped task: {err}")
-        else:
-            logger.error(f"Error during generation for task {task_id}: {e}", exc_info=True)
-            tasks[task_id]['status'] = 'failed'
-            tasks[task_id]['error'] = str(e)
+            raise JobCancelled('Generation cancelled by user.')
+        logger.error(f"Error during generation for task {job['id']}: {e}", exc_info=True)
+        raise
+
+generation_pool = WorkerPool(job_store, 'generate', run_generation_task, size=GENERATION_WORKERS)
+generation_pool.start()
+
+# Remaining ElevenLabs characters, after deducting the jobs already admitted
+elevenlabs_budget = CharacterBudget(lambda: fetch_elevenlabs_character_quota(os.environ.get("ELEVENLABS_API_KEY")), job_store)
 
 @app.route('/generate', methods=['POST'])
 def handle_generate():
     script_text = request.form.get('script', '')
     if not script_text:
         return jsonify({'error': 'Script text is required.'}), 400
+    prune_jobs()
 
     sanitized_script = sanitize_text(script_text)
     app_settings = load_settings()
@@ -334,55 +421,193 @@ def handle_generate():
     from utils import sanitize_app_settings_for_backend
     app_settings_clean = sanitize_app_settings_for_backend(app_settings)
 
-    task_id = str(uuid.uuid4())
     output_filename = extract_filename_from_script(sanitized_script, 'mp3')
     output_filepath = os.path.join(app.config['TEMP_DIR'], output_filename)
-    
-    stop_event = threading.Event()
-    thread = threading.Thread(target=run_generation_task, args=(task_id, sanitized_script, app_settings_clean, output_filepath, api_key))
-    
-    tasks[task_id] = {'thread': thread, 'stop_event': stop_event, 'status': 'running'}
-    thread.start()
-    
+
+    payload = {
+        'script': sanitized_script,
+        'app_settings': app_settings_clean,
+        'output_filepath': output_filepath
+    }
+    # Re-generation of a corrected script: reuse the unchanged turns of the previous task
+    previous_task_id = request.form.get('previous_task_id')
+    if INCREMENTAL_REGENERATION and previous_task_id and job_store.get(previous_task_id):
+        payload['previous_task_id'] = previous_task_id
+    admit = None
+    if provider == "elevenlabs" and ELEVENLABS_QUOTA_CHECK:
+        # Reject the job before any API call if the remaining quota cannot cover it. The check
+        # runs in the job store's write transaction, so concurrent requests on any web worker
+        # cannot both pass it and over-commit the quota. Only the turns that will be sent are
+        # counted: unchanged turns of an incremental re-generation, or cached turns, are free.
+        # A cache entry evicted before the job runs is billed without having been reserved.
+        payload['characters'] = count_elevenlabs_characters(
+            sanitized_script, app_settings_clean.get('speaker_voices_elevenlabs', {}),
+            incremental=INCREMENTAL_REGENERATION,
+            previous_artifacts_dir=get_artifacts_dir(payload['previous_task_id']) if 'previous_task_id' in payload else None,
+            cache=get_default_audio_cache())
+        admit = elevenlabs_budget.admission(payload['characters'])
+
+    try:
+        # The API key is read again by the worker; it is never written to the job store
+        task_id = generation_pool.submit(payload, admit=admit)
+    except QuotaExceededError as e:
+        logger.warning(f"Generation rejected: {e}")
+        return jsonify({'error': str(e), 'characters_needed': e.needed, 'characters_available': e.available}), 402
+
     return jsonify({'task_id': task_id})
 
-@app.route('/api/generation_status/<task_id>', methods=['GET'])
-def get_generation_status(task_id):
-    task = tasks.get(task_id)
-    if not task:
-        return jsonify({'error': 'Task not found'}), 404
-    
+def task_status_response(task):
     response = {'status': task['status']}
     if task['status'] == 'completed':
         response['result'] = task['result']
     elif task['status'] in ['failed', 'cancelled']:
-        response['error'] = task.get('error', 'An unknown error occurred.')
-        
-    return jsonify(response)
+        response['error'] = task.get('error') or 'An unknown error occurred.'
+    return response
+
+@app.route('/api/generation_status/<task_id>', methods=['GET'])
+def get_generation_status(task_id):
+    task = job_store.get(task_id)
+    if not task:
+        return jsonify({'error': 'Task not found'}), 404
+    return jsonify(task_status_response(task))
+
+EVENTS_POLL_INTERVAL = 0.5
+EVENTS_KEEPALIVE_INTERVAL = 15
+
+def format_sse(event, data, event_id=None):
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event}")
+    lines.append(f"data: {json.dumps(data)}")
+    return "\n".join(lines) + "\n\n"
+
+def stream_task_events(task_id, last_seq=0):
+    """
+    Yields Server-Sent Events for a task: a 'status' event whenever the job status changes,
+    one 'progress' event per status message, then a final 'done' event carrying the same
+    payload as /api/generation_status (a failure if the task disappears from the job store).
+    """
+    last_sent = time.time()
+    last_status = None
+    while True:
+        # Read the status first so no message recorded before completion is missed
+        task = job_store.get(task_id)
+        if task is None:
+            # Pruned while streaming: end the stream the way the browser ends a failed task
+            yield format_sse('done', {'status': 'failed', 'error': 'Task not found'}, event_id=last_seq)
+            break
+        if task['status'] != last_status and task['status'] in ('queued', 'running', 'stopping'):
+            last_status = task['status']
+            yield format_sse('status', {'status': last_status})
+        for event in job_store.get_events(task_id, last_seq):
+            last_seq = event['seq']
+            last_sent = time.time()
+            yield format_sse('progress', {'message': event['message']}, event_id=last_seq)
+        if task['status'] not in ('queued', 'running', 'stopping'):
+            yield format_sse('done', task_status_response(task), event_id=last_seq)
+            break
+        if time.time() - last_sent >= EVENTS_KEEPALIVE_INTERVAL:
+            last_sent = time.time()
+            yield ": keep-alive\n\n"
+        time.sleep(EVENTS_POLL_INTERVAL)
+
+@app.route('/api/events/<task_id>')
+def task_events(task_id):
+    """Pushes a task's progress messages and final result as Server-Sent Events."""
+    if not job_store.get(task_id):
+        return jsonify({'error': 'Task not found'}), 404
+    # Resume after the last message the browser received when it reconnects
+    try:
+        last_seq = int(request.headers.get('Last-Event-ID', 0))
+    except ValueError:
+        last_seq = 0
+    return Response(
+        stream_with_context(stream_task_events(task_id, last_seq)),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+STREAM_POLL_INTERVAL = 0.25
+STREAM_READ_SIZE = 64 * 1024
+
+def stream_task_audio(task_id):
+    """
+    Yields the task's encoded audio while it is being written.
+    Providers write the output file progressively (ElevenLabs chunk by chunk, Gemini
+    through the streaming FFmpeg encoder), so the file is followed until the task ends.
+    If the file is removed, replaced or truncated (an aborted encode, a retried request, a
+    requeued job), the stream ends: appending the new file would splice two MP3s, so the
+    client switches to the final download instead. Bytes rewritten in place are not checked:
+    FFmpeg's MP3 muxer rewrites the Xing/Info header of the first frame when it finishes.
+    """
+    task = job_store.get(task_id)
+    path = task['payload']['output_filepath']
+    position = 0
+    identity = None
+    while True:
+        # Read the status first so the data written before completion is always sent
+        task = job_store.get(task_id)
+        if task is None:
+            logger.info(f"Task {task_id} was pruned during streaming; ending the stream.")
+            break
+        running = task['status'] in ('queued', 'running', 'stopping')
+        f = None
+        try:
+            # Ignore a file left over from an earlier task with the same name
+            if os.path.getmtime(path) >= task['created_at'] - 1:
+                f = open(path, 'rb')
+        except OSError:
+            pass
+        if f is None:
+            if identity is not None:
+                logger.info(f"Output of task {task_id} was removed during streaming; ending the stream.")
+                break
+        else:
+            with f:
+                stat = os.fstat(f.fileno())
+                if identity is not None and ((stat.st_dev, stat.st_ino) != identity or stat.st_size < position):
+                    logger.info(f"Output of task {task_id} was rewritten during streaming; ending the stream.")
+                    break
+                identity = (stat.st_dev, stat.st_ino)
+                f.seek(position)
+                while True:
+                    data = f.read(STREAM_READ_SIZE)
+                    if not data:
+                        break
+                    position += len(data)
+                    yield data
+        if not running:
+            break
+        time.sleep(STREAM_POLL_INTERVAL)
+
+@app.route('/api/stream/<task_id>')
+def stream_generation(task_id):
+    """Streams the MP3 of a running generation with chunked transfer encoding."""
+    if not job_store.get(task_id):
+        return jsonify({'error': 'Task not found'}), 404
+    return Response(
+        stream_with_context(stream_task_audio(task_id)),
+        mimetype='audio/mpeg',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
 
 @app.route('/api/stop_generation/<task_id>', methods=['POST'])
 def stop_generation(task_id):
-    task = tasks.get(task_id)
-    if not task:
+    previous_status = job_store.request_stop(task_id)
+    if previous_status is None:
         return jsonify({'error': 'Task not found'}), 404
     
-    if task['status'] == 'running':
-        task['stop_event'].set()
-        task['status'] = 'stopping'
+    if previous_status in ('queued', 'running'):
         return jsonify({'status': 'Stop signal sent.'})
     
     return jsonify({'status': 'Task was not running.'})
 
 @app.route('/api/generate_demo', methods=['POST'])
 def handle_generate_demo():
-    # If DEMO_AVAILABLE is not set to "1", return an error
-    if not DEMO_AVAILABLE:
-        return jsonify({'error': 'Demo generation is not available.'}), 403
-
     data = request.json
     script_text, audio_filename = data.get('script'), data.get('audio_filename')
     title, subtitle = data.get('title', 'Podcast Demo'), data.get('subtitle', '')
-    show_credits = data.get('show_credits', True)
 
     if not script_text or not audio_filename:
         return jsonify({'error': 'Script and audio filename are required.'}), 400
@@ -394,36 +619,55 @@ def handle_generate_demo():
         return jsonify({'error': 'Invalid audio filename.'}), 400
     if not os.path.exists(normalized_audio_filepath):
         return jsonify({'error': 'Audio file not found on server.'}), 404
+    # Without WhisperX (DEMO_AVAILABLE not "1"), only audio with saved word timings can be turned into a demo
+    if not DEMO_AVAILABLE and not has_word_timings(normalized_audio_filepath):
+        return jsonify({'error': 'Demo generation needs WhisperX, or word timings saved during synthesis (ELEVENLABS_TIMESTAMPS=1).'}), 403
+
+    # Transcription and alignment take minutes: run them in the demo worker pool
+    task_id = demo_pool.submit({
+        'script': script_text,
+        'audio_filepath': normalized_audio_filepath,
+        'title': title,
+        'subtitle': subtitle,
+        'demo_id': os.urandom(8).hex()
+    })
+    return jsonify({'task_id': task_id})
 
-    demo_id = os.urandom(8).hex()
-    demo_output_dir = os.path.join(app.config['DEMOS_DIR'], demo_id)
-    
+def run_demo_task(job, stop_event):
+    """Job handler for HTML demo generation, run by the demo worker pool."""
+    if stop_event.is_set():
+        raise JobCancelled('Demo generation cancelled by user.')
+    payload = job['payload']
+    demo_id = payload['demo_id']
+    status_callback = make_status_callback(job['id'])
+    temp_script_file = None
     try:
         with tempfile.NamedTemporaryFile(mode='w', delete=False, suffix=".txt", encoding='utf-8') as f:
-            f.write(script_text)
+            f.write(payload['script'])
             temp_script_file = f.name
 
-        create_html_demo_whisperx(
+        # Uses the word timings saved during synthesis when there are some, WhisperX otherwise
+        html_filepath = create_html_demo(
             script_filepath=temp_script_file,
-            audio_filepath=normalized_audio_filepath,
-            title=title,
-            subtitle=subtitle,
-            output_dir=demo_output_dir,
-            status_callback=logger.info,
-            show_credits=show_credits
+            audio_filepath=payload['audio_filepath'],
+            title=payload['title'],
+            subtitle=payload['subtitle'],
+            output_dir=os.path.join(app.config['DEMOS_DIR'], demo_id),
+            status_callback=status_callback
         )
-        
-        return jsonify({
-            'view_url': f'/demos/{demo_id}/index.html',
+        if not html_filepath:
+            raise Exception('Demo generation failed. See the progress messages for details.')
+        return {
+            'view_url': f'/demos/{demo_id}/{os.path.basename(html_filepath)}',
             'download_url': f'/api/download_demo/{demo_id}'
-        })
-    except Exception as e:
-        logger.error(f"Error during demo generation: {e}", exc_info=True)
-        return jsonify({'error': 'An unexpected error occurred during demo generation.'}), 500
+        }
     finally:
-        if 'temp_script_file' in locals() and os.path.exists(temp_script_file):
+        if temp_script_file and os.path.exists(temp_script_file):
             os.remove(temp_script_file)
 
+demo_pool = WorkerPool(job_store, 'demo', run_demo_task, size=DEMO_WORKERS)
+demo_pool.start()
+
 @app.route('/demos/<demo_id>/<path:filename>')
 def serve_demo_file(demo_id, filename):
     demo_dir = os.path.join(app.config['DEMOS_DIR'], demo_id)
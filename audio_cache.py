@@ -0,0 +1,193 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+from collections import OrderedDict
+from typing import Optional, List, Tuple
+
+from config import AUDIO_CACHE_ENABLED, AUDIO_CACHE_MAX_MB
+from utils import get_app_data_dir
+
+logger = logging.getLogger("PodcastGenerator")
+
+ANNOTATION_PATTERN = re.compile(r"\[[^\]]+\]|\([^)]+\)")
+
+
+def extract_annotations(text: str) -> List[str]:
+    """Returns the delivery annotations of a turn, e.g. ['[playful]']."""
+    return ANNOTATION_PATTERN.findall(text)
+
+
+class AudioCache:
+    """
+    Content-addressed on-disk cache for per-turn audio.
+
+    Each entry is stored as a single file named after the SHA-256 of its key
+    parameters, with its mime type (if any) in a small file next to it. Entry sizes
+    and recency are tracked in memory, rebuilt from the directory once at startup, so
+    a write only touches the disk again when the size budget is exceeded. The file
+    modification time is still refreshed on every hit, so the order survives restarts.
+    """
+
+    def __init__(self, cache_dir: str, max_bytes: int):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self._entries: "OrderedDict[str, int]" = OrderedDict()  # key -> size, least recently used first
+        self._total = 0
+        self._load_index()
+
+    @staticmethod
+    def make_key(provider: str, model: str, voice_id: str, text: str, annotations: Optional[List[str]] = None) -> str:
+        """Builds a stable cache key from everything that influences the synthesized audio."""
+        payload = json.dumps([provider, model, voice_id, text, annotations or []], ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _entry_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.bin")
+
+    def _mime_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.mime")
+
+    def _load_index(self) -> None:
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(".bin"):
+                continue
+            try:
+                st = os.stat(os.path.join(self.cache_dir, name))
+            except OSError:
+                continue
+            entries.append((st.st_mtime, name[:-len(".bin")], st.st_size))
+        for _, key, size in sorted(entries):
+            self._entries[key] = size
+            self._total += size
+
+    def contains(self, key: str) -> bool:
+        """Tells whether an entry is stored, without reading it or counting a hit or miss."""
+        return os.path.exists(self._entry_path(key))
+
+    def get(self, key: str) -> Optional[bytes]:
+        entry = self.get_entry(key)
+        return entry[0] if entry else None
+
+    def get_entry(self, key: str) -> Optional[Tuple[bytes, Optional[str]]]:
+        """Returns (data, mime type) of an entry, or None. The mime type is None if none was stored."""
+        return self.find_entry([key])
+
+    def find_entry(self, keys: List[str], require_mime: bool = False) -> Optional[Tuple[bytes, Optional[str]]]:
+        """
+        Returns (data, mime type) of the first of keys that is stored (with a mime type, if
+        require_mime), or None. One lookup counts as a single hit or miss, however many keys
+        are tried (e.g. one key per fallback model).
+        """
+        with self._lock:
+            for key in keys:
+                entry = self._read(key)
+                if entry is not None and (entry[1] or not require_mime):
+                    self.hits += 1
+                    return entry
+            self.misses += 1
+            return None
+
+    def _read(self, key: str) -> Optional[Tuple[bytes, Optional[str]]]:
+        """Reads an entry and marks it as recently used. The caller holds the lock."""
+        path = self._entry_path(key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            os.utime(path, None)  # Mark as recently used
+        except OSError:
+            if key in self._entries:
+                # Evicted by another process sharing the directory
+                self._total -= self._entries.pop(key)
+            return None
+        try:
+            with open(self._mime_path(key), "r", encoding="utf-8") as f:
+                mime_type = f.read().strip() or None
+        except OSError:
+            mime_type = None
+        self._total += len(data) - self._entries.pop(key, 0)
+        self._entries[key] = len(data)
+        return data, mime_type
+
+    def put(self, key: str, data: bytes, mime_type: Optional[str] = None) -> None:
+        if not data or len(data) > self.max_bytes:
+            return
+        path = self._entry_path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with self._lock:
+            try:
+                if mime_type:
+                    with open(tmp_path, "w", encoding="utf-8") as f:
+                        f.write(mime_type)
+                    os.replace(tmp_path, self._mime_path(key))
+                elif os.path.exists(self._mime_path(key)):
+                    os.remove(self._mime_path(key))
+                with open(tmp_path, "wb") as f:
+                    f.write(data)
+                os.replace(tmp_path, path)
+            except OSError as e:
+                logger.warning(f"Could not write audio cache entry {key}: {e}")
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                return
+            self._total += len(data) - self._entries.pop(key, 0)
+            self._entries[key] = len(data)
+            if self._total > self.max_bytes:
+                self._evict()
+
+    def _remove_files(self, key: str) -> None:
+        for path in (self._entry_path(key), self._mime_path(key)):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def _evict(self) -> None:
+        """Removes least recently used entries until the cache fits in its budget."""
+        while self._total > self.max_bytes and self._entries:
+            key, size = self._entries.popitem(last=False)
+            self._remove_files(key)
+            self._total -= size
+
+    def clear(self) -> None:
+        with self._lock:
+            for name in os.listdir(self.cache_dir):
+                if name.endswith((".bin", ".mime")):
+                    try:
+                        os.remove(os.path.join(self.cache_dir, name))
+                    except OSError:
+                        pass
+            self._entries.clear()
+            self._total = 0
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries), "size_bytes": self._total, "max_bytes": self.max_bytes}
+
+
+_default_cache: Optional[AudioCache] = None
+_default_cache_lock = threading.Lock()
+
+
+def get_default_audio_cache() -> Optional[AudioCache]:
+    """
+    Returns the process-wide audio cache, or None if caching is disabled.
+    Uses AUDIO_CACHE_DIR if set, otherwise a folder in the application's data directory.
+    """
+    global _default_cache
+    if not AUDIO_CACHE_ENABLED:
+        return None
+    with _default_cache_lock:
+        if _default_cache is None:
+            cache_dir = os.getenv("AUDIO_CACHE_DIR") or os.path.join(get_app_data_dir(), "audio_cache")
+            _default_cache = AudioCache(cache_dir, AUDIO_CACHE_MAX_MB * 1024 * 1024)
+        return _default_cache
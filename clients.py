@@ -0,0 +1,68 @@
+import os
+import threading
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+from elevenlabs.client import ElevenLabs
+from google import genai
+
+ELEVENLABS_API_URL = "https://api.elevenlabs.io/v1"
+# Connections kept alive per host by each shared HTTP session
+HTTP_POOL_SIZE = 10
+
+_lock = threading.Lock()
+_clients: Dict[Tuple[str, str, str], Any] = {}
+_owner_pid = os.getpid()
+
+
+def _get_or_create(kind: str, provider: str, api_key: Optional[str], factory: Callable[[], Any]) -> Any:
+    """Returns the client registered for (kind, provider, api_key), creating it on first use."""
+    global _owner_pid
+    key = (kind, provider, api_key or "")
+    with _lock:
+        # Connections must not be shared with a forked child (e.g. gunicorn workers)
+        if _owner_pid != os.getpid():
+            _clients.clear()
+            _owner_pid = os.getpid()
+        client = _clients.get(key)
+        if client is None:
+            client = factory()
+            _clients[key] = client
+        return client
+
+
+def get_http_session(provider: str, api_key: Optional[str] = None) -> requests.Session:
+    """
+    Returns the process-wide keep-alive HTTP session for a provider's REST API.
+    For ElevenLabs, the API key is sent with every request of the session.
+    """
+    def create_session():
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        if provider == "elevenlabs" and api_key:
+            session.headers["xi-api-key"] = api_key
+        return session
+
+    return _get_or_create("http", provider, api_key, create_session)
+
+
+def get_gemini_client(api_key: str) -> genai.Client:
+    """Returns the shared google-genai client for this API key."""
+    return _get_or_create("sdk", "gemini", api_key, lambda: genai.Client(api_key=api_key))
+
+
+def get_elevenlabs_client(api_key: str) -> ElevenLabs:
+    """Returns the shared ElevenLabs SDK client for this API key."""
+    return _get_or_create("sdk", "elevenlabs", api_key, lambda: ElevenLabs(api_key=api_key))
+
+
+def clear_clients() -> None:
+    """Closes and forgets every registered client (e.g. after an API key was changed)."""
+    with _lock:
+        for client in _clients.values():
+            if isinstance(client, requests.Session):
+                client.close()
+        _clients.clear()
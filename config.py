@@ -60,3 +60,66 @@ DEFAULT_APP_SETTINGS = {
 
 # Environment variable to control the demo button visibility
 DEMO_AVAILABLE = os.getenv("DEMO_AVAILABLE") == "1"
+
+# Per-turn audio cache (reuses unchanged turns between generations)
+AUDIO_CACHE_ENABLED = os.getenv("AUDIO_CACHE") == "1"
+AUDIO_CACHE_MAX_MB = int(os.getenv("AUDIO_CACHE_MAX_MB", "500"))
+
+# Windowed/concurrent synthesis of long scripts
+# ELEVENLABS_WINDOW_CHARS: split ElevenLabs dialogues into windows of this many characters (0 = single request)
+ELEVENLABS_WINDOW_CHARS = int(os.getenv("ELEVENLABS_WINDOW_CHARS", "0"))
+# GEMINI_CHUNK_CHARS: split Gemini scripts into chunks of this many characters (0 = single request)
+GEMINI_CHUNK_CHARS = int(os.getenv("GEMINI_CHUNK_CHARS", "0"))
+TTS_MAX_CONCURRENCY = int(os.getenv("TTS_MAX_CONCURRENCY", "4"))
+TTS_WINDOW_RETRIES = int(os.getenv("TTS_WINDOW_RETRIES", "2"))
+
+# Pipe Gemini audio into FFmpeg as it arrives instead of buffering the whole stream
+GEMINI_STREAMING_ENCODE = os.getenv("GEMINI_STREAMING_ENCODE", "1") == "1"
+
+# Number of episodes generated at once by `generate_podcast.py --batch`
+BATCH_MAX_WORKERS = int(os.getenv("BATCH_MAX_WORKERS", "2"))
+
+# Shared per-provider rate limits for synthesis requests (the rate shrinks when the provider returns 429)
+GEMINI_REQUESTS_PER_MINUTE = float(os.getenv("GEMINI_REQUESTS_PER_MINUTE", "10"))
+ELEVENLABS_REQUESTS_PER_MINUTE = float(os.getenv("ELEVENLABS_REQUESTS_PER_MINUTE", "120"))
+# Retries of a throttled request, and the longest Retry-After worth waiting for (seconds)
+RATE_LIMIT_RETRIES = int(os.getenv("RATE_LIMIT_RETRIES", "5"))
+RATE_LIMIT_MAX_WAIT = float(os.getenv("RATE_LIMIT_MAX_WAIT", "120"))
+
+# Reject ElevenLabs jobs that would exceed the remaining character quota (the quota is re-read every QUOTA_BUDGET_TTL seconds)
+ELEVENLABS_QUOTA_CHECK = os.getenv("ELEVENLABS_QUOTA_CHECK", "1") == "1"
+QUOTA_BUDGET_TTL = float(os.getenv("QUOTA_BUDGET_TTL", "300"))
+
+# Caching of upstream metadata lookups for /api/status and /api/voices (seconds)
+# Values older than the TTL are still served for up to METADATA_MAX_STALE while they are refreshed in the background
+STATUS_CACHE_TTL = float(os.getenv("STATUS_CACHE_TTL", "60"))
+VOICES_CACHE_TTL = float(os.getenv("VOICES_CACHE_TTL", "3600"))
+METADATA_MAX_STALE = float(os.getenv("METADATA_MAX_STALE", "86400"))
+
+# Web app: synthesize turns separately and keep them, so a corrected script only re-synthesizes changed turns
+INCREMENTAL_REGENERATION = os.getenv("INCREMENTAL_REGENERATION") == "1"
+
+# Write a <output>.timeline.json sidecar with the start/end sample offsets of every speaker turn
+TIMELINE_SIDECAR = os.getenv("TIMELINE_SIDECAR") == "1"
+
+# ElevenLabs: request character-level timestamps and store the word timings in the timeline sidecar,
+# so HTML demos can be built without WhisperX (bypasses the audio cache)
+ELEVENLABS_TIMESTAMPS = os.getenv("ELEVENLABS_TIMESTAMPS") == "1"
+
+# Resident WhisperX process used for HTML demos: it is replaced after this many demos or above this memory use (MB, 0 = no limit)
+ALIGNMENT_WORKER_MAX_JOBS = int(os.getenv("ALIGNMENT_WORKER_MAX_JOBS", "20"))
+ALIGNMENT_WORKER_MAX_MEMORY_MB = float(os.getenv("ALIGNMENT_WORKER_MAX_MEMORY_MB", "4096"))
+
+# Transcribe long demo audio in windows cut at silences, in parallel processes (0 = one per CPU core).
+# Each process loads its own models, so lower the process count on machines with little memory.
+ALIGNMENT_PARALLEL = os.getenv("ALIGNMENT_PARALLEL") == "1"
+ALIGNMENT_PARALLEL_PROCESSES = int(os.getenv("ALIGNMENT_PARALLEL_PROCESSES", "0"))
+ALIGNMENT_WINDOW_SECONDS = float(os.getenv("ALIGNMENT_WINDOW_SECONDS", "300"))
+
+# Align the script itself on the demo audio, skipping transcription and language detection
+# (needs an explicit demo language; with "auto" the demo falls back to transcription)
+DEMO_FORCED_ALIGNMENT = os.getenv("DEMO_FORCED_ALIGNMENT") == "1"
+
+# HTML demo output: "inline" (one <span> per word in the page) or "compact" (transcript and
+# Float32 word timings in sidecar files, rendered a few paragraphs at a time while scrolling)
+DEMO_FORMAT = os.getenv("DEMO_FORMAT", "inline")
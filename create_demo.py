@@ -1,4 +1,5 @@
 import argparse
+import base64
 import os
 import sys
 import json
@@ -12,121 +13,125 @@ import types
 from difflib import SequenceMatcher
 import unicodedata
 
-from utils import get_asset_path
-
+import numpy as np
 
-def interpolate_missing_words(segments):
-    """Interpole les timings des mots manqués entre des mots alignés."""
-    interpolated_count = 0
-    failed_count = 0
-
-    for i, segment in enumerate(segments):
-        if segment['type'] == 'word' and not segment.get('timing'):
-            prev_word, next_word = find_adjacent_timed_words(segments, i)
-
-            if prev_word and next_word:
-                words_between = next_word['index'] - prev_word['index'] - 1
-                word_position = i - prev_word['index']
-
-                prev_end = prev_word['timing']['end']
-                next_start = next_word['timing']['start']
-                total_duration = next_start - prev_end
-
-                word_duration = total_duration / (words_between + 1)
-                word_start = prev_end + (word_position * word_duration)
-                word_end = word_start + word_duration
-
-                segment['timing'] = {
-                    'start': round(word_start, 3),
-                    'end': round(word_end, 3)
-                }
-
-                interpolated_count += 1
-                prev_timing = f"{prev_word['timing']['start']:.3f}-{prev_word['timing']['end']:.3f}s"
-                next_timing = f"{next_word['timing']['start']:.3f}-{next_word['timing']['end']:.3f}s"
-                new_timing = f"{segment['timing']['start']:.3f}-{segment['timing']['end']:.3f}s"
-                print(f"INTERPOLÉ: '{segment['text']}' -> {new_timing} (entre {prev_timing} et {next_timing})")
-            else:
-                failed_count += 1
-                prev_text = f"{prev_word['timing']['start']:.3f}s" if prev_word else "NONE"
-                next_text = f"{next_word['timing']['start']:.3f}s" if next_word else "NONE"
-                print(f"ÉCHEC interpolation: '{segment['text']}' (prev: {prev_text}, next: {next_text})")
+from utils import get_asset_path
+from timeline import load_timeline
+from alignment_worker import align_parallel, estimate_turn_spans, frame_energies, get_alignment_worker
+from word_alignment import align_words
+from config import ALIGNMENT_PARALLEL, DEMO_FORCED_ALIGNMENT, DEMO_FORMAT
 
-    print(f"Interpolation: {interpolated_count} réussies, {failed_count} échecs")
-    return segments
+DEMO_FORMATS = ("inline", "compact")
+COMPACT_TRANSCRIPT_SUFFIX = ".transcript.js"
+COMPACT_TIMINGS_SUFFIX = ".timings.js"
 
 
-def find_adjacent_timed_words(segments, current_index):
-    """Trouve le mot précédent et suivant avec timing."""
-    prev_word = None
-    next_word = None
+def _word_timing_arrays(segments):
+    """Indices des segments de mots, avec leurs débuts et fins (NaN pour les mots sans timing)."""
+    indices = [i for i, segment in enumerate(segments) if segment['type'] == 'word']
+    starts = np.full(len(indices), np.nan)
+    ends = np.full(len(indices), np.nan)
+    for k, i in enumerate(indices):
+        timing = segments[i].get('timing')
+        if timing:
+            starts[k] = timing['start']
+            ends[k] = timing['end']
+    return np.array(indices, dtype=np.int64), starts, ends
 
-    for i in range(current_index - 1, -1, -1):
-        if segments[i]['type'] == 'word' and segments[i].get('timing'):
-            prev_word = {'index': i, 'timing': segments[i]['timing']}
-            break
 
-    for i in range(current_index + 1, len(segments)):
-        if segments[i]['type'] == 'word' and segments[i].get('timing'):
-            next_word = {'index': i, 'timing': segments[i]['timing']}
-            break
+def interpolate_missing_words(segments):
+    """
+    Interpole les timings des mots manqués entre des mots alignés.
 
-    return prev_word, next_word
+    Chaque mot sans timing reçoit une part de l'intervalle restant entre le mot précédent (aligné
+    ou déjà interpolé) et le prochain mot aligné, selon sa position parmi les segments. Le calcul
+    se fait sur des tableaux NumPy : l'intervalle restant après chaque mot est le produit cumulé,
+    par série de mots manqués, de facteurs (q - i - 1) / (q - i_précédent).
+    """
+    indices, starts, ends = _word_timing_arrays(segments)
+    timed = ~np.isnan(starts)
+    positions = np.arange(len(indices))
+
+    # Remplissage avant/arrière : dernier mot aligné avant chaque mot, premier après
+    prev_timed = np.maximum.accumulate(np.where(timed, positions, -1)) if len(indices) else positions
+    next_timed = np.minimum.accumulate(np.where(timed, positions, len(indices))[::-1])[::-1] if len(indices) else positions
+    missing = ~timed
+    interpolable = np.flatnonzero(missing & (prev_timed >= 0) & (next_timed < len(indices)))
+    failed_count = int(missing.sum()) - len(interpolable)
+
+    if len(interpolable):
+        k = interpolable
+        q = indices[next_timed[k]]
+        i_prev = indices[k - 1]  # mot aligné ou mot interpolé juste avant
+        factors = (q - indices[k] - 1) / (q - i_prev)
+
+        # Produit cumulé par série (via les logarithmes pour éviter un sous-dépassement) ;
+        # un facteur nul ne peut être que le dernier mot d'une série
+        log_factors = np.log(np.where(factors > 0, factors, 1.0))
+        cumulated = np.cumsum(log_factors)
+        first_in_run = prev_timed[k] == k - 1
+        run_start = np.maximum.accumulate(np.where(first_in_run, np.arange(len(k)), 0))
+        offset = (cumulated - log_factors)[run_start]
+
+        remaining_before = (starts[next_timed[k]] - ends[prev_timed[k]]) * np.exp(cumulated - log_factors - offset)
+        remaining_after = np.where(factors > 0, remaining_before * factors, 0.0)
+        word_end = starts[next_timed[k]] - remaining_after
+        word_start = word_end - remaining_before / (q - i_prev)
+
+        for position, start, end in zip(k.tolist(), word_start.tolist(), word_end.tolist()):
+            segments[indices[position]]['timing'] = {'start': round(start, 3), 'end': round(end, 3)}
+
+    print(f"Interpolation: {len(interpolable)} réussies, {failed_count} échecs")
+    return segments
 
 
 def fix_word_timings(segments):
     """Corrige les timings incohérents avec une approche plus conservative."""
     word_segments = [s for s in segments if s['type'] == 'word' and s.get('timing')]
-    corrections_made = 0
-
     print(f"Correction des timings pour {len(word_segments)} mots...")
+    if not word_segments:
+        print("Corrections appliquées: 0 ajustements")
+        return segments
+
+    original_starts = np.array([s['timing']['start'] for s in word_segments], dtype=float)
+    original_ends = np.array([s['timing']['end'] for s in word_segments], dtype=float)
 
     # Phase 1: Corriger les timings inversés
-    for segment in word_segments:
-        timing = segment['timing']
-        if timing['start'] > timing['end']:
-            timing['start'], timing['end'] = timing['end'], timing['start']
-            corrections_made += 1
-            print(f"TIMING INVERSÉ: '{segment['text']}' -> {timing['start']:.3f}-{timing['end']:.3f}s")
+    inverted = original_starts > original_ends
+    starts = np.where(inverted, original_ends, original_starts)
+    ends = np.where(inverted, original_starts, original_ends)
 
     # Phase 2: Traiter les chevauchements (plus conservative)
-    for i in range(len(word_segments) - 1):
-        current_timing = word_segments[i]['timing']
-        next_timing = word_segments[i + 1]['timing']
-
-        if current_timing['end'] > next_timing['start']:
-            # Calculer le point de séparation optimal
-            gap = 0.01  # Gap minimal entre les mots
-            mid_point = (current_timing['end'] + next_timing['start']) / 2
-
-            # Ajuster seulement si l'ajustement est raisonnable
-            new_end = mid_point - gap
-            new_start = mid_point + gap
-
-            # Vérifier que les durées restent raisonnables
-            current_duration = new_end - current_timing['start']
-            next_duration = next_timing['end'] - new_start
-
-            if current_duration > 0.05 and next_duration > 0.05:
-                original_end = current_timing['end']
-                current_timing['end'] = new_end
-                next_timing['start'] = new_start
-                corrections_made += 2
-                print(f"CHEVAUCHEMENT: '{word_segments[i]['text']}' {original_end:.3f}s -> {new_end:.3f}s")
+    gap = 0.01  # Gap minimal entre les mots
+    overlapping = ends[:-1] > starts[1:]
+    mid_points = (ends[:-1] + starts[1:]) / 2
+    new_ends = mid_points - gap
+    new_starts = mid_points + gap
+    # Ajuster seulement si les durées restent raisonnables
+    split = overlapping & (new_ends - starts[:-1] > 0.05) & (ends[1:] - new_starts > 0.05)
+    # Deux chevauchements consécutifs : le début du mot du milieu dépend du premier ajustement,
+    # ces cas (rares) sont réévalués dans l'ordre
+    for i in np.flatnonzero(overlapping[1:] & overlapping[:-1]) + 1:
+        current_start = new_starts[i - 1] if split[i - 1] else starts[i]
+        split[i] = new_ends[i] - current_start > 0.05 and ends[i + 1] - new_starts[i] > 0.05
+    ends[:-1] = np.where(split, new_ends, ends[:-1])
+    starts[1:] = np.where(split, new_starts, starts[1:])
 
     # Phase 3: Corriger les durées trop courtes (plus conservatif)
     min_duration = 0.08  # Durée minimale plus réaliste
-    for segment in word_segments:
-        timing = segment['timing']
-        duration = timing['end'] - timing['start']
-
-        if duration < min_duration:
-            # Étendre légèrement vers la fin seulement
-            timing['end'] = timing['start'] + min_duration
-            corrections_made += 1
-            print(f"DURÉE COURTE: '{segment['text']}' {duration:.3f}s -> {min_duration:.3f}s")
-
-    print(f"Corrections appliquées: {corrections_made} ajustements")
+    too_short = ends - starts < min_duration
+    # Étendre légèrement vers la fin seulement
+    ends = np.where(too_short, starts + min_duration, ends)
+
+    for segment, start, end, old_start, old_end in zip(word_segments, starts.tolist(), ends.tolist(), original_starts.tolist(), original_ends.tolist()):
+        if start != old_start:
+            segment['timing']['start'] = start
+        if end != old_end:
+            segment['timing']['end'] = end
+
+    corrections_made = int(inverted.sum()) + 2 * int(split.sum()) + int(too_short.sum())
+    print(f"Corrections appliquées: {corrections_made} ajustements "
+          f"({int(inverted.sum())} inversés, {int(split.sum())} chevauchements, {int(too_short.sum())} durées courtes)")
     return segments
 
 
@@ -143,6 +148,19 @@ def similar(a, b, threshold=0.7):
     return SequenceMatcher(None, normalize_word(a), normalize_word(b)).ratio() >= threshold
 
 
+# Découpage du script en un seul passage : locuteur (sur une seule ligne), annotation,
+# espaces, mot, puis tout autre caractère isolé. Les alternatives sont essayées dans cet
+# ordre à chaque position, comme le faisait l'ancienne boucle caractère par caractère.
+SCRIPT_TOKEN_RE = re.compile(
+    r"(?P<speaker>[A-Z][a-zA-Z \t]+:\s*)"
+    r"|(?P<annotation><[^>]+>|\[[^\]]+\])"
+    r"|(?P<space>\s+)"
+    r"|(?P<word>\b[\w'''-]+\b)"
+    r"|(?P<char>.)",
+    re.DOTALL
+)
+
+
 def create_word_mapping_whisperx(source_text: str, whisperx_result: dict, debug: bool = False):
     """
     Crée un mapping entre texte original et résultats WhisperX.
@@ -219,128 +237,36 @@ def create_word_mapping_whisperx(source_text: str, whisperx_result: dict, debug:
         for i, word in enumerate(whisperx_words[:5]):
             print(f"  {i}: '{word['word']}' [{word['start']:.3f}-{word['end']:.3f}s]")
 
-    whisperx_index = 0
-    i = 0
+    word_segments = []
+    for token in SCRIPT_TOKEN_RE.finditer(source_text):
+        kind = token.lastgroup
+        segment = {
+            'type': kind if kind in ('speaker', 'annotation', 'word') else 'text',
+            'text': token.group(),
+            'start_pos': token.start(),
+            'end_pos': token.end()
+        }
+        if kind == 'word':
+            segment['timing'] = None
+            word_segments.append(segment)
+        segments.append(segment)
+
+    # Alignement global (Needleman-Wunsch en bande) des mots du script sur ceux de WhisperX :
+    # une longue insertion ou omission de l'ASR ne fait plus perdre la synchronisation
+    mapping = align_words(
+        [normalize_word(segment['text']) for segment in word_segments],
+        [normalize_word(word['word']) for word in whisperx_words]
+    )
     matched_words = 0
-    unmatched_words = 0
-    used_whisperx_indices = set()  # Éviter la réutilisation des mêmes timings
-
-    while i < len(source_text):
-        # Détection des noms de locuteurs
-        speaker_match = re.match(r'^([A-Z][a-zA-Z\s]+):\s*', source_text[i:], re.MULTILINE)
-        if speaker_match:
-            speaker_text = speaker_match.group(0)
-            segments.append({
-                'type': 'speaker',
-                'text': speaker_text,
-                'start_pos': i,
-                'end_pos': i + len(speaker_text)
-            })
-            i += len(speaker_text)
-            continue
-
-        # Détection des annotations
-        annotation_match = re.match(r'(<[^>]+>|\[[^\]]+\])', source_text[i:])
-        if annotation_match:
-            annotation_text = annotation_match.group(1)
-            segments.append({
-                'type': 'annotation',
-                'text': annotation_text,
-                'start_pos': i,
-                'end_pos': i + len(annotation_text)
-            })
-            i += len(annotation_text)
-            continue
-
-        # Détection des séquences d'espaces blancs
-        whitespace_match = re.match(r'\s+', source_text[i:])
-        if whitespace_match:
-            whitespace_text = whitespace_match.group(0)
-            segments.append({
-                'type': 'text',
-                'text': whitespace_text,
-                'start_pos': i,
-                'end_pos': i + len(whitespace_text)
-            })
-            i += len(whitespace_text)
+    for segment, whisperx_idx in zip(word_segments, mapping):
+        if whisperx_idx < 0:
             continue
-
-        # Détection des mots
-        word_match = re.match(r"\b[\w'''-]+\b", source_text[i:])
-        if word_match:
-            word_text = word_match.group(0)
-            timing_info = None
-
-            # Ignorer certains mots très courts qui n'ont probablement pas de timing
-            skip_timing = len(word_text) <= 1 and word_text.lower() in ['i', 'a']
-
-            if not skip_timing:
-                # Recherche du meilleur match dans WhisperX
-                best_match_index = -1
-                best_score = -1.0  # Utiliser un score qui pénalise la distance
-                best_similarity = 0.0
-                search_window = 5
-
-                start_search = max(0, whisperx_index - search_window)
-                end_search = min(len(whisperx_words), whisperx_index + search_window + 1)
-
-                for search_idx in range(start_search, end_search):
-                    if search_idx < len(whisperx_words) and search_idx not in used_whisperx_indices:
-                        whisperx_word = whisperx_words[search_idx]["word"]
-                        similarity = SequenceMatcher(None, normalize_word(word_text), normalize_word(whisperx_word)).ratio()
-
-                        if similarity >= 0.6:
-                            # Pénalise la distance pour favoriser les correspondances proches
-                            distance = abs(search_idx - whisperx_index)
-                            score = similarity - (distance * 0.05)
-
-                            if score > best_score:
-                                best_score = score
-                                best_match_index = search_idx
-                                best_similarity = similarity
-
-                if best_match_index != -1:
-                    timing_info = {
-                        "start": whisperx_words[best_match_index]["start"],
-                        "end": whisperx_words[best_match_index]["end"]
-                    }
-                    used_whisperx_indices.add(best_match_index)  # Marquer comme utilisé
-                    whisperx_index = best_match_index + 1
-                    matched_words += 1
-
-                    if debug and best_similarity < 0.9:
-                        print(
-                            f"Match approximatif: '{word_text}' -> '{whisperx_words[best_match_index]['word']}' (sim: {best_similarity:.2f})")
-
-                elif whisperx_index < len(whisperx_words):
-                    unmatched_words += 1
-                    if debug:
-                        current_whisperx = whisperx_words[whisperx_index]["word"] if whisperx_index < len(
-                            whisperx_words) else "END"
-                        print(f"Mot non aligné: '{word_text}' vs whisperx='{current_whisperx}'")
-
-                    # Avancer plus prudemment pour éviter de perdre des mots
-                    if unmatched_words % 2 == 0 and whisperx_index < len(whisperx_words) - 1:
-                        whisperx_index += 1
-
-            segments.append({
-                'type': 'word',
-                'text': word_text,
-                'start_pos': i,
-                'end_pos': i + len(word_text),
-                'timing': timing_info
-            })
-            i += len(word_text)
-            continue
-
-        # Caractère simple
-        segments.append({
-            'type': 'text',
-            'text': source_text[i],
-            'start_pos': i,
-            'end_pos': i + 1
-        })
-        i += 1
+        whisperx_word = whisperx_words[whisperx_idx]
+        segment['timing'] = {"start": whisperx_word["start"], "end": whisperx_word["end"]}
+        matched_words += 1
+        if debug and normalize_word(segment['text']) != normalize_word(whisperx_word['word']):
+            print(f"Match approximatif: '{segment['text']}' -> '{whisperx_word['word']}'")
+    unmatched_words = len(word_segments) - matched_words
 
     if debug:
         print(f"\n=== Statistiques WhisperX ===")
@@ -353,6 +279,55 @@ def create_word_mapping_whisperx(source_text: str, whisperx_result: dict, debug:
     return segments
 
 
+def script_turns(source_text: str):
+    """
+    Découpe le script en répliques (locuteur, texte parlé), avec le même tokenizer que le mapping.
+    Les annotations ([rire], <pause>) ne sont pas parlées et sont retirées ; seul un nom en début
+    de ligne ouvre une réplique. Le texte avant le premier locuteur (instructions) est ignoré,
+    sauf si le script n'a aucun locuteur : il forme alors une seule réplique.
+    """
+    turns = []
+    speaker, parts = None, []
+    for token in SCRIPT_TOKEN_RE.finditer(source_text):
+        kind = token.lastgroup
+        if kind == 'speaker' and (token.start() == 0 or source_text[token.start() - 1] == '\n'):
+            if speaker is not None:
+                turns.append((speaker, parts))
+            speaker, parts = token.group().split(':')[0].strip(), []
+        elif kind != 'annotation':
+            parts.append(token.group())
+    if speaker is not None:
+        turns.append((speaker, parts))
+    elif parts:
+        turns.append(("", parts))
+    return [(name, " ".join("".join(parts).split())) for name, parts in turns]
+
+
+def build_forced_alignment_segments(turns, spans):
+    """
+    Segments d'entrée de whisperx.align ({"text", "start", "end"}) : une réplique du script par
+    segment, placée sur son intervalle approximatif. Les répliques sans texte parlé sont ignorées.
+    """
+    return [
+        {"text": text, "start": float(start), "end": float(end)}
+        for (_, text), (start, end) in zip(turns, spans)
+        if re.search(r'\w', text) and end > start
+    ]
+
+
+def _turn_spans(audio_filepath: str, turns, status_callback=print):
+    """
+    Intervalles approximatifs des répliques : ceux du fichier .timeline.json écrit pendant la
+    synthèse s'il a autant de répliques que le script, sinon une estimation par l'énergie audio.
+    """
+    timeline = load_timeline(audio_filepath)
+    if timeline and len(timeline.get("turns", [])) == len(turns):
+        status_callback("Intervalles des répliques lus dans la timeline de synthèse.")
+        return [(turn["start"], turn["end"]) for turn in timeline["turns"]]
+    status_callback("Estimation des intervalles des répliques par l'énergie audio...")
+    return estimate_turn_spans(frame_energies(audio_filepath), [len(text) for _, text in turns])
+
+
 def reconstruct_html_with_timing(segments):
     """Reconstruit le HTML à partir des segments analysés avec validation des timings."""
     html_parts = []
@@ -390,6 +365,70 @@ def reconstruct_html_with_timing(segments):
     return ''.join(html_parts)
 
 
+def build_compact_transcript(segments):
+    """
+    Découpe les segments en paragraphes (un par tour de parole) pour le format compact et
+    rassemble les timings des mots valides à plat : [début, fin, début, fin, ...].
+    Dans "parts", une chaîne est du texte simple, [mot] un mot avec timing (numérotés à la
+    suite à partir de "w") et {"a": texte} une annotation.
+    """
+    paragraphs = []
+    timings = []
+    paragraph = None
+
+    def close_paragraph():
+        # Le retour à la ligne qui termine un tour est rendu par le paragraphe lui-même
+        parts = paragraph['parts']
+        if parts and isinstance(parts[-1], str) and parts[-1].endswith('\n'):
+            parts[-1] = parts[-1][:-1]
+            if not parts[-1]:
+                parts.pop()
+        paragraphs.append(paragraph)
+
+    for segment in segments:
+        if segment['type'] == 'speaker' or paragraph is None:
+            if paragraph is not None:
+                close_paragraph()
+            paragraph = {'w': len(timings) // 2, 'parts': []}
+            if segment['type'] == 'speaker':
+                paragraph['speaker'] = segment['text']
+                continue
+
+        parts = paragraph['parts']
+        timing = segment.get('timing')
+        if segment['type'] == 'annotation':
+            parts.append({'a': re.sub(r'[<>\[\]]', '', segment['text'])})
+        elif segment['type'] == 'word' and timing and timing['start'] < timing['end']:
+            parts.append([segment['text']])
+            timings += [timing['start'], timing['end']]
+        elif parts and isinstance(parts[-1], str):
+            parts[-1] += segment['text']
+        else:
+            parts.append(segment['text'])
+
+    if paragraph is not None:
+        close_paragraph()
+    print(f"Transcription compacte: {len(paragraphs)} paragraphes, {len(timings) // 2} mots avec timing")
+    return paragraphs, timings
+
+
+def _write_compact_demo_data(output_dir: str, base_name: str, paragraphs, timings) -> list:
+    """
+    Écrit les fichiers annexes du format compact et retourne leurs noms. Ce sont des scripts
+    (et non du JSON chargé par fetch) pour que la démo fonctionne aussi ouverte en file://.
+    Les timings sont un tableau Float32 little-endian encodé en base64.
+    """
+    transcript_filename = f"{base_name}{COMPACT_TRANSCRIPT_SUFFIX}"
+    timings_filename = f"{base_name}{COMPACT_TIMINGS_SUFFIX}"
+    transcript = json.dumps({'version': 1, 'paragraphs': paragraphs}, ensure_ascii=False, separators=(',', ':'))
+    with open(os.path.join(output_dir, transcript_filename), "w", encoding="utf-8") as f:
+        f.write(f"window.DEMO_TRANSCRIPT = {transcript};\n")
+    encoded_timings = base64.b64encode(np.asarray(timings, dtype='<f4').tobytes()).decode('ascii')
+    with open(os.path.join(output_dir, timings_filename), "w", encoding="utf-8") as f:
+        f.write(f'window.DEMO_TIMINGS = "{encoded_timings}";\n')
+    return [transcript_filename, timings_filename]
+
+
 def _get_html_template() -> str:
     """Loads the HTML template from a file."""
     logger = logging.getLogger("PodcastGenerator.Demo")
@@ -406,191 +445,174 @@ def _get_html_template() -> str:
 
 
 
+def _build_demo_html(script_filepath: str, audio_filepath: str, alignment_result: dict, title: str,
+                     subtitle: str = None, output_dir: str = None, status_callback=print,
+                     demo_format: str = DEMO_FORMAT) -> str:
+    """
+    Mappe les mots alignés (structure de résultat WhisperX) sur le script, écrit la page HTML
+    de la démo et l'ouvre. Retourne le chemin du fichier HTML.
+
+    Au format "compact", la transcription et les timings sont écrits dans des fichiers annexes
+    à côté de la page, qui n'affiche que les paragraphes proches de la zone visible.
+    """
+    if demo_format not in DEMO_FORMATS:
+        raise ValueError(f"Format de démo inconnu: {demo_format} (attendu: {', '.join(DEMO_FORMATS)})")
+
+    # --- 3. Lire le script original ---
+    with open(script_filepath, "r", encoding="utf-8") as f:
+        original_script_text = f.read()
+
+    # --- 3bis. Supprimer les instructions avant le premier locuteur ---
+    # Cherche la première occurrence d'une ligne de type "Nom: ..."
+    match = re.search(r'^[A-Z][a-zA-Z\s]+:\s', original_script_text, re.MULTILINE)
+    if match:
+        start_index = match.start()
+        original_script_text = original_script_text[start_index:]
+
+    # --- 4. Créer le mapping ---
+    status_callback("Création du mapping texte-audio...")
+    segments = create_word_mapping_whisperx(original_script_text, alignment_result, debug=False)  # Désactiver debug verbose
+
+    # --- 5. Appliquer les corrections ---
+    segments = interpolate_missing_words(segments)
+    segments = fix_word_timings(segments)
+
+    # --- 6. Emplacement des fichiers ---
+    safe_filename = secure_filename(title)
+    safe_filename = os.path.splitext(safe_filename)[0]  # Remove extension if present
+    if not safe_filename:
+        safe_filename = "podcast_demo"
+
+    if output_dir:
+        final_output_dir = output_dir
+        os.makedirs(final_output_dir, exist_ok=True)
+        shutil.copy(audio_filepath, final_output_dir)
+    else:
+        final_output_dir = os.path.dirname(audio_filepath)
+
+    html_filepath = os.path.join(final_output_dir, f"{safe_filename}.html")
+
+    # --- 7. Générer le HTML (ou les fichiers annexes du format compact) ---
+    if demo_format == "compact":
+        paragraphs, timings = build_compact_transcript(segments)
+        data_files = _write_compact_demo_data(final_output_dir, safe_filename, paragraphs, timings)
+        final_html_body = ""
+        data_scripts = "\n  ".join(f'<script src="{filename}"></script>' for filename in data_files)
+    else:
+        final_html_body = reconstruct_html_with_timing(segments)
+        data_scripts = ""
+
+    subtitle_html = f'<h2>{subtitle.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")}</h2>' if subtitle else ""
+
+    html_template = _get_html_template()
+    html_content = html_template.format(
+        title=title,
+        subtitle_html=subtitle_html,
+        audio_filename=os.path.basename(audio_filepath),
+        final_html_body=final_html_body,
+        data_scripts=data_scripts
+    )
+
+    with open(html_filepath, "w", encoding="utf-8") as f:
+        f.write(html_content)
+
+    webbrowser.open("file://" + os.path.abspath(html_filepath))
+    return html_filepath
+
+
 def create_html_demo_whisperx(script_filepath: str, audio_filepath: str, title: str = "Podcast Demo",
                               subtitle: str = None, output_dir: str = None, status_callback=print,
-                              language: str = "auto"):
+                              language: str = "auto", demo_format: str = DEMO_FORMAT,
+                              forced_alignment: bool = DEMO_FORCED_ALIGNMENT):
     """
     Génère une démo HTML synchronisée avec WhisperX pour l'alignement.
 
+    La transcription et l'alignement tournent dans le processus résident d'alignment_worker,
+    qui garde les modèles en mémoire entre deux démos : torch et WhisperX ne sont jamais
+    chargés dans l'application elle-même. Avec ALIGNMENT_PARALLEL, un long audio est découpé
+    aux silences et ses fenêtres sont transcrites en parallèle (voir align_parallel).
+
+    Avec forced_alignment et une langue explicite, le texte du script est aligné directement sur
+    l'audio, réplique par réplique : ni transcription ni détection de langue.
+
     Args:
         language: Code de langue (ex: "en", "fr", "es") ou "auto" pour détection automatique
+        forced_alignment: Aligner le script sans transcription (ignoré si language vaut "auto")
     """
     logger = logging.getLogger("PodcastGenerator.Demo")
 
-    # --- Dépendances lourdes chargées à la demande ---
-    # Cela évite de charger torch/whisperx au démarrage de l'app principale,
-    # ce qui est la cause principale des crashs sur les apps packagées.
     try:
-        # --- PATCH CRUCIAL pour Torchaudio ---
-        # Cette ligne doit être exécutée AVANT l'import de whisperx (qui importe torchaudio).
-        # Elle désactive la tentative de chargement des extensions C++ de torchaudio
-        # qui causent des crashs sur certains systèmes (notamment macOS avec Conda).
-        import torio._extension.utils as torio_utils
-        torio_utils._TORIO_EXTENSION_AVAILABLE = False
-        logging.info("Applied torchaudio patch to disable C++ extensions.")
-
-        import torch
-        # Configuration pour la stabilité sur CPU, notamment macOS Intel
-        torch.set_num_threads(1)
-        os.environ['OMP_NUM_THREADS'] = '1'
-        os.environ['MKL_NUM_THREADS'] = '1'
-
-        import whisperx
-    except ImportError as e:
-        error_msg = f"Une bibliothèque requise pour la démo est manquante : {e}.\n\nInstallez 'whisperx' et ses dépendances (torch, etc.)."
-        status_callback(error_msg)
-        logger.error(error_msg)
-        return
-
-    try:
-        # --- 1. Charger le modèle WhisperX ---
-        status_callback("Chargement du modèle WhisperX...")
-        device = "cpu"
-        compute_type = "int8"  # Optimisé pour CPU
-        model = whisperx.load_model("small", device, compute_type=compute_type)
-        status_callback(f"Modèle WhisperX chargé (device: {device}, type: {compute_type})")
-
-        # --- 2. Transcription et alignement ---
-        status_callback("Chargement de l'audio...")
-        audio = whisperx.load_audio(audio_filepath)
-
-        status_callback("Transcription avec WhisperX (ceci peut prendre du temps sur CPU)...")
-
-        # Déterminer la langue à utiliser
-        transcribe_params = {
-            "batch_size": 4,  # Batch size réduit pour CPU
-            "verbose": True,
-            "task": "transcribe"
-        }
-
-        if language != "auto":
-            transcribe_params["language"] = language
-            status_callback(f"Transcription forcée en {language}")
+        # --- 1-2. Transcription et alignement (processus d'alignement résident, ou fenêtres en parallèle) ---
+        if forced_alignment and language == "auto":
+            status_callback("Alignement forcé impossible sans langue explicite : transcription complète.")
+            forced_alignment = False
+
+        if forced_alignment:
+            with open(script_filepath, "r", encoding="utf-8") as f:
+                turns = script_turns(f.read())
+            segments = build_forced_alignment_segments(turns, _turn_spans(audio_filepath, turns, status_callback))
+            if not segments:
+                raise ValueError("Aucune réplique à aligner dans le script.")
+            result = get_alignment_worker().force_align(audio_filepath, segments, language, status_callback=status_callback)
+        elif ALIGNMENT_PARALLEL:
+            result = align_parallel(audio_filepath, language=language, status_callback=status_callback)
         else:
-            status_callback("Transcription avec détection automatique de langue")
-
-        result = model.transcribe(audio, **transcribe_params)
-
-        detected_language = result.get('language', 'inconnu')
-        status_callback(f"Transcription terminée. Langue détectée: {detected_language}")
-
-        # Vérifier si des segments ont été trouvés
-        if not result.get('segments'):
-            status_callback("Aucun segment trouvé dans la transcription. Vérifiez votre fichier audio.")
-            return
-
-        status_callback("Chargement du modèle d'alignement...")
-
-        # Utiliser la langue spécifiée ou détectée
-        alignment_language = language if language != "auto" else detected_language
-
-        try:
-            model_a, metadata = whisperx.load_align_model(
-                language_code=alignment_language,
-                device=device
-            )
-            status_callback(f"Modèle d'alignement chargé pour: {alignment_language}")
-        except Exception as e:
-            status_callback(f"Erreur avec {alignment_language}: {e}")
-            status_callback("Tentative avec anglais par défaut...")
-            try:
-                model_a, metadata = whisperx.load_align_model(
-                    language_code="en",
-                    device=device
-                )
-            except Exception as e2:
-                status_callback(f"Erreur avec anglais: {e2}")
-                return
-
-        status_callback("Alignement des mots...")
-        aligned_result = whisperx.align(
-            result["segments"],
-            model_a,
-            metadata,
-            audio,
-            device,
-            return_char_alignments=False
-        )
-
-        # Mettre à jour result avec les données alignées
-        result.update(aligned_result)
+            result = get_alignment_worker().align(audio_filepath, language=language, status_callback=status_callback)
 
         print(f"WhisperX - Language détectée: {result.get('language', 'inconnu')}")
         print(f"WhisperX - Segments trouvés: {len(result.get('segments', []))}")
 
-        # Affichage détaillé des informations de debug
-        total_words_with_timing = 0
-        for i, segment in enumerate(result.get('segments', [])[:3]):  # Premiers 3 segments
-            print(f"Segment {i}: {segment.get('text', 'N/A')[:50]}...")
-            print(f"  - Clés disponibles: {list(segment.keys())}")
-            if 'words' in segment:
-                words_count = len(segment['words'])
-                total_words_with_timing += words_count
-                print(f"  - Mots avec timing: {words_count}")
-                # Afficher les premiers mots pour debug
-                for j, word in enumerate(segment['words'][:3]):
-                    print(f"    Mot {j}: {word}")
-
-        print(f"Total de mots avec timing dans les 3 premiers segments: {total_words_with_timing}")
-
-        # --- 3. Lire le script original ---
-        with open(script_filepath, "r", encoding="utf-8") as f:
-            original_script_text = f.read()
-
-        # --- 3bis. Supprimer les instructions avant le premier locuteur ---
-        # Cherche la première occurrence d'une ligne de type "Nom: ..."
-        match = re.search(r'^[A-Z][a-zA-Z\s]+:\s', original_script_text, re.MULTILINE)
-        if match:
-            start_index = match.start()
-            original_script_text = original_script_text[start_index:]
-
-        # --- 4. Créer le mapping ---
-        status_callback("Création du mapping texte-audio...")
-        segments = create_word_mapping_whisperx(original_script_text, result, debug=False)  # Désactiver debug verbose
-
-        # --- 5. Appliquer les corrections ---
-        segments = interpolate_missing_words(segments)
-        segments = fix_word_timings(segments)
-
-        # --- 6. Générer le HTML ---
-        final_html_body = reconstruct_html_with_timing(segments)
+        html_filepath = _build_demo_html(script_filepath, audio_filepath, result, title, subtitle, output_dir, status_callback, demo_format)
+        status_callback(f"Démo WhisperX générée et ouverte: {os.path.basename(html_filepath)}")
+        return html_filepath
 
-        # --- 7. Sauvegarder ---
-        safe_filename = secure_filename(title)
-        safe_filename = os.path.splitext(safe_filename)[0]  # Remove extension if present
-        if not safe_filename:
-            safe_filename = "podcast_demo"
+    except Exception as e:
+        status_callback(f"Erreur WhisperX: {e}")
+        logger.error(f"WhisperX demo generation failed: {e}", exc_info=True)
+        import traceback
+        traceback.print_exc()
 
-        if output_dir:
-            final_output_dir = output_dir
-            os.makedirs(final_output_dir, exist_ok=True)
-            shutil.copy(audio_filepath, final_output_dir)
-        else:
-            final_output_dir = os.path.dirname(audio_filepath)
 
-        html_filepath = os.path.join(final_output_dir, f"{safe_filename}.html")
+def has_word_timings(audio_filepath: str) -> bool:
+    """Indique si la synthèse a enregistré les timings des mots à côté de l'audio (fichier .timeline.json)."""
+    timeline = load_timeline(audio_filepath)
+    return bool(timeline and timeline.get("words"))
 
-        subtitle_html = f'<h2>{subtitle.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")}</h2>' if subtitle else ""
 
-        html_template = _get_html_template()
-        html_content = html_template.format(
-            title=title,
-            subtitle_html=subtitle_html,
-            audio_filename=os.path.basename(audio_filepath),
-            final_html_body=final_html_body
-        )
+def create_html_demo_from_timeline(script_filepath: str, audio_filepath: str, title: str = "Podcast Demo",
+                                   subtitle: str = None, output_dir: str = None, status_callback=print,
+                                   timeline: dict = None, demo_format: str = DEMO_FORMAT) -> str:
+    """
+    Génère la démo HTML à partir des timings de mots renvoyés par le fournisseur TTS
+    (fichier .timeline.json), sans transcription : ni torch ni WhisperX ne sont chargés.
+    """
+    timeline = timeline or load_timeline(audio_filepath)
+    if not timeline or not timeline.get("words"):
+        raise ValueError(f"Aucun timing de mots trouvé pour {os.path.basename(audio_filepath)}.")
 
-        with open(html_filepath, "w", encoding="utf-8") as f:
-            f.write(html_content)
+    status_callback(f"Utilisation des timings du fournisseur TTS ({len(timeline['words'])} mots), sans WhisperX.")
+    alignment_result = {"segments": [{"words": timeline["words"]}]}
+    html_filepath = _build_demo_html(script_filepath, audio_filepath, alignment_result, title, subtitle, output_dir, status_callback, demo_format)
+    status_callback(f"Démo générée et ouverte: {os.path.basename(html_filepath)}")
+    return html_filepath
 
-        webbrowser.open("file://" + os.path.abspath(html_filepath))
-        status_callback(f"Démo WhisperX générée et ouverte: {os.path.basename(html_filepath)}")
 
-    except Exception as e:
-        status_callback(f"Erreur WhisperX: {e}")
-        logger.error(f"WhisperX demo generation failed: {e}", exc_info=True)
-        import traceback
-        traceback.print_exc()
+def create_html_demo(script_filepath: str, audio_filepath: str, title: str = "Podcast Demo",
+                     subtitle: str = None, output_dir: str = None, status_callback=print,
+                     language: str = "auto", demo_format: str = DEMO_FORMAT,
+                     forced_alignment: bool = DEMO_FORCED_ALIGNMENT):
+    """
+    Génère la démo HTML avec les timings enregistrés pendant la synthèse s'il y en a,
+    sinon avec l'alignement WhisperX.
+    """
+    timeline = load_timeline(audio_filepath)
+    if timeline and timeline.get("words"):
+        return create_html_demo_from_timeline(script_filepath, audio_filepath, title=title, subtitle=subtitle,
+                                              output_dir=output_dir, status_callback=status_callback, timeline=timeline,
+                                              demo_format=demo_format)
+    return create_html_demo_whisperx(script_filepath, audio_filepath, title=title, subtitle=subtitle,
+                                     output_dir=output_dir, status_callback=status_callback, language=language,
+                                     demo_format=demo_format, forced_alignment=forced_alignment)
 
 
 if __name__ == "__main__":
@@ -599,7 +621,7 @@ if __name__ == "__main__":
     multiprocessing.freeze_support()
 
     parser = argparse.ArgumentParser(
-        description="Generate a synchronized HTML demo using WhisperX for word-level alignment.",
+        description="Generate a synchronized HTML demo, using the word timings saved during synthesis or WhisperX for word-level alignment.",
         epilog="Example: python create_demo.py my_podcast.mp3 my_script.txt"
     )
     parser.add_argument("audio_file", help="Path to the audio file (e.g., .mp3, .wav).")
@@ -622,6 +644,18 @@ if __name__ == "__main__":
         default="auto",
         help="Language code for transcription (en, fr, es, etc.) or 'auto' for automatic detection. (default: %(default)s)"
     )
+    parser.add_argument(
+        "--format",
+        choices=DEMO_FORMATS,
+        default=DEMO_FORMAT,
+        help="'inline' puts every word in the page; 'compact' writes the transcript and timings to sidecar files, for long episodes. (default: %(default)s)"
+    )
+    parser.add_argument(
+        "--forced-alignment",
+        action="store_true",
+        default=DEMO_FORCED_ALIGNMENT,
+        help="Align the script directly on the audio, skipping transcription. Requires --language."
+    )
     args = parser.parse_args()
 
     if not os.path.exists(args.audio_file):
@@ -632,6 +666,6 @@ if __name__ == "__main__":
         sys.exit(1)
 
     logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-    create_html_demo_whisperx(args.script_file, args.audio_file, title=args.title,
-                              subtitle=args.subtitle, output_dir=args.output_dir,
-                              language=args.language)
\ No newline at end of file
+    create_html_demo(args.script_file, args.audio_file, title=args.title,
+                     subtitle=args.subtitle, output_dir=args.output_dir,
+                     language=args.language, demo_format=args.format, forced_alignment=args.forced_alignment)
\ No newline at end of file
@@ -1,10 +1,10 @@
 import argparse
+import base64
 import sys
 import traceback
 from dotenv import load_dotenv
 from google import genai
 from google.genai import errors, types
-from elevenlabs.client import ElevenLabs
 from elevenlabs.core import ApiError
 import os
 import subprocess
@@ -13,13 +13,22 @@ import getpass
 from typing import Optional, Any, Dict, List, Tuple
 import tempfile
 import threading
+import difflib
+import shutil
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 import json
 import keyring  # For secure credential storage
 
 import re
-import requests
 from utils import get_app_data_dir, find_ffmpeg_path, sanitize_app_settings_for_backend, sanitize_text
+from audio_cache import AudioCache, extract_annotations, get_default_audio_cache
+from clients import ELEVENLABS_API_URL, get_elevenlabs_client, get_gemini_client, get_http_session
+from rate_limiter import GenerationStopped, call_with_backoff, get_rate_limiter, is_transient_error
+from timeline import alignment_to_words, build_timeline, mp3_sample_count, remove_timeline, split_at_turn_starts, write_timeline
+from config import BATCH_MAX_WORKERS, ELEVENLABS_TIMESTAMPS, ELEVENLABS_WINDOW_CHARS, GEMINI_CHUNK_CHARS, GEMINI_STREAMING_ENCODE, TIMELINE_SIDECAR, TTS_MAX_CONCURRENCY, TTS_WINDOW_RETRIES
 
 # Global logger instance - initialized once when module is imported
 logger = logging.getLogger(__name__)
@@ -31,6 +40,10 @@ Samantha: [laughing] You're queen Elizabeth II!!
 """
 PODCAST_SCRIPT = f"{DEFAULT_INSTRUCTION}\n{DEFAULT_SCRIPT}"
 
+# ElevenLabs model used by the text-to-dialogue endpoint
+ELEVENLABS_DIALOGUE_MODEL = "eleven_v3"
+SPEAKER_LINE_PATTERN = re.compile(r"^\s*([^:]+?)\s*:\s*(.+)$")
+
 
 def setup_logging() -> logging.Logger:
     """
@@ -143,29 +156,127 @@ def get_api_key(status_callback, logger: logging.Logger, parent_window=None, ser
 
 
 class TTSProvider:
+    # Write a <output>.timeline.json sidecar with the sample offsets of every turn
+    timeline = False
+
     def synthesize(self, script_text: str, speaker_mapping: dict, output_filepath: str, status_callback=print, stop_event: Optional[threading.Event] = None) -> str:
         raise NotImplementedError
 
+    def synthesize_turns(self, turns: List[Tuple[str, str]], instruction: str, speaker_mapping: dict, status_callback=print, stop_event: Optional[threading.Event] = None) -> List[bytes]:
+        raise NotImplementedError
+
+    def _write_timeline(self, output_filepath: str, groups: List[Tuple[List[Tuple[str, str]], int]], sample_rate: int, status_callback=print, words: Optional[List[Dict[str, Any]]] = None) -> None:
+        """
+        Writes the timeline sidecar if enabled. groups are the (turns, samples) pieces of audio, in order.
+        Otherwise, or if it cannot be written, the sidecar of a previous synthesis is deleted.
+        """
+        try:
+            if not self.timeline:
+                remove_timeline(output_filepath)
+                return
+            path = write_timeline(output_filepath, build_timeline(groups, sample_rate, words))
+            status_callback(f"Turn timeline saved: {os.path.basename(path)}")
+        except OSError as e:
+            logging.getLogger("PodcastGenerator").warning(f"Could not write the turn timeline: {e}")
+            try:
+                remove_timeline(output_filepath)
+            except OSError:
+                pass
+
+    def _write_mp3_timeline(self, output_filepath: str, turn_groups: List[List[Tuple[str, str]]], segments: List[bytes], status_callback=print) -> None:
+        """Writes the timeline of MP3 segments joined in order, counting each segment's samples from its frame headers."""
+        if not self.timeline:
+            # Only deletes the sidecar of a previous synthesis
+            self._write_timeline(output_filepath, [], 0, status_callback)
+            return
+        counts = [mp3_sample_count(segment) for segment in segments]
+        sample_rate = next((rate for _, rate in counts if rate), 0)
+        self._write_timeline(output_filepath, [(group, samples) for group, (samples, _) in zip(turn_groups, counts)], sample_rate, status_callback)
+
 
 class GeminiTTS(TTSProvider):
-    def __init__(self, api_key: str):
+    def __init__(self, api_key: str, cache: Optional[AudioCache] = None, chunk_chars: int = GEMINI_CHUNK_CHARS, max_concurrency: int = TTS_MAX_CONCURRENCY, timeline: bool = TIMELINE_SIDECAR):
         self.api_key = api_key
+        self.client = get_gemini_client(api_key)
+        self.rate_limiter = get_rate_limiter("gemini", api_key)
+        self.cache = cache
+        self.chunk_chars = chunk_chars
+        self.max_concurrency = max_concurrency
+        self.timeline = timeline
 
     def synthesize(self, script_text: str, speaker_mapping: dict, output_filepath: str, status_callback=print, stop_event: Optional[threading.Event] = None) -> str:
         logger = logging.getLogger("PodcastGenerator")
-        client = genai.Client(api_key=self.api_key)
+        client = self.client
 
         gemini_script = script_text.replace('[', '(').replace(']', ')')
         logger.info("Converted script annotations from [] to () for Gemini.")
 
+        models_to_try = self._models_to_try()
+        generate_content_config = self._build_content_config(speaker_mapping)
+
+        if self.cache:
+            return self._synthesize_turns_cached(client, script_text, speaker_mapping, generate_content_config, models_to_try, output_filepath, status_callback, stop_event)
+
+        if self.chunk_chars and len(gemini_script) > self.chunk_chars:
+            return self._synthesize_chunked(client, script_text, generate_content_config, models_to_try, output_filepath, status_callback, stop_event)
+
+        # A single request only tells where the whole script ends; turn offsets inside it are estimated
+        turns = parse_script_segments(script_text)
+        if GEMINI_STREAMING_ENCODE:
+            # Encode while the audio is still arriving instead of buffering the whole PCM stream
+            encoder = FFmpegStreamEncoder(output_filepath, status_callback)
+            self._generate_pcm(client, gemini_script, generate_content_config, models_to_try, status_callback, stop_event, encoder=encoder)
+            sample_rate = parse_audio_mime_type(encoder.mime_type)["rate"] if encoder.mime_type else 0
+            pcm_bytes = encoder.bytes_written
+            output_filepath = encoder.close()
+            self._write_timeline(output_filepath, [(turns, pcm_bytes // 2)], sample_rate, status_callback)
+            return output_filepath
+
+        audio_chunks, final_mime_type, _ = self._generate_pcm(client, gemini_script, generate_content_config, models_to_try, status_callback, stop_event)
+        _ffmpeg_convert_inline_audio_chunks(audio_chunks, final_mime_type, output_filepath, status_callback)
+        self._write_timeline(output_filepath, [(turns, sum(len(chunk) for chunk in audio_chunks) // 2)], parse_audio_mime_type(final_mime_type)["rate"], status_callback)
+        return output_filepath
+
+    def synthesize_turns(self, turns: List[Tuple[str, str]], instruction: str, speaker_mapping: dict, status_callback=print, stop_event: Optional[threading.Event] = None) -> List[bytes]:
+        """
+        Synthesizes each (speaker, text) turn on its own and returns one encoded MP3 per turn, in order.
+        The instruction line is sent with every turn so the delivery stays consistent.
+        """
+        generate_content_config = self._build_content_config(speaker_mapping)
+        models_to_try = self._models_to_try()
+        gemini_texts = []
+        for speaker, text in turns:
+            turn_text = f"{speaker}: {text}".replace('[', '(').replace(']', ')')
+            gemini_texts.append(f"{instruction}\n{turn_text}" if instruction else turn_text)
+
+        results = run_concurrently(
+            gemini_texts,
+            lambda gemini_text: self._generate_pcm(self.client, gemini_text, generate_content_config, models_to_try, status_callback, stop_event),
+            self.max_concurrency,
+            stop_event=stop_event,
+            status_callback=status_callback,
+            label="[Gemini] Turn",
+        )
+        encoded = []
+        with tempfile.TemporaryDirectory(prefix="podcast_turns_") as tmp_dir:
+            for index, (audio_chunks, mime_type, _) in enumerate(results):
+                turn_path = os.path.join(tmp_dir, f"turn_{index:04d}.mp3")
+                _ffmpeg_convert_inline_audio_chunks(audio_chunks, mime_type, turn_path, status_callback=lambda message: None)
+                with open(turn_path, "rb") as f:
+                    encoded.append(f.read())
+        return encoded
+
+    @staticmethod
+    def _models_to_try() -> List[str]:
         # Get model from environment variable or use defaults
         primary_model = os.environ.get("GEMINI_TTS_MODEL", "gemini-2.5-pro-preview-tts")
         models_to_try = [primary_model, "gemini-2.5-pro-preview-tts", "gemini-2.5-flash-preview-tts"]
         # Remove duplicates while preserving order
-        models_to_try = list(dict.fromkeys(models_to_try))
-
-        contents = [types.Content(role="user", parts=[types.Part.from_text(text=gemini_script)])]
+        return list(dict.fromkeys(models_to_try))
 
+    @staticmethod
+    def _build_content_config(speaker_mapping: dict):
+        logger = logging.getLogger("PodcastGenerator")
         num_speakers = len(speaker_mapping)
         if num_speakers == 1:
             speech_config = types.SpeechConfig(voice_config=types.VoiceConfig(prebuilt_voice_config=types.PrebuiltVoiceConfig(voice_name=list(speaker_mapping.values())[0])))
@@ -179,37 +290,42 @@ class GeminiTTS(TTSProvider):
         else:
             raise ValueError(f"Gemini TTS requires 1 or 2 speakers, but {num_speakers} were provided.")
 
-        generate_content_config = types.GenerateContentConfig(temperature=1, response_modalities=["audio"], speech_config=speech_config)
+        return types.GenerateContentConfig(temperature=1, response_modalities=["audio"], speech_config=speech_config)
+
+    def _generate_pcm(self, client, gemini_text: str, generate_content_config, models_to_try: List[str], status_callback=print, stop_event: Optional[threading.Event] = None, encoder: Optional["FFmpegStreamEncoder"] = None) -> Tuple[List[bytes], str, str]:
+        """
+        Streams raw PCM audio for a piece of script, falling back through the models in order.
+        Returns the audio chunks, their mime type and the model that produced them.
+        If an encoder is given, chunks are written to it as they arrive and are not kept
+        in memory (the returned chunk list is then empty).
+        """
+        logger = logging.getLogger("PodcastGenerator")
+        contents = [types.Content(role="user", parts=[types.Part.from_text(text=gemini_text)])]
 
         for i, model_name in enumerate(models_to_try):
             if stop_event and stop_event.is_set():
-                raise Exception("Generation stopped by user.")
+                raise GenerationStopped("Generation stopped by user.")
             status_callback(f"\nAttempting generation with model: {model_name}...")
             try:
-                audio_chunks = []
-                final_mime_type = ""
-                for chunk in client.models.generate_content_stream(model=model_name, contents=contents, config=generate_content_config):
-                    if stop_event and stop_event.is_set():
-                        raise Exception("Generation stopped by user during streaming.")
-                    if not (chunk.candidates and chunk.candidates[0].content and chunk.candidates[0].content.parts):
-                        continue
-                    part = chunk.candidates[0].content.parts[0]
-                    if part.inline_data and part.inline_data.data:
-                        audio_chunks.append(part.inline_data.data)
-                        if not final_mime_type:
-                            final_mime_type = part.inline_data.mime_type
-                    else:
-                        status_callback(chunk.text)
-                if not audio_chunks:
-                    raise errors.GoogleAPICallError("No audio data was generated by the model.")
+                # Throttled requests wait for the shared limiter and are retried before falling back
+                audio_chunks, final_mime_type = call_with_backoff(
+                    self.rate_limiter,
+                    lambda: self._stream_model(client, model_name, contents, generate_content_config, status_callback, stop_event, encoder),
+                    stop_event=stop_event,
+                    status_callback=status_callback,
+                    label=f"[Gemini] {model_name}",
+                )
                 status_callback(f"Audio generated successfully via {model_name}.")
-                return _ffmpeg_convert_inline_audio_chunks(audio_chunks, final_mime_type, output_filepath, status_callback)
+                return audio_chunks, final_mime_type, model_name
             except errors.APIError as e:
                 logger.warning(f"API error with model '{model_name}': {e}")
+                if encoder:
+                    # Discard the partial encode; the next model starts a fresh one
+                    encoder.abort()
                 
                 # Check for Resource Exhausted (429)
                 if e.code == 429 or "RESOURCE_EXHAUSTED" in str(e):
-                    raise Exception("Gemini API Quota Exceeded (Resource Exhausted). Please try again later.")
+                    raise Exception("Gemini API Quota Exceeded (Resource Exhausted). Please try again later.") from e
                 
                 if i < len(models_to_try) - 1:
                     status_callback("Trying next model...")
@@ -222,14 +338,136 @@ class GeminiTTS(TTSProvider):
                              error_msg = e.message
                     except:
                         pass
-                    raise Exception(f"Gemini API Error: {error_msg}")
+                    raise Exception(f"Gemini API Error: {error_msg}") from e
+            except Exception:
+                if encoder:
+                    encoder.abort()
+                raise
         raise Exception("Audio generation failed after trying all available models.")
 
+    def _stream_model(self, client, model_name: str, contents, generate_content_config, status_callback=print, stop_event: Optional[threading.Event] = None, encoder: Optional["FFmpegStreamEncoder"] = None) -> Tuple[List[bytes], str]:
+        """Streams the audio of one request to one model. A partial encode is discarded on error."""
+        audio_chunks = []
+        received_audio = False
+        final_mime_type = ""
+        try:
+            for chunk in client.models.generate_content_stream(model=model_name, contents=contents, config=generate_content_config):
+                if stop_event and stop_event.is_set():
+                    raise GenerationStopped("Generation stopped by user during streaming.")
+                if not (chunk.candidates and chunk.candidates[0].content and chunk.candidates[0].content.parts):
+                    continue
+                part = chunk.candidates[0].content.parts[0]
+                if part.inline_data and part.inline_data.data:
+                    if not final_mime_type:
+                        final_mime_type = part.inline_data.mime_type
+                    if encoder:
+                        encoder.write(part.inline_data.data, final_mime_type)
+                    else:
+                        audio_chunks.append(part.inline_data.data)
+                    received_audio = True
+                else:
+                    status_callback(chunk.text)
+        except Exception:
+            if encoder:
+                encoder.abort()
+            raise
+        if not received_audio:
+            raise errors.GoogleAPICallError("No audio data was generated by the model.")
+        return audio_chunks, final_mime_type
+
+    def _synthesize_chunked(self, client, script_text: str, generate_content_config, models_to_try: List[str], output_filepath: str, status_callback=print, stop_event: Optional[threading.Event] = None) -> str:
+        """
+        Splits the script into chunks at speaker-turn boundaries, synthesizes them concurrently
+        and concatenates the raw PCM in order before a single FFmpeg encode.
+        """
+        instruction, windows = split_script_turn_windows(script_text, self.chunk_chars)
+        chunks = [format_script_chunk(instruction, window) for window in windows]
+        status_callback(f"[Gemini] Generating script in {len(chunks)} chunks (up to {self.max_concurrency} at a time)...")
+        results = run_concurrently(
+            [chunk.replace('[', '(').replace(']', ')') for chunk in chunks],
+            lambda chunk: self._generate_pcm(client, chunk, generate_content_config, models_to_try, status_callback, stop_event),
+            self.max_concurrency,
+            stop_event=stop_event,
+            status_callback=status_callback,
+            label="[Gemini] Chunk",
+        )
+        pcm_chunks = [b"".join(audio_chunks) for audio_chunks, _, _ in results]
+        _ffmpeg_convert_inline_audio_chunks(pcm_chunks, results[0][1], output_filepath, status_callback)
+        # 16-bit mono PCM: each chunk's length gives exact offsets at chunk boundaries
+        self._write_timeline(output_filepath, [(window, len(pcm) // 2) for window, pcm in zip(windows, pcm_chunks)], parse_audio_mime_type(results[0][1])["rate"], status_callback)
+        return output_filepath
+
+    def _synthesize_turns_cached(self, client, script_text: str, speaker_mapping: dict, generate_content_config, models_to_try: List[str], output_filepath: str, status_callback=print, stop_event: Optional[threading.Event] = None) -> str:
+        """
+        Synthesizes the script one speaker turn at a time, reusing cached PCM for unchanged turns.
+        The instruction line is sent with every turn so the delivery stays consistent.
+        """
+        instruction, _ = split_script_instruction(script_text)
+        segments = parse_script_segments(script_text)
+        if not segments:
+            raise ValueError("No valid dialogue segments found in the script. Ensure lines are in 'Speaker: Text' format.")
+
+        turns: List[Optional[Tuple[bytes, str]]] = []  # (pcm, mime type) of each turn
+        turn_requests = []
+        for speaker, text in segments:
+            turn_text = f"{speaker}: {text}".replace('[', '(').replace(']', ')')
+            gemini_text = f"{instruction}\n{turn_text}" if instruction else turn_text
+            voice_name = speaker_mapping.get(speaker, "")
+            annotations = extract_annotations(text)
+            turn_requests.append((gemini_text, voice_name, annotations))
+
+            # Any model of the fallback chain may have produced the cached turn; PCM is only
+            # reusable with its recorded sample format (older entries have none)
+            keys = [AudioCache.make_key("gemini", model_name, voice_name, gemini_text, annotations) for model_name in models_to_try]
+            turns.append(self.cache.find_entry(keys, require_mime=True))
+
+        # Turns are concatenated as raw PCM, so they must all share one format: keep the most
+        # common cached one, and regenerate cached turns in another format if new turns differ
+        cached_mime_types = Counter(turn[1] for turn in turns if turn)
+        final_mime_type = cached_mime_types.most_common(1)[0][0] if cached_mime_types else ""
+        generated = set()
+        for _ in range(2):
+            missing = [i for i, turn in enumerate(turns) if turn is None or turn[1] != final_mime_type]
+            if not missing:
+                break
+            status_callback(f"[Gemini] Generating {len(missing)}/{len(segments)} turns...")
+            results = run_concurrently(
+                [turn_requests[i][0] for i in missing],
+                lambda gemini_text: self._generate_pcm(client, gemini_text, generate_content_config, models_to_try, status_callback, stop_event),
+                self.max_concurrency,
+                stop_event=stop_event,
+                status_callback=status_callback,
+                label="[Gemini] Turn",
+            )
+            final_mime_type = results[0][1]
+            for i, (audio_chunks, mime_type, model_name) in zip(missing, results):
+                gemini_text, voice_name, annotations = turn_requests[i]
+                pcm = b"".join(audio_chunks)
+                self.cache.put(AudioCache.make_key("gemini", model_name, voice_name, gemini_text, annotations), pcm, mime_type)
+                turns[i] = (pcm, mime_type)
+                generated.add(i)
+        if any(turn[1] != final_mime_type for turn in turns):
+            raise Exception(f"[Gemini] Turns were generated in different audio formats: {sorted(set(turn[1] for turn in turns))}")
+
+        pcm_turns = [turn[0] for turn in turns]
+        reused = len(segments) - len(generated)
+        status_callback(f"[Gemini] Audio cache: {reused} turn(s) reused, {len(generated)} generated.")
+        _ffmpeg_convert_inline_audio_chunks(pcm_turns, final_mime_type, output_filepath, status_callback)
+        self._write_timeline(output_filepath, [([segment], len(pcm) // 2) for segment, pcm in zip(segments, pcm_turns)], parse_audio_mime_type(final_mime_type)["rate"], status_callback)
+        return output_filepath
+
 
 class ElevenLabsTTS(TTSProvider):
-    def __init__(self, api_key: str):
+    def __init__(self, api_key: str, cache: Optional[AudioCache] = None, window_chars: int = ELEVENLABS_WINDOW_CHARS, max_concurrency: int = TTS_MAX_CONCURRENCY, timeline: bool = TIMELINE_SIDECAR, timestamps: bool = ELEVENLABS_TIMESTAMPS):
         self.api_key = api_key
-        self.client = ElevenLabs(api_key=api_key)
+        self.client = get_elevenlabs_client(api_key)
+        self.rate_limiter = get_rate_limiter("elevenlabs", api_key)
+        self.cache = cache
+        self.window_chars = window_chars
+        self.max_concurrency = max_concurrency
+        # The word timings of timestamped synthesis are stored in the timeline sidecar
+        self.timestamps = timestamps
+        self.timeline = timeline or timestamps
         self.logger = logging.getLogger("PodcastGenerator")
 
     def synthesize(self, script_text: str, speaker_mapping: Dict[str, str], output_filepath: str, status_callback=print, stop_event: Optional[threading.Event] = None) -> str:
@@ -238,6 +476,7 @@ class ElevenLabsTTS(TTSProvider):
             raise ValueError("No valid dialogue segments found in the script. Ensure lines are in 'Speaker: Text' format.")
 
         dialogue_inputs = []
+        turns = []
         for speaker, text in segments:
             voice_id = speaker_mapping.get(speaker)
             if not voice_id:
@@ -245,25 +484,44 @@ class ElevenLabsTTS(TTSProvider):
                 continue
             self.logger.info(f"ElevenLabs - Speaker '{speaker}' mapped to voice_id: '{voice_id}'")
             dialogue_inputs.append({"text": text, "voice_id": voice_id})
+            turns.append((speaker, text))
 
         if not dialogue_inputs:
             raise ValueError("No dialogue segments with mapped voices could be generated.")
 
-        status_callback("[ElevenLabs] Generating full dialogue...")
         try:
-            audio_generator = self.client.text_to_dialogue.convert(inputs=dialogue_inputs)
             output_ext = os.path.splitext(output_filepath)[1].lower()
             if output_ext not in [".mp3", ".wav"]:
                 self.logger.warning(f"Unsupported file format: '{output_ext}'. Defaulting to '.mp3'.")
                 output_filepath = os.path.splitext(output_filepath)[0] + ".mp3"
-            
-            with open(output_filepath, "wb") as f:
-                for chunk in audio_generator:
-                    if stop_event and stop_event.is_set():
-                        raise Exception("Generation stopped by user during streaming.")
-                    f.write(chunk)
+
+            if self.timestamps:
+                return self._synthesize_timestamped(dialogue_inputs, turns, output_filepath, status_callback, stop_event)
+
+            if self.cache:
+                return self._synthesize_turns_cached(dialogue_inputs, turns, output_filepath, status_callback, stop_event)
+
+            total_chars = sum(len(d["text"]) for d in dialogue_inputs)
+            if self.window_chars and total_chars > self.window_chars:
+                return self._synthesize_windowed(dialogue_inputs, turns, output_filepath, status_callback, stop_event)
+
+            status_callback("[ElevenLabs] Generating full dialogue...")
+            call_with_backoff(
+                self.rate_limiter,
+                lambda: self._convert_dialogue_to_file(dialogue_inputs, output_filepath, stop_event),
+                stop_event=stop_event,
+                status_callback=status_callback,
+                label="[ElevenLabs] Dialogue",
+            )
             
             status_callback(f"File saved successfully: {output_filepath}")
+            if self.timeline:
+                # One request only tells where the whole dialogue ends; turn offsets inside it are estimated
+                with open(output_filepath, "rb") as f:
+                    self._write_mp3_timeline(output_filepath, [turns], [f.read()], status_callback)
+            else:
+                # Only deletes the sidecar of a previous synthesis
+                self._write_timeline(output_filepath, [], 0, status_callback)
             return output_filepath
         except ApiError as e:
             self.logger.error(f"ElevenLabs API error: {e}")
@@ -274,50 +532,320 @@ class ElevenLabsTTS(TTSProvider):
             except (KeyError, TypeError):
                 # Fallback for unexpected error formats
                 raise Exception(f"An unknown ElevenLabs API error occurred: {e}")
-        except Exception as e:
+        except GenerationStopped:
             # Re-raise the stop exception to be caught by the task runner
-            if "stopped by user" in str(e):
-                raise e
+            raise
+        except Exception as e:
             self.logger.error(f"ElevenLabs critical error: {e}", exc_info=True)
             raise Exception(f"An unexpected critical error occurred in ElevenLabs TTS: {e}")
 
+    def synthesize_turns(self, turns: List[Tuple[str, str]], instruction: str, speaker_mapping: Dict[str, str], status_callback=print, stop_event: Optional[threading.Event] = None) -> List[bytes]:
+        """Synthesizes each (speaker, text) turn on its own and returns one encoded MP3 per turn, in order."""
+        dialogue_inputs = [{"text": text, "voice_id": speaker_mapping[speaker]} for speaker, text in turns]
+        return run_concurrently(
+            dialogue_inputs,
+            lambda dialogue_input: self._convert_dialogue([dialogue_input], stop_event, status_callback),
+            self.max_concurrency,
+            stop_event=stop_event,
+            status_callback=status_callback,
+            label="[ElevenLabs] Turn",
+        )
+
+    def _convert_dialogue_to_file(self, dialogue_inputs: List[Dict[str, str]], output_filepath: str, stop_event: Optional[threading.Event] = None) -> None:
+        """Streams a single dialogue request into the output file as the chunks arrive."""
+        with open(output_filepath, "wb") as f:
+            for chunk in self.client.text_to_dialogue.convert(inputs=dialogue_inputs):
+                if stop_event and stop_event.is_set():
+                    raise GenerationStopped("Generation stopped by user during streaming.")
+                f.write(chunk)
+
+    def _convert_dialogue(self, dialogue_inputs: List[Dict[str, str]], stop_event: Optional[threading.Event] = None, status_callback=print) -> bytes:
+        """Synthesizes a list of dialogue inputs in a single API call and returns the encoded audio."""
+        def convert():
+            chunks = []
+            for chunk in self.client.text_to_dialogue.convert(inputs=dialogue_inputs):
+                if stop_event and stop_event.is_set():
+                    raise GenerationStopped("Generation stopped by user during streaming.")
+                chunks.append(chunk)
+            return b"".join(chunks)
+
+        return call_with_backoff(self.rate_limiter, convert, stop_event=stop_event, status_callback=status_callback, label="[ElevenLabs] Request")
+
+    def _convert_dialogue_with_timestamps(self, dialogue_inputs: List[Dict[str, str]], stop_event: Optional[threading.Event] = None, status_callback=print) -> Tuple[bytes, List[Dict[str, Any]], Dict[int, float]]:
+        """
+        Synthesizes a list of dialogue inputs in a single API call with character-level timestamps.
+        Returns the encoded audio, its timed words and the start time of each input, by input index.
+        """
+        def convert():
+            if stop_event and stop_event.is_set():
+                raise GenerationStopped("Generation stopped by user.")
+            return self.client.text_to_dialogue.convert_with_timestamps(inputs=dialogue_inputs)
+
+        response = call_with_backoff(self.rate_limiter, convert, stop_event=stop_event, status_callback=status_callback, label="[ElevenLabs] Request")
+        alignment = response.alignment
+        words = alignment_to_words(alignment.characters, alignment.character_start_times_seconds, alignment.character_end_times_seconds) if alignment else []
+        turn_starts: Dict[int, float] = {}
+        for segment in response.voice_segments or []:
+            index = segment.dialogue_input_index
+            turn_starts[index] = min(segment.start_time_seconds, turn_starts.get(index, segment.start_time_seconds))
+        return base64.b64decode(response.audio_base_64), words, turn_starts
+
+    def _synthesize_timestamped(self, dialogue_inputs: List[Dict[str, str]], turns: List[Tuple[str, str]], output_filepath: str, status_callback=print, stop_event: Optional[threading.Event] = None) -> str:
+        """
+        Synthesizes the dialogue with character-level timestamps (in windows if window_chars is set)
+        and stores its word timings and exact turn boundaries in the timeline sidecar.
+        The audio cache is not used, as cached audio has no timestamps.
+        """
+        windows = split_dialogue_windows(dialogue_inputs, self.window_chars) if self.window_chars else [dialogue_inputs]
+        status_callback(f"[ElevenLabs] Generating dialogue with timestamps in {len(windows)} request(s)...")
+        results = run_concurrently(
+            windows,
+            lambda window: self._convert_dialogue_with_timestamps(window, stop_event, status_callback),
+            self.max_concurrency,
+            stop_event=stop_event,
+            status_callback=status_callback,
+            label="[ElevenLabs] Window",
+        )
+        if len(results) == 1:
+            with open(output_filepath, "wb") as f:
+                f.write(results[0][0])
+        else:
+            _ffmpeg_concat_audio_segments([audio for audio, _, _ in results], ".mp3", output_filepath, status_callback)
+        status_callback(f"File saved successfully: {output_filepath}")
+
+        # Window timings start at zero: shift them by the length of the windows before
+        groups, words = [], []
+        offset_samples, sample_rate, first_turn = 0, 0, 0
+        for window, (audio, window_words, turn_starts) in zip(windows, results):
+            samples, rate = mp3_sample_count(audio)
+            sample_rate = sample_rate or rate
+            offset_seconds = offset_samples / sample_rate if sample_rate else 0.0
+            groups.extend(split_at_turn_starts(turns[first_turn:first_turn + len(window)], samples, rate, turn_starts))
+            words.extend({"word": word["word"], "start": round(word["start"] + offset_seconds, 3), "end": round(word["end"] + offset_seconds, 3)} for word in window_words)
+            offset_samples += samples
+            first_turn += len(window)
+        self._write_timeline(output_filepath, groups, sample_rate, status_callback, words=words)
+        return output_filepath
+
+    def _synthesize_windowed(self, dialogue_inputs: List[Dict[str, str]], turns: List[Tuple[str, str]], output_filepath: str, status_callback=print, stop_event: Optional[threading.Event] = None) -> str:
+        """
+        Splits the dialogue into windows at speaker-turn boundaries, synthesizes the windows
+        concurrently and joins them in order.
+        """
+        windows = split_dialogue_windows(dialogue_inputs, self.window_chars)
+        status_callback(f"[ElevenLabs] Generating dialogue in {len(windows)} windows (up to {self.max_concurrency} at a time)...")
+        window_audio = run_concurrently(
+            windows,
+            lambda window: self._convert_dialogue(window, stop_event, status_callback),
+            self.max_concurrency,
+            stop_event=stop_event,
+            status_callback=status_callback,
+            label="[ElevenLabs] Window",
+        )
+        _ffmpeg_concat_audio_segments(window_audio, ".mp3", output_filepath, status_callback)
+        status_callback(f"File saved successfully: {output_filepath}")
+        window_turns, start = [], 0
+        for window in windows:
+            window_turns.append(turns[start:start + len(window)])
+            start += len(window)
+        self._write_mp3_timeline(output_filepath, window_turns, window_audio, status_callback)
+        return output_filepath
+
+    def _synthesize_turns_cached(self, dialogue_inputs: List[Dict[str, str]], turns: List[Tuple[str, str]], output_filepath: str, status_callback=print, stop_event: Optional[threading.Event] = None) -> str:
+        """
+        Synthesizes each dialogue input separately, reusing cached audio for unchanged turns,
+        then joins the turns into the output file.
+        """
+        turn_audio: List[Optional[bytes]] = []
+        keys = []
+        for dialogue_input in dialogue_inputs:
+            key = AudioCache.make_key("elevenlabs", ELEVENLABS_DIALOGUE_MODEL, dialogue_input["voice_id"], dialogue_input["text"], extract_annotations(dialogue_input["text"]))
+            keys.append(key)
+            turn_audio.append(self.cache.get(key))
+
+        missing = [i for i, audio in enumerate(turn_audio) if audio is None]
+        if missing:
+            status_callback(f"[ElevenLabs] Generating {len(missing)}/{len(dialogue_inputs)} turns...")
+            generated = run_concurrently(
+                [dialogue_inputs[i] for i in missing],
+                lambda dialogue_input: self._convert_dialogue([dialogue_input], stop_event, status_callback),
+                self.max_concurrency,
+                stop_event=stop_event,
+                status_callback=status_callback,
+                label="[ElevenLabs] Turn",
+            )
+            for i, audio in zip(missing, generated):
+                self.cache.put(keys[i], audio)
+                turn_audio[i] = audio
+
+        reused = len(dialogue_inputs) - len(missing)
+        status_callback(f"[ElevenLabs] Audio cache: {reused} turn(s) reused, {len(missing)} generated.")
+        _ffmpeg_concat_audio_segments(turn_audio, ".mp3", output_filepath, status_callback)
+        status_callback(f"File saved successfully: {output_filepath}")
+        self._write_mp3_timeline(output_filepath, [[turn] for turn in turns], turn_audio, status_callback)
+        return output_filepath
+
     def _parse_script_segments(self, script_text: str) -> List[Tuple[str, str]]:
-        segments = []
-        current_speaker = None
-        current_text_lines = []
+        return parse_script_segments(script_text)
 
-        for raw_line in script_text.splitlines():
-            line = raw_line.strip()
-            if not line:
-                continue
 
-            match = re.match(r"^\s*([^:]+?)\s*:\s*(.+)$", line)
-            
-            if match:
-                # This is a new speaker line.
-                # First, save the previous speaker's collected text if it exists.
-                if current_speaker and current_text_lines:
-                    full_text = " ".join(current_text_lines)
-                    # Sanitize the joined text, then remove any newlines for ElevenLabs.
-                    sanitized_text = sanitize_text(full_text).replace('\n', ' ').replace('\r', '')
-                    if sanitized_text:
-                        segments.append((current_speaker, sanitized_text))
-
-                # Start the new speaker's block.
-                current_speaker = match.group(1).strip()
-                current_text_lines = [match.group(2).strip()]
-            elif current_speaker:
-                # This is a continuation of the current speaker's dialogue.
-                current_text_lines.append(line)
-
-        # After the loop, add the last speaker's segment if it exists.
-        if current_speaker and current_text_lines:
-            full_text = " ".join(current_text_lines)
-            sanitized_text = sanitize_text(full_text).replace('\n', ' ').replace('\r', '')
-            if sanitized_text:
-                segments.append((current_speaker, sanitized_text))
-        
-        return segments
+def split_dialogue_windows(dialogue_inputs: List[Dict[str, str]], max_chars: int) -> List[List[Dict[str, str]]]:
+    """
+    Groups consecutive dialogue inputs into windows of at most max_chars characters.
+    Windows always end on a speaker-turn boundary; a single turn longer than
+    max_chars gets a window of its own.
+    """
+    windows = []
+    current = []
+    current_chars = 0
+    for dialogue_input in dialogue_inputs:
+        length = len(dialogue_input["text"])
+        if current and current_chars + length > max_chars:
+            windows.append(current)
+            current = []
+            current_chars = 0
+        current.append(dialogue_input)
+        current_chars += length
+    if current:
+        windows.append(current)
+    return windows
+
+
+def split_script_turn_windows(script_text: str, max_chars: int) -> Tuple[str, List[List[Tuple[str, str]]]]:
+    """
+    Groups a script's (speaker, text) turns into windows of about max_chars characters.
+    Returns the script's instruction line and the windows.
+    """
+    instruction, _ = split_script_instruction(script_text)
+    turns = [{"text": f"{speaker}: {text}", "turn": (speaker, text)} for speaker, text in parse_script_segments(script_text)]
+    return instruction, [[turn["turn"] for turn in window] for window in split_dialogue_windows(turns, max_chars)]
+
+
+def format_script_chunk(instruction: str, turns: List[Tuple[str, str]]) -> str:
+    body = "\n".join(f"{speaker}: {text}" for speaker, text in turns)
+    return f"{instruction}\n{body}" if instruction else body
+
+
+def split_script_chunks(script_text: str, max_chars: int) -> List[str]:
+    """
+    Splits a script into chunks of about max_chars characters at speaker-turn boundaries.
+    The instruction line is repeated at the top of every chunk.
+    """
+    instruction, windows = split_script_turn_windows(script_text, max_chars)
+    return [format_script_chunk(instruction, window) for window in windows]
+
+
+def run_concurrently(jobs: List[Any], worker, max_concurrency: int, stop_event: Optional[threading.Event] = None, retries: int = TTS_WINDOW_RETRIES, status_callback=print, label: str = "Window") -> List[Any]:
+    """
+    Runs worker(job) for every job with at most max_concurrency jobs in flight.
+    A job that fails with a transient error (throttling, 5xx, timeout) is retried on its own,
+    so one failure does not redo the others; any other error is raised straight away.
+    Results are returned in job order.
+    """
+    def run(index: int, job: Any) -> Any:
+        for attempt in range(retries + 1):
+            if stop_event and stop_event.is_set():
+                raise GenerationStopped("Generation stopped by user.")
+            try:
+                return worker(job)
+            except Exception as e:
+                if attempt == retries or not is_transient_error(e):
+                    raise
+                status_callback(f"{label} {index + 1}/{len(jobs)} failed ({e}). Retrying...")
+
+    if not jobs:
+        return []
+    with ThreadPoolExecutor(max_workers=max(1, min(max_concurrency, len(jobs)))) as pool:
+        futures = [pool.submit(run, i, job) for i, job in enumerate(jobs)]
+        try:
+            return [future.result() for future in futures]
+        except Exception:
+            for future in futures:
+                future.cancel()
+            raise
+
+
+def split_script_instruction(script_text: str) -> Tuple[str, str]:
+    """
+    Splits a script into its leading instruction (the lines before the first
+    'Speaker: Text' line) and the dialogue that follows.
+    """
+    lines = script_text.splitlines()
+    for i, line in enumerate(lines):
+        if SPEAKER_LINE_PATTERN.match(line.strip()):
+            instruction = " ".join(l.strip() for l in lines[:i] if l.strip())
+            return instruction, "\n".join(lines[i:])
+    return "", script_text
+
+
+def parse_script_segments(script_text: str) -> List[Tuple[str, str]]:
+    """Splits a script into sanitized (speaker, text) turns, joining continuation lines."""
+    segments = []
+    current_speaker = None
+    current_text_lines = []
+
+    for raw_line in script_text.splitlines():
+        line = raw_line.strip()
+        if not line:
+            continue
+
+        match = SPEAKER_LINE_PATTERN.match(line)
+
+        if match:
+            # This is a new speaker line.
+            # First, save the previous speaker's collected text if it exists.
+            if current_speaker and current_text_lines:
+                full_text = " ".join(current_text_lines)
+                # Sanitize the joined text, then remove any newlines for ElevenLabs.
+                sanitized_text = sanitize_text(full_text).replace('\n', ' ').replace('\r', '')
+                if sanitized_text:
+                    segments.append((current_speaker, sanitized_text))
+
+            # Start the new speaker's block.
+            current_speaker = match.group(1).strip()
+            current_text_lines = [match.group(2).strip()]
+        elif current_speaker:
+            # This is a continuation of the current speaker's dialogue.
+            current_text_lines.append(line)
+
+    # After the loop, add the last speaker's segment if it exists.
+    if current_speaker and current_text_lines:
+        full_text = " ".join(current_text_lines)
+        sanitized_text = sanitize_text(full_text).replace('\n', ' ').replace('\r', '')
+        if sanitized_text:
+            segments.append((current_speaker, sanitized_text))
+    
+    return segments
+
+
+def fetch_elevenlabs_character_quota(api_key: str) -> Optional[Tuple[int, int]]:
+    """
+    Fetches the character quota from the ElevenLabs v1 API.
+    Returns (characters used, character limit), or None if the API did not answer. Network errors are raised.
+    """
+    resp = get_http_session("elevenlabs", api_key).get(f"{ELEVENLABS_API_URL}/user", timeout=10)
+    if resp.status_code != 200:
+        return None
+    sub = resp.json().get("subscription", {})
+    return sub.get("character_count", 0), sub.get("character_limit", 0)
+
+
+def count_elevenlabs_characters(script_text: str, speaker_mapping: Dict[str, Any], incremental: bool = False,
+                                previous_artifacts_dir: Optional[str] = None, cache: Optional[AudioCache] = None) -> int:
+    """
+    Returns the number of characters ElevenLabs will bill for a script: the sanitized text of the
+    mapped speakers' turns that will actually be sent. Mirrors generate(): an incremental
+    generation skips the turns unchanged since previous_artifacts_dir, otherwise the turns already
+    in cache are skipped (timestamped synthesis bypasses the cache).
+    """
+    turns = script_turn_specs(script_text, speaker_mapping, "elevenlabs")
+    if incremental:
+        _, reuse = plan_artifact_reuse(previous_artifacts_dir, "elevenlabs", turns)
+        return sum(len(turn["text"]) for turn, old_index in zip(turns, reuse) if old_index is None)
+    if cache and not ELEVENLABS_TIMESTAMPS:
+        return sum(len(turn["text"]) for turn in turns if not cache.contains(
+            AudioCache.make_key("elevenlabs", ELEVENLABS_DIALOGUE_MODEL, turn["voice"], turn["text"], extract_annotations(turn["text"]))))
+    return sum(len(turn["text"]) for turn in turns)
 
 
 def update_elevenlabs_quota(api_key: str, status_callback=print) -> Optional[str]:
@@ -326,14 +854,10 @@ def update_elevenlabs_quota(api_key: str, status_callback=print) -> Optional[str
     Returns a formatted quota string (e.g., "Remaining: X / Y characters") or None if unavailable.
     """
     try:
-        headers = {"xi-api-key": api_key}
-        resp = requests.get("https://api.elevenlabs.io/v1/user", headers=headers, timeout=10)
-        if resp.status_code != 200:
+        quota = fetch_elevenlabs_character_quota(api_key)
+        if quota is None:
             return None
-        data = resp.json()
-        sub = data.get("subscription", {})
-        used = sub.get("character_count", 0)
-        limit = sub.get("character_limit", 0)
+        used, limit = quota
         if limit > 0:
             remaining = max(0, limit - used)
             return f"Remaining: {remaining} / {limit} characters" # Removed "TTS Provider: ElevenLabs v3 -"
@@ -362,6 +886,133 @@ def _ffmpeg_convert_inline_audio_chunks(audio_chunks: List[bytes], mime_type: st
     return output_filepath
 
 
+class FFmpegStreamEncoder:
+    """
+    Encodes raw s16le PCM to an audio file while it is still being received.
+
+    FFmpeg is started with '-i pipe:0' when the first chunk arrives (its sample rate
+    comes from the chunk's mime type) and every chunk is written to its stdin straight
+    away, so encoding overlaps with the download and memory stays bounded.
+    """
+
+    STDERR_TAIL_BYTES = 64 * 1024
+
+    def __init__(self, output_filepath: str, status_callback=print):
+        self.output_filepath = output_filepath
+        self.status_callback = status_callback
+        self.process: Optional[subprocess.Popen] = None
+        self.mime_type = ""
+        self.bytes_written = 0
+        self._stderr = bytearray()
+        self._stderr_thread: Optional[threading.Thread] = None
+
+    def _start(self, mime_type: str) -> None:
+        ffmpeg_path = find_ffmpeg_path()
+        if not ffmpeg_path:
+            raise FileNotFoundError("FFmpeg executable not found.")
+        parameters = parse_audio_mime_type(mime_type)
+        command = [ffmpeg_path, "-y", "-f", "s16le", "-ar", str(parameters["rate"]), "-ac", "1", "-i", "pipe:0", self.output_filepath]
+        self.status_callback(f"Streaming audio to FFmpeg for {os.path.basename(self.output_filepath)}...")
+
+        creation_flags = 0 if sys.platform != "win32" else subprocess.CREATE_NO_WINDOW
+        self.process = subprocess.Popen(command, stdin=subprocess.PIPE, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, creationflags=creation_flags)
+        self.mime_type = mime_type
+        self.bytes_written = 0
+        self._stderr = bytearray()
+        # Drain stderr continuously so FFmpeg never blocks on a full pipe
+        self._stderr_thread = threading.Thread(target=self._drain_stderr, args=(self.process,), daemon=True)
+        self._stderr_thread.start()
+
+    def _drain_stderr(self, process: subprocess.Popen) -> None:
+        for line in iter(process.stderr.readline, b""):
+            self._stderr.extend(line)
+            if len(self._stderr) > self.STDERR_TAIL_BYTES:
+                del self._stderr[:-self.STDERR_TAIL_BYTES]
+
+    def _error_message(self) -> str:
+        lines = self._stderr.decode('utf-8', errors='ignore').strip().splitlines()
+        return lines[-1] if lines else "unknown error"
+
+    def write(self, data: bytes, mime_type: str) -> None:
+        if self.process is None:
+            self._start(mime_type)
+        try:
+            self.process.stdin.write(data)
+            self.bytes_written += len(data)
+        except (BrokenPipeError, OSError):
+            self._wait()
+            raise Exception(f"FFmpeg error during audio conversion: {self._error_message()}")
+
+    def _wait(self) -> int:
+        if self._stderr_thread:
+            self._stderr_thread.join(timeout=10)
+        return self.process.wait()
+
+    def close(self) -> str:
+        """Flushes the remaining audio and waits for FFmpeg to finish the file."""
+        if self.process is None:
+            raise Exception("No audio data was received for conversion.")
+        try:
+            self.process.stdin.close()
+        except (BrokenPipeError, OSError):
+            pass
+        returncode = self.process.wait()
+        if self._stderr_thread:
+            self._stderr_thread.join(timeout=10)
+        self.process = None
+        if returncode != 0:
+            raise Exception(f"FFmpeg error during audio conversion: {self._error_message()}")
+        return self.output_filepath
+
+    def abort(self) -> None:
+        """Stops FFmpeg and removes the partial output file."""
+        if self.process is None:
+            return
+        try:
+            self.process.stdin.close()
+        except (BrokenPipeError, OSError):
+            pass
+        self.process.kill()
+        self._wait()
+        self.process = None
+        if os.path.exists(self.output_filepath):
+            try:
+                os.remove(self.output_filepath)
+            except OSError:
+                pass
+
+
+def _ffmpeg_concat_audio_segments(segments: List[bytes], input_ext: str, output_filepath: str, status_callback=print) -> str:
+    """Joins encoded audio segments (e.g. per-turn MP3s) into a single file with the FFmpeg concat demuxer."""
+    ffmpeg_path = find_ffmpeg_path()
+    if not ffmpeg_path:
+        raise FileNotFoundError("FFmpeg executable not found.")
+
+    status_callback(f"Joining {len(segments)} audio segments into {os.path.basename(output_filepath)}...")
+    with tempfile.TemporaryDirectory(prefix="podcast_segments_") as tmp_dir:
+        list_path = os.path.join(tmp_dir, "segments.txt")
+        with open(list_path, "w", encoding="utf-8") as list_file:
+            for index, data in enumerate(segments):
+                segment_path = os.path.join(tmp_dir, f"segment_{index:05d}{input_ext}")
+                with open(segment_path, "wb") as f:
+                    f.write(data)
+                list_file.write(f"file '{segment_path}'\n")
+
+        same_format = os.path.splitext(output_filepath)[1].lower() == input_ext
+        command = [ffmpeg_path, "-y", "-f", "concat", "-safe", "0", "-i", list_path]
+        if same_format:
+            command += ["-c", "copy"]
+        command.append(output_filepath)
+
+        creation_flags = 0 if sys.platform != "win32" else subprocess.CREATE_NO_WINDOW
+        process = subprocess.run(command, capture_output=True, check=False, creationflags=creation_flags)
+
+    if process.returncode != 0:
+        ffmpeg_error = process.stderr.decode('utf-8', errors='ignore')
+        raise Exception(f"FFmpeg error while joining audio segments: {ffmpeg_error.strip().splitlines()[-1]}")
+    return output_filepath
+
+
 def validate_speakers(script_text: str, app_settings: Dict[str, Any]) -> Tuple[List[str], List[str]]:
     # Only extract speakers from lines that are actual speaker declarations
     # (not continuation lines within a dialogue block)
@@ -386,13 +1037,130 @@ def validate_speakers(script_text: str, app_settings: Dict[str, Any]) -> Tuple[L
     return missing_speakers, configured_speakers
 
 
-def generate(script_text: str, app_settings: dict, output_filepath: str, status_callback=print, api_key: Optional[str] = None, parent_window=None, stop_event: Optional[threading.Event] = None) -> str:
+TURN_MANIFEST_NAME = "turns.json"
+TURN_FILE_PATTERN = re.compile(r"^turn_(\d+)\.mp3$")
+
+
+def load_turn_artifacts(artifacts_dir: Optional[str]) -> Optional[Dict[str, Any]]:
+    """Reads the turn manifest written by a previous incremental generation, or returns None if there is none."""
+    if not artifacts_dir:
+        return None
+    try:
+        with open(os.path.join(artifacts_dir, TURN_MANIFEST_NAME), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+
+
+def plan_turn_reuse(old_turns: List[Dict[str, str]], new_turns: List[Dict[str, str]]) -> List[Optional[int]]:
+    """
+    Diffs two scripts at turn level. Returns, for each new turn, the index of the identical
+    old turn whose audio can be reused, or None if the turn was inserted or modified.
+    """
+    def signature(turn):
+        return (turn["speaker"], turn["text"], turn["voice"], turn.get("instruction", ""))
+
+    matcher = difflib.SequenceMatcher(a=[signature(t) for t in old_turns], b=[signature(t) for t in new_turns], autojunk=False)
+    reuse: List[Optional[int]] = [None] * len(new_turns)
+    for tag, i1, _, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            for offset in range(j2 - j1):
+                reuse[j1 + offset] = i1 + offset
+    return reuse
+
+
+def script_turn_specs(script_text: str, speaker_mapping: Dict[str, str], provider_name: str) -> List[Dict[str, str]]:
+    """The turns of a script as stored in the turn manifest (mapped speakers only, without their files)."""
+    instruction, _ = split_script_instruction(script_text)
+    return [
+        {"speaker": speaker, "text": text, "voice": speaker_mapping[speaker], "instruction": instruction if provider_name == "gemini" else ""}
+        for speaker, text in parse_script_segments(script_text) if speaker_mapping.get(speaker)
+    ]
+
+
+def plan_artifact_reuse(previous_artifacts_dir: Optional[str], provider_name: str, turns: List[Dict[str, str]]) -> Tuple[List[Dict[str, Any]], List[Optional[int]]]:
+    """
+    Runs plan_turn_reuse() against the turn manifest in previous_artifacts_dir, if it was written
+    by the same provider. Returns (the previous turns, the reuse plan of turns).
+    """
+    previous = load_turn_artifacts(previous_artifacts_dir)
+    if previous and previous.get("provider") == provider_name:
+        return previous["turns"], plan_turn_reuse(previous["turns"], turns)
+    return [], [None] * len(turns)
+
+
+def generate_incremental(provider: TTSProvider, provider_name: str, script_text: str, speaker_mapping: Dict[str, str], output_filepath: str, artifacts_dir: str, previous_artifacts_dir: Optional[str] = None, status_callback=print, stop_event: Optional[threading.Event] = None) -> str:
+    """
+    Generates the podcast one turn at a time and keeps each turn's MP3 in artifacts_dir.
+
+    If previous_artifacts_dir holds the artifacts of an earlier version of the script, only
+    inserted or modified turns are synthesized. The unchanged turns are reused as they are
+    and everything is joined at turn boundaries without re-encoding.
+    """
+    instruction, _ = split_script_instruction(script_text)
+    turns = script_turn_specs(script_text, speaker_mapping, provider_name)
+    if not turns:
+        raise ValueError("No valid dialogue segments found in the script. Ensure lines are in 'Speaker: Text' format.")
+
+    previous_turns, reuse = plan_artifact_reuse(previous_artifacts_dir, provider_name, turns)
+
+    # Read the reused audio first: artifacts_dir may be the previous directory itself
+    segments: List[Optional[bytes]] = []
+    for old_index in reuse:
+        if old_index is None:
+            segments.append(None)
+            continue
+        with open(os.path.join(previous_artifacts_dir, previous_turns[old_index]["file"]), "rb") as f:
+            segments.append(f.read())
+
+    missing = [i for i, segment in enumerate(segments) if segment is None]
+    status_callback(f"Incremental generation: {len(turns) - len(missing)} turn(s) unchanged, {len(missing)} to synthesize.")
+    if missing:
+        generated = provider.synthesize_turns([(turns[i]["speaker"], turns[i]["text"]) for i in missing], instruction, speaker_mapping, status_callback, stop_event)
+        for i, audio in zip(missing, generated):
+            segments[i] = audio
+
+    if stop_event and stop_event.is_set():
+        raise GenerationStopped("Generation stopped by user.")
+    os.makedirs(artifacts_dir, exist_ok=True)
+    for index, (turn, audio) in enumerate(zip(turns, segments)):
+        turn["file"] = f"turn_{index:04d}.mp3"
+        with open(os.path.join(artifacts_dir, turn["file"]), "wb") as f:
+            f.write(audio)
+    manifest_path = os.path.join(artifacts_dir, TURN_MANIFEST_NAME)
+    with open(manifest_path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump({"provider": provider_name, "format": "mp3", "turns": turns}, f, indent=2)
+    os.replace(manifest_path + ".tmp", manifest_path)
+    # Drop the files of turns that no longer exist (other files, e.g. copied by hand, are left alone)
+    for filename in os.listdir(artifacts_dir):
+        match = TURN_FILE_PATTERN.match(filename)
+        if match and int(match.group(1)) >= len(turns):
+            os.remove(os.path.join(artifacts_dir, filename))
+
+    _ffmpeg_concat_audio_segments(segments, ".mp3", output_filepath, status_callback)
+    status_callback(f"File saved successfully: {output_filepath}")
+    provider._write_mp3_timeline(output_filepath, [[(turn["speaker"], turn["text"])] for turn in turns], segments, status_callback)
+    return output_filepath
+
+
+def create_provider(provider_name: str, api_key: str) -> TTSProvider:
+    """Builds the TTS provider for the given name. The provider can be reused for several generations."""
+    ProviderClass = ElevenLabsTTS if provider_name == "elevenlabs" else GeminiTTS
+    return ProviderClass(api_key=api_key, cache=get_default_audio_cache())
+
+
+def generate(script_text: str, app_settings: dict, output_filepath: str, status_callback=print, api_key: Optional[str] = None, parent_window=None, stop_event: Optional[threading.Event] = None, provider: Optional[TTSProvider] = None, artifacts_dir: Optional[str] = None, previous_artifacts_dir: Optional[str] = None) -> str:
+    """
+    Generates the podcast audio for a script.
+    With artifacts_dir, turns are synthesized separately and kept there, so that a later
+    call with previous_artifacts_dir set to that directory only re-synthesizes changed turns.
+    """
     logger = logging.getLogger("PodcastGenerator")
     logger.info("Starting generation function.")
     status_callback("Starting podcast generation...")
 
     if stop_event and stop_event.is_set():
-        raise Exception("Generation stopped by user before starting.")
+        raise GenerationStopped("Generation stopped by user before starting.")
 
     # Removed sanitize_script_text here
     if not find_ffmpeg_path():
@@ -403,7 +1171,7 @@ def generate(script_text: str, app_settings: dict, output_filepath: str, status_
         os.makedirs(output_dir, exist_ok=True)
 
     provider_name = app_settings.get("tts_provider", "elevenlabs").lower()
-    if not api_key:
+    if not api_key and not provider:
         api_key = get_api_key(status_callback, logger, parent_window=parent_window, service=provider_name)
         if not api_key:
             raise ValueError("API key is required but was not provided.")
@@ -411,13 +1179,132 @@ def generate(script_text: str, app_settings: dict, output_filepath: str, status_
     speaker_mapping_key = "speaker_voices_elevenlabs" if provider_name == "elevenlabs" else "speaker_voices"
     speaker_mapping = app_settings.get(speaker_mapping_key, {})
     
-    ProviderClass = ElevenLabsTTS if provider_name == "elevenlabs" else GeminiTTS
-    provider = ProviderClass(api_key=api_key)
-    
+    # A provider passed by the caller (e.g. batch mode) keeps its clients between generations
+    if provider is None:
+        provider = create_provider(provider_name, api_key)
+
+    if artifacts_dir:
+        return generate_incremental(provider, provider_name, script_text, speaker_mapping, output_filepath, artifacts_dir, previous_artifacts_dir, status_callback=status_callback, stop_event=stop_event)
+
     # Pass the original script_text to synthesize
     return provider.synthesize(script_text=script_text, speaker_mapping=speaker_mapping, output_filepath=output_filepath, status_callback=status_callback, stop_event=stop_event)
 
 
+def load_batch_items(batch_path: str, default_provider: str, default_speakers: Optional[Dict[str, str]] = None, output_dir: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    Reads the items of a batch run from a JSON Lines manifest or a directory of .txt scripts.
+
+    Each manifest line is an object with "script" (path to a script file, relative to the
+    manifest) or "script_text", and optional "output", "provider" and "speakers" keys.
+    Outputs default to the script name with an .mp3 extension, in output_dir if given.
+    """
+    default_speakers = default_speakers or {}
+    entries = []
+    if os.path.isdir(batch_path):
+        base_dir = batch_path
+        for filename in sorted(os.listdir(batch_path)):
+            if filename.lower().endswith(".txt"):
+                entries.append({"script": filename})
+    else:
+        base_dir = os.path.dirname(os.path.abspath(batch_path))
+        with open(batch_path, 'r', encoding='utf-8') as f:
+            for line_number, line in enumerate(f, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError as e:
+                    raise ValueError(f"Invalid JSON on line {line_number} of {batch_path}: {e}")
+                if not isinstance(entry, dict) or not (entry.get("script") or entry.get("script_text")):
+                    raise ValueError(f"Line {line_number} of {batch_path} needs a 'script' or 'script_text' key.")
+                entries.append(entry)
+
+    items = []
+    for index, entry in enumerate(entries, start=1):
+        if entry.get("script"):
+            script_path = os.path.join(base_dir, entry["script"])
+            with open(script_path, 'r', encoding='utf-8') as f:
+                script_text = f.read()
+            name = os.path.splitext(os.path.basename(script_path))[0]
+            default_output = os.path.splitext(script_path)[0] + ".mp3"
+        else:
+            script_text = entry["script_text"]
+            name = f"item_{index:03d}"
+            default_output = os.path.join(base_dir, f"{name}.mp3")
+
+        if entry.get("output"):
+            output_filepath = os.path.join(output_dir or base_dir, entry["output"])
+        elif output_dir:
+            output_filepath = os.path.join(output_dir, os.path.basename(default_output))
+        else:
+            output_filepath = default_output
+
+        provider_name = entry.get("provider", default_provider).lower()
+        speakers = {**default_speakers, **entry.get("speakers", {})}
+        app_settings = {"tts_provider": provider_name}
+        app_settings["speaker_voices_elevenlabs" if provider_name == "elevenlabs" else "speaker_voices"] = speakers
+        items.append({"name": name, "script_text": script_text, "output_filepath": output_filepath, "app_settings": app_settings})
+    return items
+
+
+def run_batch(items: List[Dict[str, Any]], api_keys: Dict[str, str], max_workers: int = BATCH_MAX_WORKERS, status_callback=print, stop_event: Optional[threading.Event] = None) -> List[Dict[str, Any]]:
+    """
+    Generates every batch item in this process with a bounded pool of workers.
+
+    One provider (and so one set of API clients) is built per TTS provider and shared by
+    all items. A failing item does not stop the others. Returns one result per item, in
+    item order, with its status, output path, duration in seconds and error message.
+    """
+    providers = {}
+    for item in items:
+        provider_name = item["app_settings"]["tts_provider"]
+        if provider_name not in providers:
+            providers[provider_name] = create_provider(provider_name, api_keys[provider_name])
+
+    def run_item(item):
+        item_callback = lambda message: status_callback(f"[{item['name']}] {message}")
+        result = {"name": item["name"], "output": item["output_filepath"], "status": "completed", "seconds": 0.0, "error": None}
+        start = time.monotonic()
+        try:
+            missing_speakers, _ = validate_speakers(item["script_text"], item["app_settings"])
+            if missing_speakers:
+                raise ValueError(f"Missing voice configuration for speakers: {', '.join(missing_speakers)}")
+            generate(
+                script_text=item["script_text"],
+                app_settings=item["app_settings"],
+                output_filepath=item["output_filepath"],
+                status_callback=item_callback,
+                stop_event=stop_event,
+                provider=providers[item["app_settings"]["tts_provider"]]
+            )
+        except Exception as e:
+            result["status"] = "failed"
+            result["error"] = str(e)
+            item_callback(f"Failed: {e}")
+        result["seconds"] = round(time.monotonic() - start, 2)
+        return result
+
+    results = [None] * len(items)
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        futures = {executor.submit(run_item, item): index for index, item in enumerate(items)}
+        for future in as_completed(futures):
+            results[futures[future]] = future.result()
+    return results
+
+
+def format_batch_report(results: List[Dict[str, Any]], elapsed_seconds: float) -> str:
+    """Formats a summary of a batch run: one line per item, then the totals."""
+    lines = ["", "--- Batch summary ---"]
+    for result in results:
+        if result["status"] == "completed":
+            lines.append(f"OK      {result['seconds']:8.1f}s  {result['name']} -> {result['output']}")
+        else:
+            lines.append(f"FAILED  {result['seconds']:8.1f}s  {result['name']}: {result['error']}")
+    failed = sum(1 for result in results if result["status"] != "completed")
+    lines.append(f"{len(results) - failed} succeeded, {failed} failed, {elapsed_seconds:.1f}s total.")
+    return "\n".join(lines)
+
+
 def parse_audio_mime_type(mime_type: str) -> Dict[str, int]:
     rate = 24000
     for param in mime_type.split(';'):
@@ -460,8 +1347,40 @@ if __name__ == "__main__":
     parser.add_argument("-o", "--output", dest="output_filepath", help="Path to save the output audio file.")
     parser.add_argument("--provider", choices=["elevenlabs", "gemini"], default="elevenlabs", help="TTS provider to use.")
     parser.add_argument("--speaker", action="append", help='Assign a voice to a speaker. Format: "SpeakerName:VoiceNameOrID".')
+    parser.add_argument("--batch", help="Generate every item of a JSON Lines manifest or every .txt script of a directory. With --batch, -o is the output directory.")
+    parser.add_argument("--jobs", type=int, default=BATCH_MAX_WORKERS, help=f"Number of episodes generated at once in batch mode (default: {BATCH_MAX_WORKERS}).")
+    parser.add_argument("--report", help="Write the batch summary as JSON to this file.")
+    parser.add_argument("--artifacts", help="Keep per-turn audio in this directory so a corrected script can be re-generated incrementally.")
+    parser.add_argument("--previous-artifacts", help="Per-turn audio of an earlier version of the script; only changed turns are synthesized.")
     args = parser.parse_args()
 
+    if args.batch:
+        default_speakers = {}
+        for speaker_arg in args.speaker or []:
+            name, voice = speaker_arg.split(":", 1)
+            default_speakers[name.strip()] = voice.strip()
+        try:
+            items = load_batch_items(args.batch, args.provider, default_speakers, output_dir=args.output_filepath)
+        except (OSError, ValueError) as e:
+            sys.exit(f"Error: Could not read batch '{args.batch}': {e}")
+        if not items:
+            sys.exit(f"Error: No scripts found in '{args.batch}'.")
+
+        # Look up each provider's key once, before any worker starts
+        api_keys = {}
+        for provider_name in sorted({item["app_settings"]["tts_provider"] for item in items}):
+            api_keys[provider_name] = get_api_key(print, logger, service=provider_name)
+            if not api_keys[provider_name]:
+                sys.exit(f"API key for {provider_name} is required. Exiting.")
+
+        batch_start = time.monotonic()
+        results = run_batch(items, api_keys, max_workers=args.jobs)
+        print(format_batch_report(results, time.monotonic() - batch_start))
+        if args.report:
+            with open(args.report, 'w', encoding='utf-8') as f:
+                json.dump(results, f, indent=2)
+        sys.exit(1 if any(result["status"] != "completed" for result in results) else 0)
+
     if not args.script_filepath and not args.script_text:
         parser.error("Either script_filepath or --script-text is required.")
 
@@ -496,6 +1415,7 @@ if __name__ == "__main__":
         if not api_key:
             sys.exit("API key is required. Exiting.")
 
-        generate(script_text=script_text, app_settings=app_settings, output_filepath=output_filepath, status_callback=print, api_key=api_key)
+        artifacts_dir = args.artifacts or args.previous_artifacts
+        generate(script_text=script_text, app_settings=app_settings, output_filepath=output_filepath, status_callback=print, api_key=api_key, artifacts_dir=artifacts_dir, previous_artifacts_dir=args.previous_artifacts)
     except Exception as e:
         sys.exit(f"\n--- A CRITICAL ERROR OCCURRED ---\n{e}")
@@ -38,8 +38,9 @@ except ImportError:
 from about_window import AboutWindow
 from api_keys_window import APIKeysWindow
 from generate_podcast import validate_speakers, update_elevenlabs_quota
+from clients import ELEVENLABS_API_URL, get_http_session
 from utils import get_asset_path, sanitize_app_settings_for_backend, find_ffplay_path, get_app_data_dir, sanitize_text
-from create_demo import create_html_demo_whisperx
+from create_demo import create_html_demo, has_word_timings
 from config import AVAILABLE_VOICES, DEFAULT_APP_SETTINGS, DEMO_AVAILABLE
 
 # --- Versioning ---
@@ -153,7 +154,7 @@ class PodcastGeneratorApp:
         # (potentially heavy and problematic) library just for a check.
         spec = importlib.util.find_spec("whisperx")
         if spec is None:
-            self.logger.warning("WhisperX library not found. Demo generation will be disabled.")
+            self.logger.warning("WhisperX library not found. Demos are only available for audio with saved word timings.")
             return False
         else:
             self.logger.info("WhisperX installation found. Demo generation is enabled.")
@@ -1121,7 +1122,8 @@ class PodcastGeneratorApp:
         self._configure_button_state(self.show_button, enabled=can_use_last_file)
         self._configure_button_state(self.play_button, enabled=(can_use_last_file and self.ffplay_path))
 
-        can_generate_demo = self.is_whisperx_available and can_use_last_file
+        # Demos of files with saved word timings do not need WhisperX
+        can_generate_demo = can_use_last_file and (self.is_whisperx_available or has_word_timings(self.last_generated_filepath))
         if HAS_CTK_MENUBAR:
             self.update_demo_menu_state_ctk(can_generate_demo)
         else:
@@ -1181,7 +1183,7 @@ class PodcastGeneratorApp:
                 temp_script_file = f.name
 
             # Call the function from create_demo
-            create_html_demo_whisperx(
+            create_html_demo(
                 script_filepath=temp_script_file,
                 audio_filepath=audio_filepath,
                 title=title,
@@ -1196,8 +1198,8 @@ class PodcastGeneratorApp:
         finally:
             # Re-enable the button on the main thread
             if self.root.winfo_exists():
-                can_generate_demo = self.is_whisperx_available and self.last_generated_filepath and os.path.exists(
-                    self.last_generated_filepath)
+                can_generate_demo = self.last_generated_filepath and os.path.exists(self.last_generated_filepath) and (
+                    self.is_whisperx_available or has_word_timings(self.last_generated_filepath))
 
                 if HAS_CTK_MENUBAR:
                     self.root.after(0, lambda: self.update_demo_menu_state_ctk(can_generate_demo))
@@ -1505,10 +1507,9 @@ class PodcastGeneratorApp:
                     self.elevenlabs_voices_cache = []
                     return
 
-                headers = {"xi-api-key": key}
                 # Increase timeout on macOS ARM to avoid connection issues
                 timeout = 20 if sys.platform == "darwin" else 15
-                resp = requests.get("https://api.elevenlabs.io/v1/voices", headers=headers, timeout=timeout)
+                resp = get_http_session("elevenlabs", key).get(f"{ELEVENLABS_API_URL}/voices", timeout=timeout)
 
                 if resp.status_code != 200:
                     self.elevenlabs_voices_cache = []
@@ -0,0 +1,20 @@
+"""
+Gunicorn settings of the Docker image (gunicorn --config gunicorn.conf.py app:app).
+
+Every generation keeps two responses open until it ends: its progress events
+(/api/events/<task_id>) and its audio stream (/api/stream/<task_id>). gunicorn's default
+sync worker serves one request at a time, so one generation would block every other
+request, and the 30 s worker timeout would kill the worker, and the generation threads
+running in it, in the middle of the job. Threaded workers serve each request on its own
+thread, and their timeout only watches the worker's main loop, not how long a response lasts.
+"""
+import os
+
+bind = os.getenv("GUNICORN_BIND", "0.0.0.0:8000")
+worker_class = "gthread"
+# Jobs are shared through SQLite, so several workers are possible, but one is enough for most setups
+workers = int(os.getenv("GUNICORN_WORKERS", "1"))
+# Each generation watched in a browser takes two threads for its whole duration
+threads = int(os.getenv("GUNICORN_THREADS", "32"))
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "120"))
+graceful_timeout = 30
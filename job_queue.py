@@ -0,0 +1,311 @@
+import json
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger("PodcastGenerator")
+
+# A running job whose worker has not sent a heartbeat for this long is considered orphaned
+# (its process crashed or was restarted) and is put back in the queue.
+HEARTBEAT_INTERVAL = 5.0
+STALE_AFTER = 60.0
+FINISHED_STATUSES = ('completed', 'failed', 'cancelled')
+
+
+class JobCancelled(Exception):
+    """Raised by a job handler when it stopped because a stop was requested."""
+
+
+class JobStore:
+    """
+    SQLite-backed job store shared by every process of the web service.
+
+    A job goes through 'queued' -> 'running' (-> 'stopping') -> 'completed' | 'failed' | 'cancelled'.
+    Payloads and results are stored as JSON.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        db_dir = os.path.dirname(db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    kind TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    result TEXT,
+                    error TEXT,
+                    stop_requested INTEGER NOT NULL DEFAULT 0,
+                    worker TEXT,
+                    created_at REAL NOT NULL,
+                    started_at REAL,
+                    finished_at REAL,
+                    heartbeat_at REAL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_queue ON jobs (kind, status, created_at)")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS job_events (
+                    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                    job_id TEXT NOT NULL,
+                    message TEXT NOT NULL,
+                    created_at REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_job_events ON job_events (job_id, seq)")
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _row_to_job(row: sqlite3.Row) -> Dict[str, Any]:
+        job = dict(row)
+        job['payload'] = json.loads(job['payload'])
+        job['result'] = json.loads(job['result']) if job['result'] else None
+        job['stop_requested'] = bool(job['stop_requested'])
+        return job
+
+    def create(self, kind: str, payload: Dict[str, Any], job_id: Optional[str] = None, admit: Optional[Callable[[], None]] = None) -> str:
+        """
+        Queues a new job. If given, admit() runs first inside the same write transaction and may
+        raise to reject the job: no other process can queue a job in between, so a check of the
+        jobs already queued (e.g. a quota budget) cannot be raced by another web worker.
+        """
+        job_id = job_id or str(uuid.uuid4())
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                if admit:
+                    admit()
+                conn.execute(
+                    "INSERT INTO jobs (id, kind, status, payload, created_at) VALUES (?, ?, 'queued', ?, ?)",
+                    (job_id, kind, json.dumps(payload), time.time())
+                )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        return job_id
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._row_to_job(row) if row else None
+
+    def claim_next(self, kind: str, worker_id: str) -> Optional[Dict[str, Any]]:
+        """Atomically moves the oldest queued job of this kind to 'running' for the given worker."""
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                # Recover jobs orphaned by a crashed or restarted worker
+                conn.execute(
+                    "UPDATE jobs SET status = 'cancelled', error = 'Cancelled by user.', finished_at = ? "
+                    "WHERE kind = ? AND status = 'stopping' AND heartbeat_at < ?",
+                    (now, kind, now - STALE_AFTER)
+                )
+                conn.execute(
+                    "UPDATE jobs SET status = 'queued', worker = NULL "
+                    "WHERE kind = ? AND status = 'running' AND heartbeat_at < ?",
+                    (kind, now - STALE_AFTER)
+                )
+                row = conn.execute(
+                    "SELECT * FROM jobs WHERE kind = ? AND status = 'queued' ORDER BY created_at LIMIT 1",
+                    (kind,)
+                ).fetchone()
+                if row:
+                    conn.execute(
+                        "UPDATE jobs SET status = 'running', worker = ?, started_at = ?, heartbeat_at = ? WHERE id = ?",
+                        (worker_id, now, now, row['id'])
+                    )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        if not row:
+            return None
+        return self.get(row['id'])
+
+    def heartbeat(self, worker_id: str) -> None:
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET heartbeat_at = ? WHERE worker = ? AND status IN ('running', 'stopping')",
+                (time.time(), worker_id)
+            )
+
+    def stop_requested_ids(self, worker_id: str) -> set:
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT id FROM jobs WHERE worker = ? AND stop_requested = 1 AND status IN ('running', 'stopping')",
+                (worker_id,)
+            ).fetchall()
+        return {row['id'] for row in rows}
+
+    def request_stop(self, job_id: str) -> Optional[str]:
+        """
+        Asks a job to stop. A queued job is cancelled straight away; a running job is
+        flagged and moves to 'stopping' until its worker notices.
+        Returns the job's previous status, or None if the job does not exist.
+        """
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute("SELECT status FROM jobs WHERE id = ?", (job_id,)).fetchone()
+                if row and row['status'] == 'queued':
+                    conn.execute(
+                        "UPDATE jobs SET status = 'cancelled', error = 'Cancelled by user.', stop_requested = 1, finished_at = ? WHERE id = ?",
+                        (time.time(), job_id)
+                    )
+                elif row and row['status'] == 'running':
+                    conn.execute("UPDATE jobs SET status = 'stopping', stop_requested = 1 WHERE id = ?", (job_id,))
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        return row['status'] if row else None
+
+    def finish(self, job_id: str, status: str, result: Optional[Dict[str, Any]] = None, error: Optional[str] = None) -> None:
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = ? WHERE id = ?",
+                (status, json.dumps(result) if result is not None else None, error, time.time(), job_id)
+            )
+
+    def unfinished_or_finished_since(self, kind: str, since: float) -> List[Dict[str, Any]]:
+        """Returns the jobs of this kind that are still queued or running, or finished at or after `since`."""
+        with self._connect() as conn:
+            rows = conn.execute(
+                f"SELECT * FROM jobs WHERE kind = ? AND (status NOT IN ({','.join('?' * len(FINISHED_STATUSES))}) OR finished_at >= ?)",
+                (kind, *FINISHED_STATUSES, since)
+            ).fetchall()
+        return [self._row_to_job(row) for row in rows]
+
+    def add_event(self, job_id: str, message: str) -> None:
+        """Records a progress message for a job (e.g. a status_callback message)."""
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO job_events (job_id, message, created_at) VALUES (?, ?, ?)",
+                (job_id, message, time.time())
+            )
+
+    def get_events(self, job_id: str, after_seq: int = 0) -> List[Dict[str, Any]]:
+        """Returns the job's progress messages recorded after the given sequence number, oldest first."""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT seq, message, created_at FROM job_events WHERE job_id = ? AND seq > ? ORDER BY seq",
+                (job_id, after_seq)
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def prune(self, max_age_seconds: float) -> int:
+        """Deletes finished jobs older than max_age_seconds. Returns the number of jobs removed."""
+        with self._connect() as conn:
+            cursor = conn.execute(
+                f"DELETE FROM jobs WHERE status IN ({','.join('?' * len(FINISHED_STATUSES))}) AND finished_at < ?",
+                (*FINISHED_STATUSES, time.time() - max_age_seconds)
+            )
+            conn.execute("DELETE FROM job_events WHERE job_id NOT IN (SELECT id FROM jobs)")
+            return cursor.rowcount
+
+
+class WorkerPool:
+    """
+    Fixed-size pool of worker threads that run the queued jobs of one kind.
+
+    Several pools (in one or many processes) can share a JobStore; each job is claimed
+    by exactly one worker. The handler is called as handler(job, stop_event) and returns
+    the job's result dict. It raises JobCancelled when it stopped on request, and any
+    other exception marks the job as failed.
+    """
+
+    def __init__(self, store: JobStore, kind: str, handler: Callable[[Dict[str, Any], threading.Event], Optional[Dict[str, Any]]], size: int = 2, poll_interval: float = 0.5):
+        self.store = store
+        self.kind = kind
+        self.handler = handler
+        self.size = max(1, size)
+        self.poll_interval = poll_interval
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{kind}:{uuid.uuid4().hex[:8]}"
+        self._wakeup = threading.Event()
+        self._shutdown = threading.Event()
+        self._stop_events: Dict[str, threading.Event] = {}
+        self._lock = threading.Lock()
+        self._threads = []
+
+    def start(self) -> None:
+        if self._threads:
+            return
+        for i in range(self.size):
+            thread = threading.Thread(target=self._work_loop, name=f"{self.kind}-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        monitor = threading.Thread(target=self._monitor_loop, name=f"{self.kind}-monitor", daemon=True)
+        monitor.start()
+        self._threads.append(monitor)
+
+    def shutdown(self) -> None:
+        self._shutdown.set()
+        self._wakeup.set()
+
+    def submit(self, payload: Dict[str, Any], job_id: Optional[str] = None, admit: Optional[Callable[[], None]] = None) -> str:
+        job_id = self.store.create(self.kind, payload, job_id=job_id, admit=admit)
+        self._wakeup.set()
+        return job_id
+
+    def _work_loop(self) -> None:
+        while not self._shutdown.is_set():
+            try:
+                job = self.store.claim_next(self.kind, self.worker_id)
+            except sqlite3.Error as e:
+                logger.error(f"Job store error while claiming a {self.kind} job: {e}")
+                job = None
+            if not job:
+                self._wakeup.wait(self.poll_interval)
+                self._wakeup.clear()
+                continue
+            self._run(job)
+
+    def _run(self, job: Dict[str, Any]) -> None:
+        stop_event = threading.Event()
+        with self._lock:
+            self._stop_events[job['id']] = stop_event
+        try:
+            result = self.handler(job, stop_event)
+            self.store.finish(job['id'], 'completed', result=result)
+        except JobCancelled as e:
+            self.store.finish(job['id'], 'cancelled', error=str(e) or 'Cancelled by user.')
+        except Exception as e:
+            self.store.finish(job['id'], 'failed', error=str(e))
+        finally:
+            with self._lock:
+                self._stop_events.pop(job['id'], None)
+
+    def _monitor_loop(self) -> None:
+        """Sends heartbeats for running jobs and relays stop requests written by any process."""
+        while not self._shutdown.wait(min(HEARTBEAT_INTERVAL, self.poll_interval * 2)):
+            with self._lock:
+                active = dict(self._stop_events)
+            if not active:
+                continue
+            try:
+                self.store.heartbeat(self.worker_id)
+                for job_id in self.store.stop_requested_ids(self.worker_id):
+                    if job_id in active:
+                        active[job_id].set()
+            except sqlite3.Error as e:
+                logger.error(f"Job store error in {self.kind} monitor: {e}")
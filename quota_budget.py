@@ -0,0 +1,106 @@
+import logging
+import threading
+import time
+from typing import Callable, Optional, Tuple
+
+from config import QUOTA_BUDGET_TTL
+from job_queue import JobStore
+
+logger = logging.getLogger("PodcastGenerator")
+
+
+class QuotaExceededError(Exception):
+    """Raised when a job needs more characters than the provider quota has left."""
+
+    def __init__(self, needed: int, available: int, reserved: int):
+        self.needed = needed
+        self.available = available
+        self.reserved = reserved
+        message = f"Not enough ElevenLabs characters left: this script needs {needed:,} but only {available:,} remain"
+        if reserved:
+            message += f" ({reserved:,} are reserved by generations in progress)"
+        super().__init__(message + ". Shorten the script or wait for your quota to reset.")
+
+
+class CharacterBudget:
+    """
+    Remaining character budget of a provider account, checked before a job is queued.
+
+    The account quota is fetched lazily and cached for `ttl` seconds. The characters of
+    jobs that are queued, running, or finished since that fetch are deducted from it.
+    They are read from the shared job store (the 'characters' of each job payload), so
+    every web worker sees the same budget. Use admission() with JobStore.create() so the
+    check and the queuing of the job happen in one transaction across workers.
+    """
+
+    def __init__(self, fetch_quota: Callable[[], Optional[Tuple[int, int]]], job_store: JobStore, kind: str = "generate", provider: str = "elevenlabs", ttl: float = QUOTA_BUDGET_TTL):
+        self.fetch_quota = fetch_quota
+        self.job_store = job_store
+        self.kind = kind
+        self.provider = provider
+        self.ttl = ttl
+        self._quota: Optional[Tuple[int, float]] = None  # (remaining, fetched_at)
+        self._lock = threading.Lock()
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._quota = None
+
+    def _remaining_at_fetch(self) -> Optional[Tuple[int, float]]:
+        now = time.time()
+        if self._quota and now - self._quota[1] < self.ttl:
+            return self._quota
+        try:
+            quota = self.fetch_quota()
+        except Exception as e:
+            logger.warning(f"Could not refresh the {self.provider} quota: {e}")
+            return self._quota
+        if not quota or quota[1] <= 0:
+            return None
+        used, limit = quota
+        self._quota = (max(0, limit - used), now)
+        return self._quota
+
+    def _reserved_since(self, fetched_at: float) -> int:
+        reserved = 0
+        for job in self.job_store.unfinished_or_finished_since(self.kind, fetched_at):
+            if job['payload'].get('app_settings', {}).get('tts_provider') != self.provider:
+                continue
+            if job['status'] == 'cancelled' and not job['started_at']:
+                continue  # Cancelled before any request was made
+            reserved += job['payload'].get('characters', 0)
+        return reserved
+
+    def available(self) -> Optional[Tuple[int, int]]:
+        """Returns (characters available, characters reserved by recent jobs), or None if the quota is unknown."""
+        with self._lock:
+            quota = self._remaining_at_fetch()
+        if quota is None:
+            return None
+        remaining, fetched_at = quota
+        reserved = self._reserved_since(fetched_at)
+        return max(0, remaining - reserved), reserved
+
+    def admission(self, characters: int) -> Callable[[], None]:
+        """
+        Returns the check of a job of this many characters, raising QuotaExceededError if it does
+        not fit, for JobStore.create(admit=...). The quota is fetched now, outside the store's
+        write transaction; only the jobs already admitted are read inside it.
+        """
+        with self._lock:
+            quota = self._remaining_at_fetch()
+
+        def admit() -> None:
+            if quota is None:
+                # Unknown quota (API unreachable, unlimited plan): let the provider decide
+                return
+            remaining, fetched_at = quota
+            reserved = self._reserved_since(fetched_at)
+            available = max(0, remaining - reserved)
+            if characters > available:
+                raise QuotaExceededError(characters, available, reserved)
+        return admit
+
+    def check(self, characters: int) -> None:
+        """Raises QuotaExceededError if a job of this many characters does not fit in the budget."""
+        self.admission(characters)()
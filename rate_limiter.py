@@ -0,0 +1,181 @@
+import random
+import re
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from config import (
+    ELEVENLABS_REQUESTS_PER_MINUTE,
+    GEMINI_REQUESTS_PER_MINUTE,
+    RATE_LIMIT_MAX_WAIT,
+    RATE_LIMIT_RETRIES,
+    TTS_MAX_CONCURRENCY,
+)
+
+# Additive increase / multiplicative decrease of the request rate
+RATE_DECREASE_FACTOR = 0.5
+RATE_INCREASE_STEP = 0.05
+MIN_REQUESTS_PER_MINUTE = 1.0
+BACKOFF_BASE = 2.0
+
+PROVIDER_REQUESTS_PER_MINUTE = {
+    "gemini": GEMINI_REQUESTS_PER_MINUTE,
+    "elevenlabs": ELEVENLABS_REQUESTS_PER_MINUTE,
+}
+
+RETRY_DELAY_PATTERN = re.compile(r"retryDelay['\"]?\s*:\s*['\"]?(\d+(?:\.\d+)?)s")
+
+# Timeout and dropped-connection errors of the HTTP clients used by the provider SDKs
+# (requests, httpx), matched by class name so none of them has to be imported here
+TRANSIENT_ERROR_NAMES = {"Timeout", "ReadTimeout", "ConnectTimeout", "TimeoutException", "ConnectionError", "ConnectError", "ReadError", "RemoteProtocolError"}
+
+
+class GenerationStopped(Exception):
+    """Raised when the user stops a generation. Never retried."""
+
+
+class AdaptiveRateLimiter:
+    """
+    Token bucket shared by every request made to one provider with one API key.
+
+    The rate is halved each time the provider throttles us, and everyone waits out
+    the provider's Retry-After. It then creeps back up to the configured rate as
+    requests succeed again.
+    """
+
+    def __init__(self, requests_per_minute: float, burst: int = 1, min_requests_per_minute: float = MIN_REQUESTS_PER_MINUTE):
+        self.max_rate = requests_per_minute / 60.0
+        self.min_rate = min(min_requests_per_minute, requests_per_minute) / 60.0
+        self.rate = self.max_rate
+        self.capacity = float(max(1, burst))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self, stop_event: Optional[threading.Event] = None) -> None:
+        """Blocks until a request may be sent."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if now >= self.paused_until and self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = max(self.paused_until - now, (1 - self.tokens) / self.rate)
+            if stop_event:
+                if stop_event.wait(wait):
+                    raise GenerationStopped("Generation stopped by user.")
+            else:
+                time.sleep(wait)
+
+    def on_success(self) -> None:
+        with self._lock:
+            self.rate = min(self.max_rate, self.rate + self.max_rate * RATE_INCREASE_STEP)
+
+    def on_throttle(self, retry_after: Optional[float] = None) -> None:
+        with self._lock:
+            self.rate = max(self.min_rate, self.rate * RATE_DECREASE_FACTOR)
+            self.tokens = 0.0
+            if retry_after:
+                self.paused_until = max(self.paused_until, time.monotonic() + retry_after)
+
+
+def get_throttle_info(error: Exception) -> Tuple[bool, Optional[float]]:
+    """
+    Tells whether an SDK error means the provider throttled us (HTTP 429 / RESOURCE_EXHAUSTED)
+    and, if it said so, how many seconds to wait before retrying.
+    """
+    status = getattr(error, "status_code", None) or getattr(error, "code", None)
+    if status != 429 and "RESOURCE_EXHAUSTED" not in str(error):
+        return False, None
+
+    retry_after = None
+    headers = getattr(error, "headers", None) or {}
+    for name, value in dict(headers).items():
+        if name.lower() == "retry-after":
+            try:
+                retry_after = float(value)
+            except (TypeError, ValueError):
+                pass
+    if retry_after is None:
+        # Gemini reports the delay in a RetryInfo detail, e.g. "retryDelay": "31s"
+        match = RETRY_DELAY_PATTERN.search(f"{getattr(error, 'details', '')} {error}")
+        if match:
+            retry_after = float(match.group(1))
+    return True, retry_after
+
+
+def is_transient_error(error: Exception) -> bool:
+    """
+    Tells whether an error is worth retrying: throttling (HTTP 429), a provider server error
+    (5xx), or a timeout or dropped connection. Wrapped errors are checked through their cause.
+    Anything else (invalid key, unknown voice, other 4xx, stop requests) is permanent.
+    """
+    seen = set()
+    while error is not None and id(error) not in seen:
+        seen.add(id(error))
+        if isinstance(error, GenerationStopped):
+            return False
+        if get_throttle_info(error)[0]:
+            return True
+        status = getattr(error, "status_code", None) or getattr(error, "code", None)
+        if isinstance(status, int) and 500 <= status < 600:
+            return True
+        if isinstance(error, (TimeoutError, ConnectionError)) or any(cls.__name__ in TRANSIENT_ERROR_NAMES for cls in type(error).__mro__):
+            return True
+        error = error.__cause__ or error.__context__
+    return False
+
+
+def call_with_backoff(limiter: AdaptiveRateLimiter, func: Callable[[], Any], stop_event: Optional[threading.Event] = None, status_callback=print, label: str = "Request", max_retries: int = RATE_LIMIT_RETRIES) -> Any:
+    """
+    Calls func() once the limiter allows it. When the provider throttles the call, the
+    limiter slows down and the call is retried after Retry-After or a jittered
+    exponential backoff. Other errors, and throttling that lasts longer than
+    RATE_LIMIT_MAX_WAIT, are raised straight away.
+    """
+    for attempt in range(max_retries + 1):
+        limiter.acquire(stop_event)
+        try:
+            result = func()
+        except Exception as e:
+            throttled, retry_after = get_throttle_info(e)
+            if not throttled or attempt == max_retries or (retry_after or 0) > RATE_LIMIT_MAX_WAIT:
+                raise
+            limiter.on_throttle(retry_after)
+            backoff = min(RATE_LIMIT_MAX_WAIT, BACKOFF_BASE * 2 ** attempt)
+            delay = max(retry_after or 0.0, backoff / 2 + random.uniform(0, backoff / 2))
+            status_callback(f"{label} rate limited by the provider. Retrying in {delay:.1f}s...")
+            if stop_event:
+                if stop_event.wait(delay):
+                    raise GenerationStopped("Generation stopped by user.")
+            else:
+                time.sleep(delay)
+            continue
+        limiter.on_success()
+        return result
+
+
+_lock = threading.Lock()
+_limiters: Dict[Tuple[str, str], AdaptiveRateLimiter] = {}
+
+
+def get_rate_limiter(provider: str, api_key: str) -> AdaptiveRateLimiter:
+    """Returns the limiter shared by all synthesis calls for this provider and API key."""
+    key = (provider, api_key or "")
+    with _lock:
+        limiter = _limiters.get(key)
+        if limiter is None:
+            limiter = AdaptiveRateLimiter(PROVIDER_REQUESTS_PER_MINUTE.get(provider, 60), burst=TTS_MAX_CONCURRENCY)
+            _limiters[key] = limiter
+        return limiter
+
+
+def clear_rate_limiters() -> None:
+    with _lock:
+        _limiters.clear()
@@ -0,0 +1,110 @@
+import copy
+import json
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: only the desktop app runs there, in a single process
+    fcntl = None
+
+
+class SettingsStore:
+    """
+    JSON settings file with an in-memory cache.
+
+    The parsed settings are kept in memory and only re-read when the file's modification
+    time or size changes (e.g. after another worker saved them). Saves write a temporary
+    file in the same directory and rename it over the settings file under a lock, so a
+    reader never sees a half-written file and concurrent saves cannot interleave. The lock
+    is a thread lock plus, where available, an flock on <settings>.lock, so the web server's
+    worker processes cannot lose each other's updates either.
+    """
+
+    def __init__(self, path_getter: Callable[[], str], defaults: Dict[str, Any]):
+        self.path_getter = path_getter
+        self.defaults = defaults
+        self._lock = threading.RLock()
+        self._cached_path: Optional[str] = None
+        self._cached_signature: Optional[Tuple[int, int]] = None
+        self._cached_settings: Dict[str, Any] = {}
+
+    @staticmethod
+    def _signature(path: str) -> Optional[Tuple[int, int]]:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    @contextmanager
+    def _file_lock(self, path: str) -> Iterator[None]:
+        """Holds the thread lock and an exclusive flock on the settings' lock file."""
+        with self._lock:
+            if fcntl is None:
+                yield
+                return
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            with open(path + ".lock", "a") as lock_file:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+    def load(self) -> Dict[str, Any]:
+        """Returns a copy of the settings, falling back to the defaults if the file is missing or invalid."""
+        path = self.path_getter()
+        signature = self._signature(path)
+        with self._lock:
+            if path != self._cached_path or signature != self._cached_signature:
+                settings = self.defaults
+                if signature is not None:
+                    try:
+                        with open(path, 'r') as f:
+                            settings = json.load(f)
+                    except (OSError, json.JSONDecodeError):
+                        settings = self.defaults
+                self._cached_path = path
+                self._cached_signature = signature
+                self._cached_settings = settings
+            # Callers may modify the returned dict; the cached copy must stay intact
+            return copy.deepcopy(self._cached_settings)
+
+    def save(self, settings: Dict[str, Any]) -> None:
+        path = self.path_getter()
+        with self._file_lock(path):
+            self._write(path, settings)
+
+    def _write(self, path: str, settings: Dict[str, Any]) -> None:
+        """Replaces the settings file. The caller holds _file_lock()."""
+        directory = os.path.dirname(path) or "."
+        os.makedirs(directory, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=directory, prefix=".settings-", suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(settings, f, indent=4)
+            # mkstemp creates the file owner-only; keep the usual permissions of a settings file
+            os.chmod(temp_path, 0o644)
+            os.replace(temp_path, path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        self._cached_path = path
+        self._cached_signature = self._signature(path)
+        self._cached_settings = copy.deepcopy(settings)
+
+    def update(self, changes: Dict[str, Any]) -> Dict[str, Any]:
+        """Merges changes into the saved settings as one read-modify-write. Returns the new settings."""
+        path = self.path_getter()
+        with self._file_lock(path):
+            # Another process may have saved within the cached signature's resolution: always re-read
+            self._cached_signature = None
+            settings = self.load()
+            settings.update(changes)
+            self._write(path, settings)
+            return settings
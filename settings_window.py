@@ -9,6 +9,7 @@ import customtkinter
 
 from gui import AVAILABLE_VOICES
 from utils import get_asset_path
+from clients import ELEVENLABS_API_URL, get_http_session
 
 try:
     import requests
@@ -450,8 +451,7 @@ class VoiceSettingsWindow(customtkinter.CTkToplevel):
                 if not api_key:
                     self.elevenlabs_voices, self.elevenlabs_voices_loaded = [], False
                     return
-                headers = {"xi-api-key": api_key}
-                response = requests.get("https://api.elevenlabs.io/v1/voices", headers=headers, timeout=15)
+                response = get_http_session("elevenlabs", api_key).get(f"{ELEVENLABS_API_URL}/voices", timeout=15)
                 if response.status_code == 200:
                     voices_data = response.json().get('voices', [])
                     voices = []
@@ -9,6 +9,18 @@ from pathlib import Path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
 
+@pytest.fixture(autouse=True)
+def clear_client_registry():
+    """Make sure shared API clients (possibly mocks) and rate limiters do not leak between tests."""
+    import clients
+    import rate_limiter
+    clients.clear_clients()
+    rate_limiter.clear_rate_limiters()
+    yield
+    clients.clear_clients()
+    rate_limiter.clear_rate_limiters()
+
+
 @pytest.fixture
 def temp_settings_dir(monkeypatch, tmp_path):
     """Create a temporary directory for settings during tests."""
@@ -0,0 +1,226 @@
+"""Tests for the resident WhisperX alignment worker."""
+import importlib.util
+import multiprocessing
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pytest
+from unittest.mock import patch
+import sys
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import alignment_worker
+from alignment_worker import AlignmentWorker, _to_plain_result, _worker_main, align_parallel, estimate_turn_spans, merge_window_results, pick_language_window, plan_windows
+
+
+def run_worker(jobs, max_jobs=10, max_memory_mb=0):
+    """Runs _worker_main in a thread with a fake model cache and returns every message it sent."""
+    class FakeModels:
+        loads = 0
+
+        def __init__(self):
+            FakeModels.loads += 1
+
+        def align(self, audio_filepath, language, status_callback):
+            status_callback(f"aligning {audio_filepath}")
+            if audio_filepath == "bad.mp3":
+                raise RuntimeError("no segments")
+            return {"language": language, "segments": []}
+
+        def force_align(self, audio_filepath, segments, language, status_callback):
+            status_callback(f"force aligning {audio_filepath}")
+            return {"language": language, "segments": [{"text": segment["text"], "words": []} for segment in segments]}
+
+    parent_conn, child_conn = multiprocessing.Pipe()
+    with patch('alignment_worker._ModelCache', FakeModels):
+        thread = threading.Thread(target=_worker_main, args=(child_conn, max_jobs, max_memory_mb))
+        thread.start()
+        for job in jobs + [None]:
+            try:
+                parent_conn.send(job)
+            except BrokenPipeError:
+                break  # The worker already recycled itself and closed its end
+        messages = []
+        # Read until the worker closes its end of the pipe
+        try:
+            while True:
+                messages.append(parent_conn.recv())
+        except (EOFError, OSError):
+            pass
+        thread.join(timeout=5)
+    return messages, FakeModels.loads
+
+
+class TestWorkerLoop:
+    """Tests for the worker process loop."""
+
+    def test_models_are_loaded_once_for_all_jobs(self):
+        """Test that one model cache serves every job and progress is relayed before the result."""
+        messages, loads = run_worker([("a.mp3", "en", None), ("b.mp3", "fr", None)])
+        assert loads == 1
+        assert messages == [
+            ("status", "aligning a.mp3"), ("result", {"language": "en", "segments": []}, False),
+            ("status", "aligning b.mp3"), ("result", {"language": "fr", "segments": []}, False),
+        ]
+
+    def test_errors_are_reported_and_worker_keeps_running(self):
+        """Test that a failed job is answered with its error."""
+        messages, _ = run_worker([("bad.mp3", "en", None), ("a.mp3", "en", None)])
+        assert ("error", "no segments", False) in messages
+        assert messages[-1][0] == "result"
+
+    def test_worker_recycles_after_max_jobs(self):
+        """Test that the worker asks to be replaced and exits after max_jobs jobs."""
+        messages, _ = run_worker([("a.mp3", "en", None), ("b.mp3", "en", None), ("c.mp3", "en", None)], max_jobs=2)
+        results = [m for m in messages if m[0] == "result"]
+        assert [m[2] for m in results] == [False, True]
+
+    def test_worker_recycles_above_memory_ceiling(self):
+        """Test that exceeding the memory ceiling triggers recycling."""
+        with patch('alignment_worker._current_memory_mb', return_value=5000):
+            messages, _ = run_worker([("a.mp3", "en", None)], max_memory_mb=4096)
+        assert messages[-1][2] is True
+
+    def test_script_segments_are_force_aligned(self):
+        """Test that a job carrying script segments is force-aligned instead of transcribed."""
+        messages, _ = run_worker([("a.mp3", "fr", [{"text": "Bonjour", "start": 0.0, "end": 1.0}])])
+        assert messages == [
+            ("status", "force aligning a.mp3"),
+            ("result", {"language": "fr", "segments": [{"text": "Bonjour", "words": []}]}, False),
+        ]
+
+
+class TestResults:
+    """Tests for result conversion."""
+
+    def test_result_keeps_only_plain_word_timings(self):
+        """Test that words without timings are dropped and values become plain floats."""
+        result = _to_plain_result({"language": "en", "segments": [{"text": "Hi there", "words": [
+            {"word": "Hi", "start": 0, "end": 0.5, "score": 0.9},
+            {"word": "there"},
+        ]}]})
+        assert result == {"language": "en", "segments": [{"text": "Hi there", "words": [{"word": "Hi", "start": 0.0, "end": 0.5}]}]}
+
+
+def speech_energies(seconds, dips=(), frames_per_second=50):
+    """Frame energies of loud speech with a short silence at each of the given times."""
+    energies = np.full(int(seconds * frames_per_second), 60.0)
+    for dip in dips:
+        energies[int(dip * frames_per_second):int((dip + 0.5) * frames_per_second)] = 0.0
+    return energies
+
+
+class TestTurnSpans:
+    """Tests for the energy-based turn spans of forced alignment."""
+
+    def test_turn_boundaries_move_to_silences(self):
+        """Test that leading and trailing silence are trimmed and boundaries snap to pauses."""
+        energies = speech_energies(30, dips=(11,))
+        energies[:100] = 0.0   # 2 s of silence before the speech
+        energies[-250:] = 0.0  # 5 s after it
+        spans = estimate_turn_spans(energies, [10, 10])
+        assert spans[0][0] == pytest.approx(2.0)
+        assert 11 <= spans[0][1] <= 11.5 and spans[1][0] == spans[0][1]
+        assert spans[1][1] == pytest.approx(25.0)
+
+
+class TestParallelAlignment:
+    """Tests for the windowed parallel transcription."""
+
+    def test_windows_are_cut_at_silences(self):
+        """Test that split points land in the silences near each window boundary."""
+        windows = plan_windows(speech_energies(1000, dips=(290, 610)), window_seconds=300)
+        assert len(windows) == 3
+        (start0, end0, keep_from0, keep_to0), (start1, end1, keep_from1, keep_to1), (_, end2, keep_from2, keep_to2) = windows
+        assert start0 == 0 and keep_from0 == 0
+        assert 290 <= keep_to0 <= 290.5 and keep_from1 == keep_to0
+        assert 610 <= keep_to1 <= 610.5 and keep_from2 == keep_to1
+        assert end0 == pytest.approx(keep_to0 + 1) and start1 == pytest.approx(keep_from1 - 1)
+        assert end2 == pytest.approx(1000) and keep_to2 == float("inf")
+
+    def test_short_audio_is_one_window(self):
+        """Test that audio up to 1.5 windows long is not split."""
+        assert plan_windows(speech_energies(400), window_seconds=300) == [(0.0, 400.0, 0.0, float("inf"))]
+
+    def test_merge_shifts_times_and_drops_overlap_duplicates(self):
+        """Test that word times become absolute and a word seen by two windows is kept once."""
+        windows = [(0.0, 11.0, 0.0, 10.0), (9.0, 20.0, 10.0, float("inf"))]
+        results = [
+            {"language": "fr", "segments": [{"text": "a b", "words": [
+                {"word": "un", "start": 1.0, "end": 1.5}, {"word": "deux", "start": 10.2, "end": 10.6}]}]},
+            {"language": "fr", "segments": [{"text": "b c", "words": [
+                {"word": "deux", "start": 1.2, "end": 1.6}, {"word": "trois", "start": 5.0, "end": 5.5}]}]},
+        ]
+        merged = merge_window_results(windows, results)
+        assert merged == {"language": "fr", "segments": [
+            {"text": "un", "words": [{"word": "un", "start": 1.0, "end": 1.5}]},
+            {"text": "deux trois", "words": [{"word": "deux", "start": 10.2, "end": 10.6}, {"word": "trois", "start": 14.0, "end": 14.5}]},
+        ]}
+
+    def test_windows_are_aligned_in_a_pool(self):
+        """Test that every window is aligned once and the results are merged in order."""
+        calls = []
+
+        def fake_align_window(path, start, end, language):
+            calls.append((start, end))
+            return {"language": language, "segments": [{"text": "w", "words": [{"word": f"w{start:.0f}", "start": 2.0, "end": 2.5}]}]}
+
+        with patch('alignment_worker.frame_energies', return_value=speech_energies(1000, dips=(290, 610))), \
+                patch('alignment_worker.ProcessPoolExecutor', lambda max_workers, mp_context: ThreadPoolExecutor(max_workers)), \
+                patch('alignment_worker._align_window', fake_align_window):
+            result = align_parallel("long.mp3", language="en", status_callback=lambda msg: None, processes=2, window_seconds=300)
+        assert len(calls) == 3
+        assert result["language"] == "en"
+        assert [segment["words"][0]["start"] for segment in result["segments"]] == sorted(start + 2.0 for start, _ in calls)
+
+    def test_auto_language_is_detected_once(self):
+        """Test that "auto" is detected once, on a window of speech, and passed to every window."""
+        energies = speech_energies(1000, dips=(290, 610))
+        energies[:50 * 40] = 0.0  # the intro is silent
+        detected, languages = [], []
+
+        def fake_detect(path, start, end):
+            detected.append(start)
+            return "fr"
+
+        def fake_align_window(path, start, end, language):
+            languages.append(language)
+            return {"language": language, "segments": []}
+
+        with patch('alignment_worker.frame_energies', return_value=energies), \
+                patch('alignment_worker.ProcessPoolExecutor', lambda max_workers, mp_context: ThreadPoolExecutor(max_workers)), \
+                patch('alignment_worker._detect_window_language', fake_detect), \
+                patch('alignment_worker._align_window', fake_align_window):
+            result = align_parallel("long.mp3", language="auto", status_callback=lambda msg: None, processes=2, window_seconds=300)
+        windows = plan_windows(energies, window_seconds=300)
+        assert pick_language_window(energies, windows) == 1
+        assert detected == [windows[1][0]]
+        assert languages == ["fr"] * 3
+        assert result["language"] == "fr"
+
+    def test_short_audio_uses_resident_worker(self):
+        """Test that audio too short to split goes to the resident worker."""
+        with patch('alignment_worker.frame_energies', return_value=speech_energies(60)), \
+                patch('alignment_worker.get_alignment_worker') as get_worker:
+            get_worker.return_value.align.return_value = {"language": "en", "segments": []}
+            assert align_parallel("short.mp3", status_callback=lambda msg: None) == {"language": "en", "segments": []}
+        get_worker.return_value.align.assert_called_once()
+
+
+@pytest.mark.skipif(importlib.util.find_spec("whisperx") is not None, reason="WhisperX is installed")
+class TestWorkerProcess:
+    """Tests against a real worker process."""
+
+    def test_missing_whisperx_is_reported(self, tmp_path):
+        """Test that the worker process answers with an error when WhisperX is not installed."""
+        worker = AlignmentWorker(max_jobs=1)
+        try:
+            with pytest.raises(RuntimeError, match="whisperx"):
+                worker.align(str(tmp_path / "a.mp3"), status_callback=lambda msg: None)
+            # max_jobs=1: the process was recycled after the job
+            assert worker._process is None
+        finally:
+            worker.shutdown()
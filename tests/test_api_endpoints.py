@@ -10,6 +10,7 @@ from pathlib import Path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
 import app as flask_app
+from timeline import get_timeline_path, write_timeline
 
 
 @pytest.fixture
@@ -17,6 +18,9 @@ def app(temp_settings_dir):
     """Create Flask app for testing."""
     flask_app.app.config['TESTING'] = True
     flask_app.app.config['WTF_CSRF_ENABLED'] = False
+    # Upstream lookups are cached between requests; start every test from a cold cache
+    flask_app.status_cache.invalidate()
+    flask_app.voices_cache.invalidate()
     return flask_app.app
 
 
@@ -193,7 +197,7 @@ class TestVoicesEndpoint:
         """Test that ElevenLabs voices are returned when API key is set."""
         monkeypatch.setenv("ELEVENLABS_API_KEY", "test_key")
 
-        # Mock the requests.get call that app.py uses
+        # Mock the shared HTTP session that app.py uses
         mock_response = MagicMock()
         mock_response.status_code = 200
         mock_response.json.return_value = {
@@ -208,7 +212,9 @@ class TestVoicesEndpoint:
             ]
         }
 
-        with patch('app.requests.get', return_value=mock_response):
+        mock_session = MagicMock()
+        mock_session.get.return_value = mock_response
+        with patch('app.get_http_session', return_value=mock_session) as mock_get_session:
             response = client.get('/api/voices')
             assert response.status_code == 200
 
@@ -221,6 +227,7 @@ class TestVoicesEndpoint:
             assert 'voice_id' in voice
             assert 'name' in voice
             assert 'preview_url' in voice
+            mock_get_session.assert_called_with("elevenlabs", "test_key")
 
     def test_voices_empty_elevenlabs_when_no_key(self, client, monkeypatch):
         """Test that ElevenLabs voices list is empty when no API key."""
@@ -238,11 +245,289 @@ class TestVoicesEndpoint:
         import requests as req_module
         monkeypatch.setenv("ELEVENLABS_API_KEY", "test_key")
 
-        # Mock requests.get to raise a RequestException (which the code catches)
-        with patch('app.requests.get', side_effect=req_module.RequestException("API Error")):
+        # Mock the session to raise a RequestException (which the code catches)
+        mock_session = MagicMock()
+        mock_session.get.side_effect = req_module.RequestException("API Error")
+        with patch('app.get_http_session', return_value=mock_session):
             response = client.get('/api/voices')
             assert response.status_code == 200
 
             data = json.loads(response.data)
             # Should return empty list on error
             assert data['elevenlabs'] == []
+
+
+class TestGenerationJobEndpoints:
+    """Tests for the job-store backed generation status and stop endpoints."""
+
+    def test_status_unknown_task(self, client):
+        """Test that an unknown task id returns 404."""
+        response = client.get('/api/generation_status/does-not-exist')
+        assert response.status_code == 404
+
+    def test_status_reads_job_store(self, client):
+        """Test that status comes from the shared job store, whichever worker ran the job."""
+        task_id = flask_app.job_store.create('test-status', {'output_filepath': 'x.mp3'})
+        flask_app.job_store.finish(task_id, 'completed', result={'download_url': '/temp/x.mp3', 'filename': 'x.mp3'})
+
+        data = json.loads(client.get(f'/api/generation_status/{task_id}').data)
+        assert data['status'] == 'completed'
+        assert data['result']['filename'] == 'x.mp3'
+
+    def test_stop_queued_task(self, client):
+        """Test that stopping a queued task cancels it before it starts."""
+        task_id = flask_app.job_store.create('test-status', {'output_filepath': 'x.mp3'})
+
+        response = client.post(f'/api/stop_generation/{task_id}')
+        assert response.status_code == 200
+        data = json.loads(client.get(f'/api/generation_status/{task_id}').data)
+        assert data['status'] == 'cancelled'
+
+    def test_stop_unknown_task(self, client):
+        """Test that stopping an unknown task returns 404."""
+        response = client.post('/api/stop_generation/does-not-exist')
+        assert response.status_code == 404
+
+    def test_prune_removes_artifacts_of_unknown_tasks(self, app, tmp_path, monkeypatch):
+        """Test that pruning deletes the artifacts folder of a task missing from the job store."""
+        monkeypatch.setitem(app.config, 'TEMP_DIR', str(tmp_path))
+        task_id = flask_app.job_store.create('test-prune', {'output_filepath': 'x.mp3'})
+        kept = Path(flask_app.get_artifacts_dir(task_id))
+        orphan = Path(flask_app.get_artifacts_dir('pruned-task'))
+        for folder in (kept, orphan):
+            folder.mkdir(parents=True)
+            (folder / 'turn_0000.mp3').write_bytes(b'x')
+
+        flask_app.prune_jobs(force=True)
+        assert kept.exists()
+        assert not orphan.exists()
+
+
+class TestGenerateQuotaAdmission:
+    """Tests for the ElevenLabs quota check of /generate."""
+
+    def test_generate_rejects_script_over_quota(self, client, temp_settings_dir, monkeypatch):
+        """Test that a job that would exceed the character quota is rejected before any API call."""
+        monkeypatch.setenv("ELEVENLABS_API_KEY", "test_key")
+        (temp_settings_dir / "settings.json").write_text(json.dumps({
+            "tts_provider": "elevenlabs",
+            "speaker_voices": {},
+            "speaker_voices_elevenlabs": {"John": {"id": "voice-john", "display_name": "John"}}
+        }))
+        flask_app.elevenlabs_budget.invalidate()
+        create = MagicMock(wraps=flask_app.job_store.create)
+        monkeypatch.setattr(flask_app.job_store, 'create', create)
+        jobs_before = len(flask_app.job_store.unfinished_or_finished_since('generate', 0))
+
+        with patch('app.fetch_elevenlabs_character_quota', return_value=(995, 1000)):
+            response = client.post('/generate', data={'script': 'John: Hello there, this is too long'})
+
+        assert response.status_code == 402
+        data = json.loads(response.data)
+        assert 'Not enough ElevenLabs characters' in data['error']
+        assert data['characters_available'] == 5
+        # The check ran inside the job store's transaction, and no job was queued
+        assert create.call_args.kwargs['admit'] is not None
+        assert len(flask_app.job_store.unfinished_or_finished_since('generate', 0)) == jobs_before
+        flask_app.elevenlabs_budget.invalidate()
+
+
+class TestStreamEndpoint:
+    """Tests for /api/stream/<task_id> progressive audio endpoint."""
+
+    def test_stream_unknown_task(self, client):
+        """Test that streaming an unknown task returns 404."""
+        response = client.get('/api/stream/does-not-exist')
+        assert response.status_code == 404
+
+    def test_stream_sends_audio_written_during_generation(self, client, tmp_path, monkeypatch):
+        """Test that bytes appended while the task runs are streamed, then the stream ends."""
+        output = tmp_path / "episode.mp3"
+        output.write_bytes(b"ID3first")
+        task_id = flask_app.job_store.create('test-stream', {'output_filepath': str(output)})
+
+        def finish_generation(seconds):
+            # Simulate the provider appending audio and completing
+            with open(output, 'ab') as f:
+                f.write(b"-second")
+            flask_app.job_store.finish(task_id, 'completed', result={})
+
+        monkeypatch.setattr(flask_app.time, 'sleep', finish_generation)
+
+        response = client.get(f'/api/stream/{task_id}')
+        assert response.status_code == 200
+        assert response.mimetype == 'audio/mpeg'
+        assert response.data == b"ID3first-second"
+
+    def test_stream_ignores_stale_file(self, client, tmp_path):
+        """Test that a leftover file from an earlier run is not streamed."""
+        import time
+        output = tmp_path / "episode.mp3"
+        output.write_bytes(b"old audio")
+        os.utime(output, (time.time() - 3600, time.time() - 3600))
+        task_id = flask_app.job_store.create('test-stream', {'output_filepath': str(output)})
+        flask_app.job_store.finish(task_id, 'cancelled', error='Cancelled')
+
+        response = client.get(f'/api/stream/{task_id}')
+        assert response.data == b""
+
+    def test_stream_survives_header_rewrite(self, client, tmp_path, monkeypatch):
+        """Test that the tail is still streamed after the encoder rewrites the Xing/Info header in place."""
+        output = tmp_path / "episode.mp3"
+        output.write_bytes(b"ID3Xing-first")
+        task_id = flask_app.job_store.create('test-stream', {'output_filepath': str(output)})
+
+        def finalize_encode(seconds):
+            with open(output, 'r+b') as f:
+                f.write(b"ID3Info")
+                f.seek(0, os.SEEK_END)
+                f.write(b"-tail")
+            flask_app.job_store.finish(task_id, 'completed', result={})
+
+        monkeypatch.setattr(flask_app.time, 'sleep', finalize_encode)
+
+        response = client.get(f'/api/stream/{task_id}')
+        assert response.data == b"ID3Xing-first-tail"
+
+    @pytest.mark.parametrize("rewrite", ["truncated", "replaced", "removed"])
+    def test_stream_ends_when_file_is_rewritten(self, client, tmp_path, monkeypatch, rewrite):
+        """Test that a file truncated, replaced or removed mid-stream is not spliced onto what was sent."""
+        output = tmp_path / "episode.mp3"
+        output.write_bytes(b"ID3first-attempt")
+        task_id = flask_app.job_store.create('test-stream', {'output_filepath': str(output)})
+
+        def restart_encode(seconds):
+            if rewrite == "truncated":
+                output.write_bytes(b"ID3")
+            elif rewrite == "replaced":
+                replacement = tmp_path / "new.mp3"
+                replacement.write_bytes(b"ID3first-attempt and more")
+                os.replace(replacement, output)
+            else:
+                output.unlink()
+            monkeypatch.setattr(flask_app.time, 'sleep', lambda seconds: None)
+
+        monkeypatch.setattr(flask_app.time, 'sleep', restart_encode)
+
+        response = client.get(f'/api/stream/{task_id}')
+        assert response.data == b"ID3first-attempt"
+
+
+class TestEventsEndpoint:
+    """Tests for /api/events/<task_id> Server-Sent Events endpoint."""
+
+    def test_events_unknown_task(self, client):
+        """Test that subscribing to an unknown task returns 404."""
+        response = client.get('/api/events/does-not-exist')
+        assert response.status_code == 404
+
+    def test_events_push_progress_then_result(self, client, monkeypatch):
+        """Test that progress messages are sent in order, followed by the final result."""
+        task_id = flask_app.job_store.create('test-events', {'output_filepath': 'x.mp3'})
+        flask_app.job_store.add_event(task_id, 'Using Gemini TTS provider')
+
+        def finish_generation(seconds):
+            flask_app.job_store.add_event(task_id, 'Audio file generated')
+            flask_app.job_store.finish(task_id, 'completed', result={'download_url': '/temp/x.mp3', 'filename': 'x.mp3'})
+
+        monkeypatch.setattr(flask_app.time, 'sleep', finish_generation)
+
+        response = client.get(f'/api/events/{task_id}')
+        assert response.mimetype == 'text/event-stream'
+        body = response.get_data(as_text=True)
+        assert body.index('Using Gemini TTS provider') < body.index('Audio file generated') < body.index('event: done')
+        done = [block for block in body.split('\n\n') if 'event: done' in block][0]
+        data = json.loads(done.split('data: ', 1)[1])
+        assert data == {'status': 'completed', 'result': {'download_url': '/temp/x.mp3', 'filename': 'x.mp3'}}
+
+    def test_events_resume_after_last_event_id(self, client):
+        """Test that a reconnecting browser only receives messages it has not seen."""
+        task_id = flask_app.job_store.create('test-events', {'output_filepath': 'x.mp3'})
+        flask_app.job_store.add_event(task_id, 'first message')
+        seen = flask_app.job_store.get_events(task_id)[-1]['seq']
+        flask_app.job_store.add_event(task_id, 'second message')
+        flask_app.job_store.finish(task_id, 'failed', error='boom')
+
+        body = client.get(f'/api/events/{task_id}', headers={'Last-Event-ID': str(seen)}).get_data(as_text=True)
+        assert 'first message' not in body
+        assert 'second message' in body
+        assert '"error": "boom"' in body
+
+
+    def test_events_end_when_task_is_pruned(self, client, monkeypatch):
+        """Test that a task removed from the job store mid-stream ends the stream with a failure."""
+        task_id = flask_app.job_store.create('test-events', {'output_filepath': 'x.mp3'})
+        flask_app.job_store.add_event(task_id, 'first message')
+        real_get = flask_app.job_store.get
+        calls = []
+
+        def get_then_prune(job_id):
+            calls.append(job_id)
+            return real_get(job_id) if len(calls) <= 2 else None
+
+        monkeypatch.setattr(flask_app.job_store, 'get', get_then_prune)
+        monkeypatch.setattr(flask_app.time, 'sleep', lambda seconds: None)
+
+        body = client.get(f'/api/events/{task_id}').data.decode()
+        assert 'first message' in body
+        assert body.rstrip().endswith('data: {"status": "failed", "error": "Task not found"}')
+
+
+class TestGenerateDemoEndpoint:
+    """Tests for the background demo generation job."""
+
+    def test_demo_request_returns_task_id(self, client, monkeypatch):
+        """Test that /api/generate_demo queues a demo job instead of aligning in the request."""
+        monkeypatch.setattr(flask_app, 'DEMO_AVAILABLE', True)
+        audio = Path(flask_app.app.config['TEMP_DIR']) / 'episode.mp3'
+        audio.write_bytes(b'audio')
+        try:
+            with patch.object(flask_app.demo_pool, 'submit', return_value='demo-task') as mock_submit, \
+                    patch('app.create_html_demo') as mock_demo:
+                response = client.post('/api/generate_demo', json={'script': 'John: Hi', 'audio_filename': 'episode.mp3', 'title': 'Episode'})
+            assert response.status_code == 200
+            assert json.loads(response.data) == {'task_id': 'demo-task'}
+            mock_demo.assert_not_called()
+            payload = mock_submit.call_args[0][0]
+            assert payload['audio_filepath'] == str(audio)
+            assert payload['title'] == 'Episode'
+        finally:
+            audio.unlink()
+
+    @pytest.mark.parametrize("word_timings", [True, False])
+    def test_demo_without_whisperx_needs_word_timings(self, client, monkeypatch, word_timings):
+        """Test that without WhisperX, only audio with saved word timings is accepted."""
+        monkeypatch.setattr(flask_app, 'DEMO_AVAILABLE', False)
+        audio = Path(flask_app.app.config['TEMP_DIR']) / 'episode.mp3'
+        audio.write_bytes(b'audio')
+        try:
+            if word_timings:
+                write_timeline(str(audio), {'turns': [], 'words': [{'word': 'Hi', 'start': 0.0, 'end': 0.5}]})
+            with patch.object(flask_app.demo_pool, 'submit', return_value='demo-task') as mock_submit:
+                response = client.post('/api/generate_demo', json={'script': 'John: Hi', 'audio_filename': 'episode.mp3'})
+            assert response.status_code == (200 if word_timings else 403)
+            assert mock_submit.called == word_timings
+        finally:
+            audio.unlink()
+            Path(get_timeline_path(str(audio))).unlink(missing_ok=True)
+
+    def test_demo_job_reports_urls(self, tmp_path):
+        """Test that the demo job returns the view and download URLs of the written page."""
+        task_id = flask_app.job_store.create('test-demo', {})
+        job = {'id': task_id, 'payload': {'script': 'John: Hi', 'audio_filepath': 'episode.mp3', 'title': 'Episode', 'subtitle': '', 'demo_id': 'abc123'}}
+
+        def fake_demo(**kwargs):
+            kwargs['status_callback']('Alignement des mots...')
+            return os.path.join(kwargs['output_dir'], 'Episode.html')
+
+        with patch('app.create_html_demo', side_effect=fake_demo):
+            result = flask_app.run_demo_task(job, MagicMock(is_set=lambda: False))
+        assert result == {'view_url': '/demos/abc123/Episode.html', 'download_url': '/api/download_demo/abc123'}
+        assert [e['message'] for e in flask_app.job_store.get_events(task_id)] == ['Alignement des mots...']
+
+    def test_failed_demo_job_raises(self):
+        """Test that a demo that produced no page marks the job as failed."""
+        job = {'id': 'demo-failed', 'payload': {'script': 'John: Hi', 'audio_filepath': 'episode.mp3', 'title': 'Episode', 'subtitle': '', 'demo_id': 'abc123'}}
+        with patch('app.create_html_demo', return_value=None):
+            with pytest.raises(Exception, match='Demo generation failed'):
+                flask_app.run_demo_task(job, MagicMock(is_set=lambda: False))
@@ -17,6 +17,9 @@ def app(temp_settings_dir):
     """Create Flask app for testing."""
     flask_app.app.config['TESTING'] = True
     flask_app.app.config['WTF_CSRF_ENABLED'] = False
+    # Upstream lookups are cached between requests; start every test from a cold cache
+    flask_app.status_cache.invalidate()
+    flask_app.voices_cache.invalidate()
     return flask_app.app
 
 
@@ -91,6 +94,21 @@ class TestAPIStatusEndpoint:
             assert data['model_name'] == 'Eleven v3'
             assert 'Remaining' in data['quota_text']
 
+    def test_status_quota_is_cached_until_refresh(self, client, temp_settings_dir, monkeypatch):
+        """Test that the ElevenLabs quota is fetched once and ?refresh=1 fetches it again."""
+        settings_file = temp_settings_dir / "settings.json"
+        settings_file.write_text(json.dumps({"tts_provider": "elevenlabs", "speaker_voices": {}, "speaker_voices_elevenlabs": {}}))
+        monkeypatch.setenv("ELEVENLABS_API_KEY", "test_key")
+
+        with patch('app.update_elevenlabs_quota', side_effect=["Remaining: 10 / 10 characters", "Remaining: 5 / 10 characters"]) as mock_quota:
+            first = json.loads(client.get('/api/status').data)
+            second = json.loads(client.get('/api/status').data)
+            refreshed = json.loads(client.get('/api/status?refresh=1').data)
+
+        assert first['quota_text'] == second['quota_text'] == "Remaining: 10 / 10 characters"
+        assert refreshed['quota_text'] == "Remaining: 5 / 10 characters"
+        assert mock_quota.call_count == 2
+
     def test_status_elevenlabs_without_api_key(self, client, temp_settings_dir, monkeypatch):
         """Test that /api/status handles missing ElevenLabs API key."""
         # Create settings with ElevenLabs as provider
@@ -0,0 +1,145 @@
+"""Tests for the per-turn audio cache."""
+import os
+import time
+import pytest
+from unittest.mock import MagicMock, patch
+import sys
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from audio_cache import AudioCache, extract_annotations
+from generate_podcast import ElevenLabsTTS, GeminiTTS
+
+
+@pytest.fixture
+def cache(tmp_path):
+    """Create an audio cache in a temporary directory."""
+    return AudioCache(str(tmp_path / "audio_cache"), max_bytes=1024)
+
+
+class TestAudioCache:
+    """Tests for AudioCache storage, keys and eviction."""
+
+    def test_make_key_is_stable(self):
+        """Test that identical parameters produce the same key."""
+        key1 = AudioCache.make_key("elevenlabs", "eleven_v3", "voice1", "Hello", ["[playful]"])
+        key2 = AudioCache.make_key("elevenlabs", "eleven_v3", "voice1", "Hello", ["[playful]"])
+        assert key1 == key2
+
+    def test_make_key_changes_with_voice_and_text(self):
+        """Test that voice or text changes produce a different key."""
+        base = AudioCache.make_key("gemini", "model", "Puck", "Hello")
+        assert base != AudioCache.make_key("gemini", "model", "Kore", "Hello")
+        assert base != AudioCache.make_key("gemini", "model", "Puck", "Hello!")
+        assert base != AudioCache.make_key("elevenlabs", "model", "Puck", "Hello")
+
+    def test_get_put_counts_hits_and_misses(self, cache):
+        """Test that lookups update the hit/miss counters."""
+        key = AudioCache.make_key("gemini", "model", "Puck", "Hello")
+        assert cache.get(key) is None
+        cache.put(key, b"audio")
+        assert cache.get(key) == b"audio"
+        stats = cache.stats()
+        assert stats["hits"] == 1
+        assert stats["misses"] == 1
+        assert stats["entries"] == 1
+
+    def test_lru_eviction(self, cache):
+        """Test that the least recently used entry is evicted when over budget."""
+        cache.put("old", b"a" * 400)
+        cache.put("recent", b"b" * 400)
+        # Make "old" clearly older, then touch it so "recent" becomes the LRU entry
+        past = time.time() - 100
+        os.utime(cache._entry_path("old"), (past, past))
+        os.utime(cache._entry_path("recent"), (past + 1, past + 1))
+        assert cache.get("old") is not None
+
+        cache.put("new", b"c" * 400)
+
+        assert cache.get("old") is not None
+        assert cache.get("new") is not None
+        assert cache.get("recent") is None
+
+    def test_index_is_rebuilt_once_and_puts_do_not_scan(self, tmp_path):
+        """Test that a new cache picks up existing entries by age and writes never list the directory."""
+        first = AudioCache(str(tmp_path / "shared"), max_bytes=1024)
+        first.put("old", b"a" * 400)
+        first.put("recent", b"b" * 400)
+        past = time.time() - 100
+        os.utime(first._entry_path("old"), (past, past))
+
+        cache = AudioCache(str(tmp_path / "shared"), max_bytes=1024)
+        assert cache.stats()["entries"] == 2 and cache.stats()["size_bytes"] == 800
+        with patch('audio_cache.os.listdir', side_effect=AssertionError("directory scanned")):
+            cache.put("new", b"c" * 400)
+        assert cache.get("old") is None
+        assert cache.get("recent") is not None
+
+    def test_mime_type_is_stored_with_entry(self, cache):
+        """Test that an entry keeps its mime type and an entry without one reports None."""
+        cache.put("pcm", b"audio", "audio/L16;rate=48000")
+        cache.put("mp3", b"audio")
+        assert cache.get_entry("pcm") == (b"audio", "audio/L16;rate=48000")
+        assert cache.get_entry("mp3") == (b"audio", None)
+
+    def test_extract_annotations(self):
+        """Test extraction of bracketed and parenthesized annotations."""
+        assert extract_annotations("[playful] Hello (laughs) world") == ["[playful]", "(laughs)"]
+        assert extract_annotations("Plain text") == []
+
+
+class TestElevenLabsCachedSynthesis:
+    """Tests for per-turn reuse in ElevenLabsTTS."""
+
+    def test_only_changed_turns_are_synthesized(self, cache, tmp_path):
+        """Test that a second run only sends new or modified turns to the API."""
+        with patch('generate_podcast.get_elevenlabs_client') as mock_elevenlabs, \
+                patch('generate_podcast._ffmpeg_concat_audio_segments') as mock_concat:
+            client = MagicMock()
+            mock_elevenlabs.return_value = client
+            client.text_to_dialogue.convert.side_effect = lambda inputs: [inputs[0]["text"].encode()]
+
+            tts = ElevenLabsTTS(api_key="test_key", cache=cache)
+            mapping = {"John": "voice_john", "Samantha": "voice_sam"}
+            output = str(tmp_path / "out.mp3")
+
+            tts.synthesize("John: Hello\nSamantha: Hi there", mapping, output, status_callback=lambda msg: None)
+            assert client.text_to_dialogue.convert.call_count == 2
+
+            tts.synthesize("John: Hello\nSamantha: Hi again", mapping, output, status_callback=lambda msg: None)
+            assert client.text_to_dialogue.convert.call_count == 3
+            assert mock_concat.call_args[0][0] == [b"Hello", b"Hi again"]
+
+
+class TestGeminiCachedSynthesis:
+    """Tests for per-turn reuse in GeminiTTS."""
+
+    def test_cached_turns_keep_their_sample_rate(self, tmp_path):
+        """Test that reused PCM is decoded with the mime type stored in the cache, not a default rate."""
+        cache = AudioCache(str(tmp_path / "audio_cache"), max_bytes=1024 * 1024)
+        with patch('generate_podcast._ffmpeg_convert_inline_audio_chunks') as mock_convert, \
+                patch.object(GeminiTTS, '_generate_pcm', return_value=([b"\x00\x00"], "audio/L16;rate=48000", "model")) as mock_generate:
+            tts = GeminiTTS(api_key="test_key", cache=cache, timeline=False)
+            tts._models_to_try = lambda: ["model"]
+            output = str(tmp_path / "out.mp3")
+            tts.synthesize("John: Hello", {"John": "Puck"}, output, status_callback=lambda msg: None)
+            tts.synthesize("John: Hello", {"John": "Puck"}, output, status_callback=lambda msg: None)
+
+        assert mock_generate.call_count == 1
+        assert mock_convert.call_args[0][1] == "audio/L16;rate=48000"
+
+    def test_each_turn_counts_one_lookup(self, tmp_path):
+        """Test that probing every fallback model counts a single hit or miss per turn."""
+        cache = AudioCache(str(tmp_path / "audio_cache"), max_bytes=1024 * 1024)
+        with patch('generate_podcast._ffmpeg_convert_inline_audio_chunks'), \
+                patch.object(GeminiTTS, '_generate_pcm', return_value=([b"\x00\x00"], "audio/L16;rate=24000", "fallback")):
+            tts = GeminiTTS(api_key="test_key", cache=cache, timeline=False)
+            tts._models_to_try = lambda: ["primary", "other", "fallback"]
+            output = str(tmp_path / "out.mp3")
+            tts.synthesize("John: Hello\nJohn: Bye", {"John": "Puck"}, output, status_callback=lambda msg: None)
+            assert (cache.hits, cache.misses) == (0, 2)
+            # Found under the last model of the chain: still one hit per turn
+            tts.synthesize("John: Hello\nJohn: Bye", {"John": "Puck"}, output, status_callback=lambda msg: None)
+            assert (cache.hits, cache.misses) == (2, 2)
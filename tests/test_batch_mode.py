@@ -0,0 +1,90 @@
+"""Tests for the batch mode of the generate_podcast.py CLI."""
+import json
+import threading
+import pytest
+from unittest.mock import MagicMock, patch
+import sys
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from generate_podcast import load_batch_items, run_batch, format_batch_report
+
+
+class TestLoadBatchItems:
+    """Tests for load_batch_items()."""
+
+    def test_manifest_items(self, tmp_path):
+        """Test that manifest lines give scripts, outputs, providers and speakers."""
+        (tmp_path / "ep1.txt").write_text("John: Hello", encoding="utf-8")
+        manifest = tmp_path / "batch.jsonl"
+        manifest.write_text(
+            json.dumps({"script": "ep1.txt"}) + "\n\n" +
+            json.dumps({"script_text": "Kore: Hi", "output": "custom.mp3", "provider": "gemini", "speakers": {"Kore": "Kore"}}) + "\n",
+            encoding="utf-8"
+        )
+
+        items = load_batch_items(str(manifest), "elevenlabs", {"John": "voice-john"})
+
+        assert [item["name"] for item in items] == ["ep1", "item_002"]
+        assert items[0]["script_text"] == "John: Hello"
+        assert items[0]["output_filepath"] == str(tmp_path / "ep1.mp3")
+        assert items[0]["app_settings"] == {"tts_provider": "elevenlabs", "speaker_voices_elevenlabs": {"John": "voice-john"}}
+        assert items[1]["output_filepath"] == str(tmp_path / "custom.mp3")
+        assert items[1]["app_settings"]["speaker_voices"] == {"John": "voice-john", "Kore": "Kore"}
+
+    def test_directory_items_use_output_dir(self, tmp_path):
+        """Test that every .txt script of a directory becomes an item written to the output directory."""
+        scripts = tmp_path / "scripts"
+        scripts.mkdir()
+        (scripts / "b.txt").write_text("John: B", encoding="utf-8")
+        (scripts / "a.txt").write_text("John: A", encoding="utf-8")
+        (scripts / "notes.md").write_text("ignored", encoding="utf-8")
+
+        items = load_batch_items(str(scripts), "gemini", output_dir=str(tmp_path / "out"))
+
+        assert [item["name"] for item in items] == ["a", "b"]
+        assert items[0]["output_filepath"] == str(tmp_path / "out" / "a.mp3")
+
+    def test_invalid_manifest_line(self, tmp_path):
+        """Test that a manifest line without a script is rejected with its line number."""
+        manifest = tmp_path / "batch.jsonl"
+        manifest.write_text(json.dumps({"output": "x.mp3"}) + "\n", encoding="utf-8")
+        with pytest.raises(ValueError, match="Line 1"):
+            load_batch_items(str(manifest), "gemini")
+
+
+class TestRunBatch:
+    """Tests for run_batch()."""
+
+    def make_item(self, name, speakers):
+        return {
+            "name": name,
+            "script_text": "John: Hello",
+            "output_filepath": f"/tmp/{name}.mp3",
+            "app_settings": {"tts_provider": "gemini", "speaker_voices": speakers},
+        }
+
+    def test_provider_is_shared_and_failures_are_isolated(self):
+        """Test that all items reuse one provider and a failing item does not stop the others."""
+        items = [self.make_item("one", {"John": "Puck"}), self.make_item("two", {}), self.make_item("three", {"John": "Puck"})]
+        providers_used = []
+        lock = threading.Lock()
+
+        def fake_generate(**kwargs):
+            with lock:
+                providers_used.append(kwargs["provider"])
+            return kwargs["output_filepath"]
+
+        with patch('generate_podcast.create_provider', return_value=MagicMock()) as mock_create, \
+                patch('generate_podcast.generate', side_effect=fake_generate):
+            results = run_batch(items, {"gemini": "key"}, max_workers=2, status_callback=lambda msg: None)
+
+        mock_create.assert_called_once_with("gemini", "key")
+        assert len(providers_used) == 2 and providers_used[0] is providers_used[1]
+        assert [result["status"] for result in results] == ["completed", "failed", "completed"]
+        assert "John" in results[1]["error"]
+
+        report = format_batch_report(results, 3.0)
+        assert "2 succeeded, 1 failed" in report
@@ -0,0 +1,126 @@
+"""Tests for windowed and concurrent synthesis of long scripts."""
+import threading
+import pytest
+from unittest.mock import MagicMock, patch
+import sys
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from generate_podcast import ElevenLabsTTS, GeminiTTS, split_dialogue_windows, split_script_chunks, run_concurrently
+from rate_limiter import GenerationStopped
+
+
+class TestDialogueWindows:
+    """Tests for split_dialogue_windows()."""
+
+    def test_windows_end_on_turn_boundaries(self):
+        """Test that turns are grouped without exceeding the character budget."""
+        inputs = [{"text": "a" * 40, "voice_id": "v"} for _ in range(5)]
+        windows = split_dialogue_windows(inputs, 100)
+        assert [len(w) for w in windows] == [2, 2, 1]
+        assert sum(windows, []) == inputs
+
+    def test_long_turn_gets_its_own_window(self):
+        """Test that a single turn longer than the budget is not split."""
+        inputs = [{"text": "short", "voice_id": "v"}, {"text": "x" * 500, "voice_id": "v"}]
+        windows = split_dialogue_windows(inputs, 100)
+        assert windows == [[inputs[0]], [inputs[1]]]
+
+
+class TestRunConcurrently:
+    """Tests for run_concurrently()."""
+
+    def test_results_keep_job_order(self):
+        """Test that results are returned in submission order."""
+        results = run_concurrently(list(range(10)), lambda x: x * 2, max_concurrency=4)
+        assert results == [x * 2 for x in range(10)]
+
+    def test_failed_job_is_retried_alone(self):
+        """Test that a failing job is retried without re-running the others."""
+        calls = {}
+        lock = threading.Lock()
+
+        def worker(job):
+            with lock:
+                calls[job] = calls.get(job, 0) + 1
+                attempt = calls[job]
+            if job == 2 and attempt == 1:
+                raise TimeoutError("transient")
+            return job
+
+        results = run_concurrently([0, 1, 2, 3], worker, max_concurrency=2, retries=1, status_callback=lambda msg: None)
+        assert results == [0, 1, 2, 3]
+        assert calls == {0: 1, 1: 1, 2: 2, 3: 1}
+
+    def test_error_after_retries_is_raised(self):
+        """Test that a job failing on every attempt propagates its error."""
+        def worker(job):
+            raise TimeoutError("still timing out")
+
+        with pytest.raises(TimeoutError):
+            run_concurrently([0], worker, max_concurrency=1, retries=1, status_callback=lambda msg: None)
+
+    def test_permanent_errors_are_not_retried(self):
+        """Test that an error that is not transient (invalid key, stop request) fails on the first attempt."""
+        calls = []
+
+        def worker(job):
+            calls.append(job)
+            raise job
+
+        class InvalidKey(Exception):
+            status_code = 401
+
+        for error in (InvalidKey("invalid api key"), GenerationStopped("Generation stopped by user.")):
+            with pytest.raises(type(error)):
+                run_concurrently([error], worker, max_concurrency=1, retries=2, status_callback=lambda msg: None)
+        assert len(calls) == 2
+
+
+class TestElevenLabsWindowedSynthesis:
+    """Tests for the windowed mode of ElevenLabsTTS."""
+
+    def test_windows_are_stitched_in_order(self, tmp_path):
+        """Test that each window is synthesized separately and joined in script order."""
+        with patch('generate_podcast.get_elevenlabs_client') as mock_elevenlabs, \
+                patch('generate_podcast._ffmpeg_concat_audio_segments') as mock_concat:
+            client = MagicMock()
+            mock_elevenlabs.return_value = client
+            client.text_to_dialogue.convert.side_effect = lambda inputs: [" ".join(d["text"] for d in inputs).encode()]
+
+            tts = ElevenLabsTTS(api_key="test_key", window_chars=12, max_concurrency=3)
+            script = "John: First turn\nSamantha: Second turn\nJohn: Third turn"
+            tts.synthesize(script, {"John": "v1", "Samantha": "v2"}, str(tmp_path / "out.mp3"), status_callback=lambda msg: None)
+
+            assert client.text_to_dialogue.convert.call_count == 3
+            assert mock_concat.call_args[0][0] == [b"First turn", b"Second turn", b"Third turn"]
+
+
+class TestGeminiChunkedSynthesis:
+    """Tests for the chunked mode of GeminiTTS."""
+
+    def test_chunks_keep_instruction_prefix(self):
+        """Test that every chunk starts with the instruction line."""
+        script = "Read warmly\nJohn: One two three\nSamantha: Four five six\nJohn: Seven eight"
+        chunks = split_script_chunks(script, 30)
+        assert len(chunks) == 3
+        assert all(chunk.startswith("Read warmly\n") for chunk in chunks)
+        assert chunks[1] == "Read warmly\nSamantha: Four five six"
+
+    def test_pcm_is_concatenated_in_order(self, tmp_path):
+        """Test that chunk PCM is joined in script order before the single encode."""
+        with patch('generate_podcast.genai.Client'), \
+                patch('generate_podcast._ffmpeg_convert_inline_audio_chunks') as mock_convert, \
+                patch.object(GeminiTTS, '_generate_pcm') as mock_generate:
+            mock_generate.side_effect = lambda client, text, *args, **kwargs: ([text.splitlines()[-1].encode()], "audio/L16;rate=24000", "model")
+
+            tts = GeminiTTS(api_key="test_key", chunk_chars=20, max_concurrency=3)
+            script = "Read warmly\nJohn: First line\nSamantha: Second line\nJohn: Third (laughs)"
+            tts.synthesize(script, {"John": "Puck", "Samantha": "Kore"}, str(tmp_path / "out.mp3"), status_callback=lambda msg: None)
+
+            assert mock_generate.call_count == 3
+            pcm_chunks, mime_type = mock_convert.call_args[0][:2]
+            assert pcm_chunks == [b"John: First line", b"Samantha: Second line", b"John: Third (laughs)"]
+            assert mime_type == "audio/L16;rate=24000"
@@ -0,0 +1,41 @@
+"""Tests for the process-wide API client registry."""
+import pytest
+from unittest.mock import patch
+import sys
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import clients
+from clients import get_http_session, get_gemini_client, get_elevenlabs_client, clear_clients
+
+
+class TestClientRegistry:
+    """Tests for clients.py."""
+
+    def test_sessions_are_shared_per_provider_and_key(self):
+        """Test that a session is created once per provider and API key."""
+        session = get_http_session("elevenlabs", "key-a")
+        assert get_http_session("elevenlabs", "key-a") is session
+        assert get_http_session("elevenlabs", "key-b") is not session
+        assert session.headers["xi-api-key"] == "key-a"
+
+    def test_sdk_clients_are_shared(self):
+        """Test that SDK clients are built once per API key."""
+        with patch('clients.genai.Client') as mock_gemini, patch('clients.ElevenLabs') as mock_elevenlabs:
+            assert get_gemini_client("key") is get_gemini_client("key")
+            assert get_elevenlabs_client("key") is get_elevenlabs_client("key")
+            get_gemini_client("other")
+        assert mock_gemini.call_count == 2
+        mock_elevenlabs.assert_called_once_with(api_key="key")
+
+    def test_clear_and_fork_reset_the_registry(self, monkeypatch):
+        """Test that clearing, or running in a forked child, gives new clients."""
+        session = get_http_session("elevenlabs", "key")
+        clear_clients()
+        new_session = get_http_session("elevenlabs", "key")
+        assert new_session is not session
+
+        monkeypatch.setattr(clients.os, 'getpid', lambda: -1)
+        assert get_http_session("elevenlabs", "key") is not new_session
@@ -1,6 +1,12 @@
 """Tests for the create_demo module."""
+import base64
+import copy
+import json
 import pytest
+import random
 import sys
+import time
+from unittest.mock import patch
 from pathlib import Path
 
 # Add parent directory to path
@@ -9,12 +15,20 @@ sys.path.insert(0, str(Path(__file__).parent.parent))
 from create_demo import (
     normalize_word,
     similar,
-    find_adjacent_timed_words,
     interpolate_missing_words,
     fix_word_timings,
     reconstruct_html_with_timing,
-    create_word_mapping_whisperx
+    create_word_mapping_whisperx,
+    create_html_demo,
+    create_html_demo_from_timeline,
+    build_compact_transcript,
+    build_forced_alignment_segments,
+    create_html_demo_whisperx,
+    script_turns,
+    has_word_timings
 )
+import numpy as np
+from timeline import write_timeline
 
 class TestDemoUtils:
     """Tests for utility functions in create_demo.py."""
@@ -34,25 +48,6 @@ class TestDemoUtils:
         assert similar("hello", "world") is False
         assert similar("colour", "color") is True
 
-    def test_find_adjacent_timed_words(self):
-        """Test finding adjacent words with timing."""
-        segments = [
-            {'type': 'word', 'text': 'one', 'timing': {'start': 0, 'end': 1}},
-            {'type': 'word', 'text': 'two'},  # No timing
-            {'type': 'word', 'text': 'three', 'timing': {'start': 2, 'end': 3}},
-        ]
-        
-        # Test for the middle word (index 1)
-        prev_word, next_word = find_adjacent_timed_words(segments, 1)
-        
-        assert prev_word is not None
-        assert prev_word['index'] == 0
-        assert prev_word['timing']['end'] == 1
-        
-        assert next_word is not None
-        assert next_word['index'] == 2
-        assert next_word['timing']['start'] == 2
-
     def test_interpolate_missing_words(self):
         """Test interpolation of missing timings."""
         segments = [
@@ -160,3 +155,289 @@ class TestDemoUtils:
         word_segments = [s for s in segments if s['type'] == 'word']
         assert len(word_segments) == 1
         assert word_segments[0]['text'] == 'Hello'
+
+
+    def test_create_word_mapping_whisperx_segments(self):
+        """Test that every part of the script becomes one segment, in order and with its position."""
+        source_text = "John: [excited] Don't stop!\nSamantha:  <break> co-op"
+        segments = create_word_mapping_whisperx(source_text, {'segments': []})
+
+        assert [(s['type'], s['text']) for s in segments] == [
+            ('speaker', 'John: '), ('annotation', '[excited]'), ('text', ' '), ('word', "Don't"),
+            ('text', ' '), ('word', 'stop'), ('text', '!'), ('text', '\n'),
+            ('speaker', 'Samantha:  '), ('annotation', '<break>'), ('text', ' '), ('word', 'co-op'),
+        ]
+        assert all(source_text[s['start_pos']:s['end_pos']] == s['text'] for s in segments)
+
+    def test_speaker_label_stays_on_one_line(self):
+        """Test that a capitalised line is not swallowed into the next line's speaker label."""
+        segments = create_word_mapping_whisperx("Read this aloud\nJohn: Hello", {'segments': []})
+
+        assert [s['text'] for s in segments if s['type'] == 'speaker'] == ['John: ']
+        assert [s['text'] for s in segments if s['type'] == 'word'] == ['Read', 'this', 'aloud', 'Hello']
+
+
+def find_adjacent_timed_words(segments, current_index):
+    """The previous and next words with timings around a word, as looked up by the reference interpolation."""
+    prev_word = None
+    next_word = None
+
+    for i in range(current_index - 1, -1, -1):
+        if segments[i]['type'] == 'word' and segments[i].get('timing'):
+            prev_word = {'index': i, 'timing': segments[i]['timing']}
+            break
+
+    for i in range(current_index + 1, len(segments)):
+        if segments[i]['type'] == 'word' and segments[i].get('timing'):
+            next_word = {'index': i, 'timing': segments[i]['timing']}
+            break
+
+    return prev_word, next_word
+
+
+def reference_interpolate(segments):
+    """The previous word-by-word interpolation, kept as the reference for the NumPy version."""
+    for i, segment in enumerate(segments):
+        if segment['type'] == 'word' and not segment.get('timing'):
+            prev_word, next_word = find_adjacent_timed_words(segments, i)
+            if prev_word and next_word:
+                duration = (next_word['timing']['start'] - prev_word['timing']['end']) / (next_word['index'] - prev_word['index'])
+                start = prev_word['timing']['end'] + (i - prev_word['index']) * duration
+                segment['timing'] = {'start': round(start, 3), 'end': round(start + duration, 3)}
+    return segments
+
+
+def reference_fix(segments):
+    """The previous three-pass timing correction, kept as the reference for the NumPy version."""
+    words = [s['timing'] for s in segments if s['type'] == 'word' and s.get('timing')]
+    for timing in words:
+        if timing['start'] > timing['end']:
+            timing['start'], timing['end'] = timing['end'], timing['start']
+    for current, following in zip(words, words[1:]):
+        if current['end'] > following['start']:
+            mid_point = (current['end'] + following['start']) / 2
+            if mid_point - 0.01 - current['start'] > 0.05 and following['end'] - (mid_point + 0.01) > 0.05:
+                current['end'], following['start'] = mid_point - 0.01, mid_point + 0.01
+    for timing in words:
+        if timing['end'] - timing['start'] < 0.08:
+            timing['end'] = timing['start'] + 0.08
+    return segments
+
+
+def random_segments(rng, count):
+    """Words with overlapping, inverted, short and missing timings, separated by spaces and speakers."""
+    segments = []
+    clock = 0.0
+    for k in range(count):
+        if rng.random() < 0.3:
+            segments.append({'type': 'text', 'text': ' '})
+        if rng.random() < 0.05:
+            segments.append({'type': 'speaker', 'text': 'John: '})
+        timing = None
+        if rng.random() < 0.6:
+            start = round(clock + rng.uniform(-0.2, 0.1), 3)
+            timing = {'start': start, 'end': round(start + rng.uniform(-0.05, 0.4), 3)}
+        segments.append({'type': 'word', 'text': f'w{k}', 'timing': timing})
+        clock += rng.choice([0.02, 0.05, 0.1, 0.3]) + 0.1
+    return segments
+
+
+class TestTimingEquivalence:
+    """The NumPy timing stage must give the same timings as the previous per-word loops."""
+
+    def test_interpolation_matches_previous_output(self):
+        """Test interpolation against the sequential version (which rounded every step to the millisecond)."""
+        rng = random.Random(0)
+        for _ in range(300):
+            segments = random_segments(rng, rng.randint(0, 60))
+            expected = reference_interpolate(copy.deepcopy(segments))
+            result = interpolate_missing_words(copy.deepcopy(segments))
+            for got, want in zip(result, expected):
+                if got['type'] == 'word':
+                    assert (got['timing'] is None) == (want['timing'] is None)
+                    if want['timing']:
+                        assert got['timing']['start'] == pytest.approx(want['timing']['start'], abs=0.0015)
+                        assert got['timing']['end'] == pytest.approx(want['timing']['end'], abs=0.0015)
+
+    def test_long_gap_is_split_like_before(self):
+        """Test a long unaligned stretch, where the previous version rescanned for neighbours at each word."""
+        segments = []
+        for k in range(2000):
+            timing = {'start': k * 0.3, 'end': k * 0.3 + 0.2} if k in (0, 1999) else None
+            segments += [{'type': 'word', 'text': f'w{k}', 'timing': timing}, {'type': 'text', 'text': ' '}]
+        expected = reference_interpolate(copy.deepcopy(segments))
+        result = interpolate_missing_words(copy.deepcopy(segments))
+        # The previous version re-used each rounded timing for the next word, so its rounding drifts by a few ms
+        assert [s['timing']['end'] for s in result[::2]] == pytest.approx([s['timing']['end'] for s in expected[::2]], abs=0.01)
+
+    def test_corrections_match_previous_output(self):
+        """Test inverted, overlapping (including chained overlaps) and short timings against the three-pass version."""
+        rng = random.Random(1)
+        for _ in range(300):
+            segments = reference_interpolate(random_segments(rng, rng.randint(0, 60)))
+            assert fix_word_timings(copy.deepcopy(segments)) == reference_fix(copy.deepcopy(segments))
+
+
+@pytest.mark.slow
+class TestWordMappingBenchmark:
+    """Scaling benchmark of the script tokenizer (run with -s to see the timings)."""
+
+    def test_tokenizer_scales_linearly(self):
+        """Test that mapping a 200k-character script costs about 20 times a 10k-character one."""
+        turn = "John: [excited] Hello world, this is a test of the alignment.\nSamantha: Indeed, it's long.\n"
+        timings = {}
+        for size in (10_000, 50_000, 100_000, 200_000):
+            script = (turn * (size // len(turn) + 1))[:size]
+            best = float('inf')
+            for _ in range(3):
+                start = time.perf_counter()
+                create_word_mapping_whisperx(script, {'segments': []})
+                best = min(best, time.perf_counter() - start)
+            timings[size] = best
+            print(f"{size:>7} caractères : {best * 1000:.1f} ms")
+
+        # Linear scaling gives a ratio of 20; the old slice-per-character loop was far above it
+        assert timings[200_000] / timings[10_000] < 40
+
+
+class TestTimelineDemo:
+    """Tests for demos built from the word timings saved during synthesis."""
+
+    def test_demo_uses_saved_word_timings(self, tmp_path):
+        """Test that the provider's word timings are used and WhisperX is never called."""
+        audio = tmp_path / "episode.mp3"
+        audio.write_bytes(b"audio")
+        script = tmp_path / "script.txt"
+        script.write_text("John: [excited] Hello world.\nSamantha: Hi", encoding="utf-8")
+        write_timeline(str(audio), {"turns": [], "words": [
+            {"word": "Hello", "start": 0.0, "end": 0.4},
+            {"word": "world", "start": 0.5, "end": 0.9},
+            {"word": "Hi", "start": 1.2, "end": 1.5},
+        ]})
+
+        assert has_word_timings(str(audio))
+        with patch('create_demo.webbrowser.open'), patch('create_demo.create_html_demo_whisperx') as mock_whisperx:
+            html_path = create_html_demo(str(script), str(audio), title="Episode", output_dir=str(tmp_path / "demo"), status_callback=lambda msg: None)
+
+        mock_whisperx.assert_not_called()
+        html = Path(html_path).read_text(encoding="utf-8")
+        assert 'data-start="0.5" data-end="0.9" data-word-id="1">world</span>' in html
+        assert 'data-start="1.2" data-end="1.5" data-word-id="2">Hi</span>' in html
+        assert (tmp_path / "demo" / "episode.mp3").exists()
+
+    def test_falls_back_to_whisperx_without_timings(self, tmp_path):
+        """Test that audio without saved word timings is aligned with WhisperX."""
+        audio = tmp_path / "episode.mp3"
+        audio.write_bytes(b"audio")
+        assert not has_word_timings(str(audio))
+        with patch('create_demo.create_html_demo_whisperx', return_value="demo.html") as mock_whisperx:
+            assert create_html_demo("script.txt", str(audio), status_callback=lambda msg: None) == "demo.html"
+        mock_whisperx.assert_called_once()
+
+    def test_timings_of_replaced_audio_are_ignored(self, tmp_path):
+        """Test that word timings saved for a previous version of the audio are not used."""
+        audio = tmp_path / "episode.mp3"
+        audio.write_bytes(b"audio")
+        write_timeline(str(audio), {"turns": [], "words": [{"word": "Hi", "start": 0.0, "end": 0.5}]})
+        audio.write_bytes(b"re-generated audio")
+        assert not has_word_timings(str(audio))
+        with patch('create_demo.create_html_demo_whisperx', return_value="demo.html") as mock_whisperx:
+            assert create_html_demo("script.txt", str(audio), status_callback=lambda msg: None) == "demo.html"
+        mock_whisperx.assert_called_once()
+
+
+class TestCompactDemo:
+    """Tests for the compact demo format (transcript and timings in sidecar files)."""
+
+    def test_build_compact_transcript(self):
+        """Test that turns become paragraphs and only valid timings are kept, in word order."""
+        segments = [
+            {'type': 'speaker', 'text': 'John: '},
+            {'type': 'annotation', 'text': '[excited]'},
+            {'type': 'text', 'text': ' '},
+            {'type': 'word', 'text': 'Hello', 'timing': {'start': 0.0, 'end': 0.4}},
+            {'type': 'text', 'text': ' '},
+            {'type': 'word', 'text': 'there', 'timing': None},
+            {'type': 'text', 'text': '.\n'},
+            {'type': 'speaker', 'text': 'Samantha: '},
+            {'type': 'word', 'text': 'Hi', 'timing': {'start': 1.2, 'end': 1.5}},
+        ]
+        paragraphs, timings = build_compact_transcript(segments)
+        assert paragraphs == [
+            {'w': 0, 'speaker': 'John: ', 'parts': [{'a': 'excited'}, ' ', ['Hello'], ' there.']},
+            {'w': 1, 'speaker': 'Samantha: ', 'parts': [['Hi']]},
+        ]
+        assert timings == [0.0, 0.4, 1.2, 1.5]
+
+    def test_compact_demo_writes_sidecars(self, tmp_path):
+        """Test that the compact page has no word spans and loads the transcript and Float32 timings."""
+        audio = tmp_path / "episode.mp3"
+        audio.write_bytes(b"audio")
+        script = tmp_path / "script.txt"
+        script.write_text("John: Hello world.\nSamantha: Hi", encoding="utf-8")
+        write_timeline(str(audio), {"turns": [], "words": [
+            {"word": "Hello", "start": 0.0, "end": 0.4},
+            {"word": "world", "start": 0.5, "end": 0.9},
+            {"word": "Hi", "start": 1.2, "end": 1.5},
+        ]})
+
+        with patch('create_demo.webbrowser.open'):
+            html_path = create_html_demo(str(script), str(audio), title="Episode", output_dir=str(tmp_path / "demo"),
+                                         status_callback=lambda msg: None, demo_format="compact")
+
+        html = Path(html_path).read_text(encoding="utf-8")
+        assert 'class="word"' not in html
+        assert '<script src="Episode.transcript.js"></script>' in html
+        transcript = (tmp_path / "demo" / "Episode.transcript.js").read_text(encoding="utf-8")
+        data = json.loads(transcript[len("window.DEMO_TRANSCRIPT = "):-2])
+        assert [p['speaker'] for p in data['paragraphs']] == ['John: ', 'Samantha: ']
+        encoded = (tmp_path / "demo" / "Episode.timings.js").read_text(encoding="utf-8").split('"')[1]
+        assert np.frombuffer(base64.b64decode(encoded), dtype='<f4').tolist() == pytest.approx([0.0, 0.4, 0.5, 0.9, 1.2, 1.5])
+
+    def test_unknown_format_is_rejected(self, tmp_path):
+        """Test that an unknown demo format fails before any file is written."""
+        with pytest.raises(ValueError):
+            create_html_demo_from_timeline("script.txt", "episode.mp3", demo_format="pdf",
+                                           timeline={"words": [{"word": "Hi", "start": 0.0, "end": 0.5}]},
+                                           status_callback=lambda msg: None)
+
+
+class TestForcedAlignment:
+    """Tests for the script-driven forced alignment mode."""
+
+    def test_script_turns_and_segments(self):
+        """Test that turns keep spoken text only and become one segment per turn with text."""
+        turns = script_turns("Read this aloud.\nJohn: Hello [laughs] world.\nSamantha: <pause>\nJohn: Bye: now")
+        assert turns == [("John", "Hello world."), ("Samantha", ""), ("John", "Bye: now")]
+        segments = build_forced_alignment_segments(turns, [(0.0, 1.0), (1.0, 1.5), (1.5, 3.0)])
+        assert segments == [{"text": "Hello world.", "start": 0.0, "end": 1.0}, {"text": "Bye: now", "start": 1.5, "end": 3.0}]
+
+    def test_forced_alignment_skips_transcription(self, tmp_path):
+        """Test that the script is force-aligned on the timeline's turn spans without transcription."""
+        audio = tmp_path / "episode.mp3"
+        audio.write_bytes(b"audio")
+        script = tmp_path / "script.txt"
+        script.write_text("John: Hello world.\nSamantha: Hi", encoding="utf-8")
+        write_timeline(str(audio), {"turns": [{"start": 0.0, "end": 1.0}, {"start": 1.0, "end": 2.0}]})
+
+        with patch('create_demo.get_alignment_worker') as get_worker, patch('create_demo.webbrowser.open'):
+            get_worker.return_value.force_align.return_value = {"language": "en", "segments": [{"words": [
+                {"word": "Hello", "start": 0.1, "end": 0.4}, {"word": "world", "start": 0.5, "end": 0.9},
+                {"word": "Hi", "start": 1.2, "end": 1.5}]}]}
+            html_path = create_html_demo_whisperx(str(script), str(audio), title="Episode", output_dir=str(tmp_path / "demo"),
+                                                  status_callback=lambda msg: None, language="en", forced_alignment=True)
+
+        get_worker.return_value.align.assert_not_called()
+        args = get_worker.return_value.force_align.call_args
+        assert args[0][1:] == ([{"text": "Hello world.", "start": 0.0, "end": 1.0}, {"text": "Hi", "start": 1.0, "end": 2.0}], "en")
+        assert 'data-start="1.2"' in Path(html_path).read_text(encoding="utf-8")
+
+    def test_auto_language_falls_back_to_transcription(self, tmp_path):
+        """Test that forced alignment without an explicit language transcribes as before."""
+        script = tmp_path / "script.txt"
+        script.write_text("John: Hello", encoding="utf-8")
+        with patch('create_demo.get_alignment_worker') as get_worker, patch('create_demo._build_demo_html', return_value="demo.html"):
+            get_worker.return_value.align.return_value = {"language": "en", "segments": []}
+            create_html_demo_whisperx(str(script), "episode.mp3", status_callback=lambda msg: None, forced_alignment=True)
+        get_worker.return_value.force_align.assert_not_called()
+        get_worker.return_value.align.assert_called_once()
@@ -0,0 +1,57 @@
+"""Tests for the gunicorn configuration shipped in the Docker image."""
+import re
+import runpy
+import pytest
+import sys
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+ROOT = Path(__file__).parent.parent
+
+
+def load_gunicorn_settings(monkeypatch, **env):
+    """Runs gunicorn.conf.py like gunicorn does and returns its settings."""
+    for name in ("GUNICORN_BIND", "GUNICORN_WORKERS", "GUNICORN_THREADS", "GUNICORN_TIMEOUT"):
+        monkeypatch.delenv(name, raising=False)
+    for name, value in env.items():
+        monkeypatch.setenv(name, value)
+    settings = runpy.run_path(str(ROOT / "gunicorn.conf.py"))
+    return {name: value for name, value in settings.items() if not name.startswith("__") and name != "os"}
+
+
+class TestGunicornConfig:
+    """Tests for gunicorn.conf.py and the Dockerfile that uses it."""
+
+    def test_docker_image_uses_the_config(self):
+        """Test that every image starts gunicorn with gunicorn.conf.py instead of the default sync worker."""
+        commands = re.findall(r'^CMD \[(.*)\]$', (ROOT / "Dockerfile").read_text(encoding="utf-8"), re.MULTILINE)
+        assert commands
+        for command in commands:
+            assert '"gunicorn", "--config", "gunicorn.conf.py", "app:app"' == command
+
+    def test_workers_can_hold_long_lived_streams(self, monkeypatch):
+        """Test that workers are threaded, with room for the two streams of several generations at once."""
+        from app import EVENTS_KEEPALIVE_INTERVAL
+
+        settings = load_gunicorn_settings(monkeypatch)
+        assert settings["worker_class"] == "gthread"
+        assert settings["workers"] == 1
+        assert settings["threads"] >= 8
+        assert settings["timeout"] > EVENTS_KEEPALIVE_INTERVAL
+        assert settings["bind"] == "0.0.0.0:8000"
+
+    def test_settings_are_read_from_environment(self, monkeypatch):
+        """Test that worker, thread and timeout counts can be tuned through the environment."""
+        settings = load_gunicorn_settings(monkeypatch, GUNICORN_WORKERS="3", GUNICORN_THREADS="64", GUNICORN_TIMEOUT="300")
+        assert (settings["workers"], settings["threads"], settings["timeout"]) == (3, 64, 300)
+
+    def test_settings_are_valid_gunicorn_settings(self, monkeypatch):
+        """Test that gunicorn itself accepts every setting (skipped when gunicorn is not installed)."""
+        config = pytest.importorskip("gunicorn.config")
+        cfg = config.Config()
+        for name, value in load_gunicorn_settings(monkeypatch).items():
+            cfg.set(name, value)
+        assert cfg.worker_class_str == "gthread"
+        assert cfg.threads >= 8
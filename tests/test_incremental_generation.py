@@ -0,0 +1,96 @@
+"""Tests for incremental re-generation from a previous script's turn artifacts."""
+import json
+import pytest
+from unittest.mock import patch
+import sys
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from generate_podcast import TTSProvider, generate_incremental, plan_turn_reuse, TURN_MANIFEST_NAME
+
+
+def turn(speaker, text, voice="v"):
+    return {"speaker": speaker, "text": text, "voice": voice, "instruction": ""}
+
+
+class FakeProvider(TTSProvider):
+    """Returns the turn text as its 'audio' and records which turns were synthesized."""
+
+    def __init__(self):
+        self.calls = []
+
+    def synthesize_turns(self, turns, instruction, speaker_mapping, status_callback=print, stop_event=None):
+        self.calls.append([text for _, text in turns])
+        return [f"{speaker}:{text}".encode() for speaker, text in turns]
+
+
+class TestPlanTurnReuse:
+    """Tests for plan_turn_reuse()."""
+
+    def test_modified_turn_is_not_reused(self):
+        """Test that only the edited turn needs synthesis."""
+        old = [turn("John", "One"), turn("Samantha", "Two"), turn("John", "Three")]
+        new = [turn("John", "One"), turn("Samantha", "Two fixed"), turn("John", "Three")]
+        assert plan_turn_reuse(old, new) == [0, None, 2]
+
+    def test_insertions_and_deletions_shift_indices(self):
+        """Test that unchanged turns are found after inserted or deleted turns."""
+        old = [turn("John", "One"), turn("Samantha", "Two"), turn("John", "Three")]
+        new = [turn("John", "Zero"), turn("John", "One"), turn("John", "Three")]
+        assert plan_turn_reuse(old, new) == [None, 0, 2]
+
+    def test_voice_change_invalidates_turn(self):
+        """Test that a turn with a new voice is synthesized again."""
+        assert plan_turn_reuse([turn("John", "One", "v1")], [turn("John", "One", "v2")]) == [None]
+
+
+class TestGenerateIncremental:
+    """Tests for generate_incremental()."""
+
+    def run(self, provider, script, tmp_path, artifacts, previous=None, provider_name="elevenlabs"):
+        with patch('generate_podcast._ffmpeg_concat_audio_segments') as mock_concat:
+            generate_incremental(provider, provider_name, script, {"John": "v1", "Samantha": "v2"}, str(tmp_path / "out.mp3"),
+                                 str(tmp_path / artifacts), str(tmp_path / previous) if previous else None, status_callback=lambda msg: None)
+        return mock_concat.call_args[0][0]
+
+    def test_only_changed_turns_are_synthesized(self, tmp_path):
+        """Test that a typo fix re-synthesizes one turn and splices it between the old ones."""
+        provider = FakeProvider()
+        self.run(provider, "John: Hello\nSamantha: Hi ther\nJohn: Bye", tmp_path, "v1")
+        segments = self.run(provider, "John: Hello\nSamantha: Hi there\nJohn: Bye", tmp_path, "v2", previous="v1")
+
+        assert provider.calls == [["Hello", "Hi ther", "Bye"], ["Hi there"]]
+        assert segments == [b"John:Hello", b"Samantha:Hi there", b"John:Bye"]
+        manifest = json.loads((tmp_path / "v2" / TURN_MANIFEST_NAME).read_text())
+        assert [t["text"] for t in manifest["turns"]] == ["Hello", "Hi there", "Bye"]
+        assert (tmp_path / "v2" / "turn_0001.mp3").read_bytes() == b"Samantha:Hi there"
+
+    def test_artifacts_can_be_updated_in_place(self, tmp_path):
+        """Test that re-generating into the previous directory drops the files of deleted turns."""
+        provider = FakeProvider()
+        self.run(provider, "John: One\nSamantha: Two\nJohn: Three", tmp_path, "art")
+        segments = self.run(provider, "John: One\nJohn: Three", tmp_path, "art", previous="art")
+
+        assert provider.calls[1:] == []
+        assert segments == [b"John:One", b"John:Three"]
+        assert sorted(p.name for p in (tmp_path / "art").iterdir()) == sorted([TURN_MANIFEST_NAME, "turn_0000.mp3", "turn_0001.mp3"])
+
+    def test_other_provider_is_not_reused(self, tmp_path):
+        """Test that artifacts of another provider are ignored."""
+        provider = FakeProvider()
+        self.run(provider, "John: One", tmp_path, "v1", provider_name="gemini")
+        self.run(provider, "John: One", tmp_path, "v2", previous="v1", provider_name="elevenlabs")
+        assert provider.calls == [["One"], ["One"]]
+
+    def test_unrelated_files_in_artifacts_dir_are_kept(self, tmp_path):
+        """Test that files not named turn_NNNN.mp3 are neither parsed nor removed."""
+        provider = FakeProvider()
+        self.run(provider, "John: One\nSamantha: Two", tmp_path, "art")
+        for name in ("turn_notes.mp3", "turn_0001.mp3.bak"):
+            (tmp_path / "art" / name).write_bytes(b"x")
+        self.run(provider, "John: One", tmp_path, "art", previous="art")
+
+        assert sorted(p.name for p in (tmp_path / "art").iterdir()) == sorted(
+            [TURN_MANIFEST_NAME, "turn_0000.mp3", "turn_0001.mp3.bak", "turn_notes.mp3"])
@@ -0,0 +1,166 @@
+"""Tests for the SQLite job store and worker pool."""
+import threading
+import time
+import pytest
+import sys
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import job_queue
+from job_queue import JobStore, WorkerPool, JobCancelled
+
+
+@pytest.fixture
+def store(tmp_path):
+    """Create a job store in a temporary database."""
+    return JobStore(str(tmp_path / "jobs.sqlite3"))
+
+
+def wait_for_status(store, job_id, statuses, timeout=5.0):
+    """Poll the store until the job reaches one of the given statuses."""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = store.get(job_id)
+        if job['status'] in statuses:
+            return job
+        time.sleep(0.02)
+    raise AssertionError(f"Job {job_id} stuck in {store.get(job_id)['status']}")
+
+
+class TestJobStore:
+    """Tests for JobStore state transitions."""
+
+    def test_create_and_get(self, store):
+        """Test that a created job is queued with its payload."""
+        job_id = store.create('generate', {'script': 'John: Hi'})
+        job = store.get(job_id)
+        assert job['status'] == 'queued'
+        assert job['payload'] == {'script': 'John: Hi'}
+        assert store.get('missing') is None
+
+    def test_claim_is_exclusive_and_ordered(self, store):
+        """Test that jobs are claimed oldest first and only once."""
+        first = store.create('generate', {})
+        second = store.create('generate', {})
+        store.create('demo', {})
+
+        assert store.claim_next('generate', 'w1')['id'] == first
+        assert store.claim_next('generate', 'w2')['id'] == second
+        assert store.claim_next('generate', 'w3') is None
+        assert store.get(first)['worker'] == 'w1'
+
+    def test_state_is_shared_between_store_instances(self, store, tmp_path):
+        """Test that another process (a second store on the same file) sees the job."""
+        job_id = store.create('generate', {})
+        other = JobStore(str(tmp_path / "jobs.sqlite3"))
+        other.finish(job_id, 'completed', result={'filename': 'a.mp3'})
+        assert store.get(job_id)['result'] == {'filename': 'a.mp3'}
+
+    def test_request_stop(self, store):
+        """Test that stopping cancels queued jobs and flags running ones."""
+        queued = store.create('generate', {})
+        assert store.request_stop(queued) == 'queued'
+        assert store.get(queued)['status'] == 'cancelled'
+
+        running = store.create('generate', {})
+        store.claim_next('generate', 'w1')
+        assert store.request_stop(running) == 'running'
+        assert store.get(running)['status'] == 'stopping'
+        assert store.stop_requested_ids('w1') == {running}
+
+        assert store.request_stop('missing') is None
+
+    def test_events_are_ordered_per_job(self, store):
+        """Test that progress messages are returned in order and filtered by job and sequence."""
+        job_id = store.create('generate', {})
+        other_id = store.create('generate', {})
+        store.add_event(job_id, 'one')
+        store.add_event(other_id, 'elsewhere')
+        store.add_event(job_id, 'two')
+
+        events = store.get_events(job_id)
+        assert [e['message'] for e in events] == ['one', 'two']
+        assert [e['message'] for e in store.get_events(job_id, events[0]['seq'])] == ['two']
+
+    def test_orphaned_job_is_requeued(self, store, monkeypatch):
+        """Test that a running job without heartbeats is claimed again after a restart."""
+        job_id = store.create('generate', {})
+        store.claim_next('generate', 'dead-worker')
+
+        real_time = time.time
+        monkeypatch.setattr(job_queue.time, 'time', lambda: real_time() + job_queue.STALE_AFTER + 1)
+        job = store.claim_next('generate', 'new-worker')
+        assert job['id'] == job_id
+        assert job['worker'] == 'new-worker'
+
+
+class TestWorkerPool:
+    """Tests for WorkerPool job execution."""
+
+    def test_completed_and_failed_jobs(self, store):
+        """Test that handler results and errors are recorded."""
+        def handler(job, stop_event):
+            if job['payload'].get('fail'):
+                raise ValueError("boom")
+            return {'value': job['payload']['value'] * 2}
+
+        pool = WorkerPool(store, 'generate', handler, size=2, poll_interval=0.05)
+        pool.start()
+        try:
+            ok = pool.submit({'value': 21})
+            ko = pool.submit({'fail': True})
+            assert wait_for_status(store, ok, job_queue.FINISHED_STATUSES)['result'] == {'value': 42}
+            failed = wait_for_status(store, ko, job_queue.FINISHED_STATUSES)
+            assert failed['status'] == 'failed'
+            assert failed['error'] == 'boom'
+        finally:
+            pool.shutdown()
+
+    def test_pool_size_bounds_concurrency(self, store):
+        """Test that no more jobs than the pool size run at once."""
+        running = []
+        peak = []
+        lock = threading.Lock()
+
+        def handler(job, stop_event):
+            with lock:
+                running.append(job['id'])
+                peak.append(len(running))
+            time.sleep(0.1)
+            with lock:
+                running.remove(job['id'])
+            return {}
+
+        pool = WorkerPool(store, 'generate', handler, size=2, poll_interval=0.02)
+        pool.start()
+        try:
+            job_ids = [pool.submit({}) for _ in range(5)]
+            for job_id in job_ids:
+                wait_for_status(store, job_id, job_queue.FINISHED_STATUSES)
+            assert max(peak) <= 2
+        finally:
+            pool.shutdown()
+
+    def test_stop_request_reaches_handler(self, store):
+        """Test that a stop written to the store sets the handler's stop event."""
+        started = threading.Event()
+
+        def handler(job, stop_event):
+            started.set()
+            if not stop_event.wait(5):
+                return {}
+            raise JobCancelled('Generation cancelled by user.')
+
+        pool = WorkerPool(store, 'generate', handler, size=1, poll_interval=0.05)
+        pool.start()
+        try:
+            job_id = pool.submit({})
+            assert started.wait(5)
+            store.request_stop(job_id)
+            job = wait_for_status(store, job_id, job_queue.FINISHED_STATUSES)
+            assert job['status'] == 'cancelled'
+            assert job['error'] == 'Generation cancelled by user.'
+        finally:
+            pool.shutdown()
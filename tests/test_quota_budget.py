@@ -0,0 +1,143 @@
+"""Tests for ElevenLabs quota-aware admission control."""
+import json
+import threading
+import time
+import pytest
+from unittest.mock import MagicMock
+import sys
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from job_queue import JobStore
+from quota_budget import CharacterBudget, QuotaExceededError
+import generate_podcast
+from audio_cache import AudioCache
+from generate_podcast import ELEVENLABS_DIALOGUE_MODEL, TURN_MANIFEST_NAME, count_elevenlabs_characters, script_turn_specs
+
+
+@pytest.fixture
+def store(tmp_path):
+    """Create a job store in a temporary database."""
+    return JobStore(str(tmp_path / "jobs.sqlite3"))
+
+
+def elevenlabs_job(store, characters):
+    return store.create('generate', {'app_settings': {'tts_provider': 'elevenlabs'}, 'characters': characters})
+
+
+class TestCharacterBudget:
+    """Tests for CharacterBudget."""
+
+    def test_job_over_budget_is_rejected(self, store):
+        """Test that a job needing more than the remaining quota is rejected with the numbers."""
+        budget = CharacterBudget(lambda: (9_000, 10_000), store)
+        budget.check(1_000)
+        with pytest.raises(QuotaExceededError) as excinfo:
+            budget.check(1_001)
+        assert excinfo.value.needed == 1_001
+        assert excinfo.value.available == 1_000
+        assert "1,001" in str(excinfo.value)
+
+    def test_admitted_jobs_are_deducted(self, store):
+        """Test that queued, running and recently finished jobs use up the budget."""
+        budget = CharacterBudget(lambda: (0, 1_000), store)
+        budget.available()  # Fetch the quota before the jobs exist
+
+        elevenlabs_job(store, 300)
+        finished = elevenlabs_job(store, 200)
+        store.claim_next('generate', 'w1')
+        store.claim_next('generate', 'w1')
+        store.finish(finished, 'completed')
+        never_started = elevenlabs_job(store, 400)
+        store.request_stop(never_started)
+        store.create('generate', {'app_settings': {'tts_provider': 'gemini'}, 'characters': 400})
+
+        assert budget.available() == (500, 500)
+
+    def test_quota_is_refreshed_lazily(self, store):
+        """Test that the quota is fetched once per TTL."""
+        fetch = MagicMock(return_value=(0, 1_000))
+        budget = CharacterBudget(fetch, store, ttl=60)
+        budget.check(10)
+        budget.check(10)
+        assert fetch.call_count == 1
+
+        budget._quota = (1_000, time.time() - 61)
+        budget.check(10)
+        assert fetch.call_count == 2
+
+    def test_unknown_quota_admits_jobs(self, store):
+        """Test that jobs are not blocked when the quota cannot be read."""
+        def failing_fetch():
+            raise ConnectionError("offline")
+
+        CharacterBudget(failing_fetch, store).check(10**9)
+        CharacterBudget(lambda: None, store).check(10**9)
+
+
+    def test_concurrent_admissions_cannot_overcommit(self, tmp_path):
+        """Test that two web workers admitting at once cannot both fit in a budget for one job."""
+        path = str(tmp_path / "shared.sqlite3")
+        results = []
+        barrier = threading.Barrier(2)
+
+        def admit_from_worker():
+            # Each web worker process has its own store connection and budget
+            budget = CharacterBudget(lambda: (0, 1_000), JobStore(path))
+            admit = budget.admission(600)
+            slow_reserved = budget._reserved_since
+
+            def reserved_after_a_pause(fetched_at):
+                reserved = slow_reserved(fetched_at)
+                time.sleep(0.2)  # Widen the window between the check and the insert
+                return reserved
+
+            budget._reserved_since = reserved_after_a_pause
+            barrier.wait()
+            try:
+                budget.job_store.create('generate', {'app_settings': {'tts_provider': 'elevenlabs'}, 'characters': 600}, admit=admit)
+                results.append("queued")
+            except QuotaExceededError:
+                results.append("rejected")
+
+        threads = [threading.Thread(target=admit_from_worker) for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(timeout=10)
+        assert sorted(results) == ["queued", "rejected"]
+        assert len(JobStore(path).unfinished_or_finished_since('generate', 0)) == 1
+
+
+class TestCountCharacters:
+    """Tests for count_elevenlabs_characters()."""
+
+    def test_only_mapped_turns_are_counted(self):
+        """Test that instructions and unmapped speakers are not counted."""
+        script = "Read warmly\nJohn: Hello there\nSamantha: Hi\nNarrator: Skipped"
+        assert count_elevenlabs_characters(script, {"John": "v1", "Samantha": "v2"}) == len("Hello there") + len("Hi")
+
+    def test_unchanged_incremental_turns_are_not_counted(self, tmp_path):
+        """Test that turns reused from the previous incremental generation are free."""
+        mapping = {"John": "v1", "Samantha": "v2"}
+        previous = "John: Hello there\nSamantha: Hi"
+        turns = [dict(turn, file=f"turn_{i:04d}.mp3") for i, turn in enumerate(script_turn_specs(previous, mapping, "elevenlabs"))]
+        (tmp_path / TURN_MANIFEST_NAME).write_text(json.dumps({"provider": "elevenlabs", "format": "mp3", "turns": turns}))
+
+        script = "John: Hello there\nSamantha: Hi again"
+        assert count_elevenlabs_characters(script, mapping, incremental=True, previous_artifacts_dir=str(tmp_path)) == len("Hi again")
+        assert count_elevenlabs_characters(script, mapping, incremental=True) == len("Hello there") + len("Hi again")
+
+    def test_cached_turns_are_not_counted(self, tmp_path, monkeypatch):
+        """Test that turns already in the audio cache are free, unless timestamps bypass the cache."""
+        cache = AudioCache(str(tmp_path), 10**6)
+        cache.put(AudioCache.make_key("elevenlabs", ELEVENLABS_DIALOGUE_MODEL, "v1", "Hello there", []), b"mp3")
+        script = "John: Hello there\nSamantha: Hi"
+        mapping = {"John": "v1", "Samantha": "v2"}
+        assert count_elevenlabs_characters(script, mapping, cache=cache) == len("Hi")
+        assert (cache.hits, cache.misses) == (0, 0)
+
+        monkeypatch.setattr(generate_podcast, 'ELEVENLABS_TIMESTAMPS', True)
+        assert count_elevenlabs_characters(script, mapping, cache=cache) == len("Hello there") + len("Hi")
@@ -0,0 +1,136 @@
+"""Tests for the shared adaptive rate limiter."""
+import time
+import pytest
+from unittest.mock import MagicMock, patch
+import sys
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from google.genai import errors
+from elevenlabs.core import ApiError
+
+import rate_limiter
+from rate_limiter import AdaptiveRateLimiter, GenerationStopped, call_with_backoff, get_throttle_info, get_rate_limiter, is_transient_error
+from generate_podcast import GeminiTTS
+
+
+def gemini_quota_error(retry_delay="7s"):
+    """Build the error google-genai raises for a 429 with a RetryInfo detail."""
+    return errors.ClientError(429, {"error": {
+        "code": 429, "message": "Resource exhausted", "status": "RESOURCE_EXHAUSTED",
+        "details": [{"@type": "type.googleapis.com/google.rpc.RetryInfo", "retryDelay": retry_delay}],
+    }})
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    """Record backoff sleeps instead of waiting."""
+    recorded = []
+    monkeypatch.setattr(rate_limiter.time, 'sleep', recorded.append)
+    return recorded
+
+
+class TestAdaptiveRateLimiter:
+    """Tests for AdaptiveRateLimiter."""
+
+    def test_burst_then_rate(self):
+        """Test that requests beyond the burst are spaced out at the configured rate."""
+        limiter = AdaptiveRateLimiter(requests_per_minute=600, burst=2)
+        start = time.monotonic()
+        for _ in range(3):
+            limiter.acquire()
+        assert time.monotonic() - start >= 0.08
+
+    def test_throttle_shrinks_rate_and_success_restores_it(self):
+        """Test multiplicative decrease on throttling and additive increase on success."""
+        limiter = AdaptiveRateLimiter(requests_per_minute=60, burst=1)
+        limiter.on_throttle(retry_after=5)
+        assert limiter.rate == pytest.approx(0.5)
+        assert limiter.paused_until > time.monotonic() + 4
+        for _ in range(100):
+            limiter.on_success()
+        assert limiter.rate == pytest.approx(1.0)
+
+    def test_limiters_are_shared_per_provider_and_key(self):
+        """Test that all calls with the same provider and key share one limiter."""
+        assert get_rate_limiter("gemini", "key") is get_rate_limiter("gemini", "key")
+        assert get_rate_limiter("gemini", "key") is not get_rate_limiter("elevenlabs", "key")
+
+
+class TestThrottleDetection:
+    """Tests for get_throttle_info()."""
+
+    def test_gemini_retry_delay(self):
+        """Test that the Gemini RetryInfo delay is read."""
+        assert get_throttle_info(gemini_quota_error("7s")) == (True, 7.0)
+
+    def test_elevenlabs_retry_after_header(self):
+        """Test that the Retry-After header of an ElevenLabs error is read."""
+        error = ApiError(status_code=429, headers={"Retry-After": "3"}, body={})
+        assert get_throttle_info(error) == (True, 3.0)
+
+    def test_other_errors_are_not_throttling(self):
+        """Test that non-429 errors are not retried."""
+        assert get_throttle_info(ApiError(status_code=401, headers={}, body={})) == (False, None)
+        assert get_throttle_info(ValueError("boom")) == (False, None)
+
+
+    def test_transient_error_classification(self):
+        """Test that throttling, 5xx and timeouts are transient, even wrapped, and other errors are not."""
+        assert is_transient_error(gemini_quota_error())
+        assert is_transient_error(ApiError(status_code=503, headers={}, body={}))
+        assert is_transient_error(errors.ServerError(500, {"error": {"code": 500, "message": "Internal", "status": "INTERNAL"}}))
+        assert is_transient_error(TimeoutError("read timed out"))
+        try:
+            try:
+                raise ApiError(status_code=502, headers={}, body={})
+            except ApiError as e:
+                raise Exception("Gemini API Error: bad gateway") from e
+        except Exception as wrapped:
+            assert is_transient_error(wrapped)
+        assert not is_transient_error(ApiError(status_code=401, headers={}, body={}))
+        assert not is_transient_error(ValueError("voice not found"))
+        assert not is_transient_error(GenerationStopped("Generation stopped by user."))
+
+
+class TestCallWithBackoff:
+    """Tests for call_with_backoff()."""
+
+    def test_throttled_call_is_retried(self, sleeps):
+        """Test that a throttled call waits at least Retry-After and then succeeds."""
+        limiter = AdaptiveRateLimiter(requests_per_minute=6000, burst=10)
+        limiter.acquire = MagicMock()
+        func = MagicMock(side_effect=[ApiError(status_code=429, headers={"retry-after": "4"}, body={}), "audio"])
+
+        assert call_with_backoff(limiter, func, status_callback=lambda msg: None) == "audio"
+        assert func.call_count == 2
+        assert sleeps[0] >= 4
+        assert limiter.rate < limiter.max_rate
+
+    def test_long_retry_after_and_other_errors_are_raised(self, sleeps):
+        """Test that errors are not retried when waiting is pointless."""
+        limiter = AdaptiveRateLimiter(requests_per_minute=6000, burst=10)
+        with pytest.raises(errors.ClientError):
+            call_with_backoff(limiter, MagicMock(side_effect=gemini_quota_error("86400s")), status_callback=lambda msg: None)
+        with pytest.raises(ValueError):
+            call_with_backoff(limiter, MagicMock(side_effect=ValueError("boom")), status_callback=lambda msg: None)
+        assert sleeps == []
+
+    def test_gemini_quota_error_no_longer_ends_the_job(self, sleeps):
+        """Test that GeminiTTS retries a 429 instead of raising 'Quota Exceeded' straight away."""
+        chunk = MagicMock()
+        part = chunk.candidates[0].content.parts[0]
+        part.inline_data.data = b"pcm"
+        part.inline_data.mime_type = "audio/L16;rate=24000"
+
+        with patch('generate_podcast.genai.Client') as mock_client:
+            mock_client.return_value.models.generate_content_stream.side_effect = [gemini_quota_error("1s"), [chunk]]
+            tts = GeminiTTS(api_key="test_key")
+            tts.rate_limiter.acquire = MagicMock()
+            audio_chunks, mime_type, model_name = tts._generate_pcm(tts.client, "John: Hi", MagicMock(), ["model-a"], status_callback=lambda msg: None)
+
+        assert audio_chunks == [b"pcm"]
+        assert model_name == "model-a"
+        assert sleeps and sleeps[0] >= 1
@@ -0,0 +1,106 @@
+"""Tests for the cached settings store and the memoized analysis prompt lookup."""
+import json
+import multiprocessing
+import os
+import threading
+import pytest
+from unittest.mock import patch
+import sys
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import transcript_analyzer
+from settings_store import SettingsStore
+
+
+def update_in_process(path, worker):
+    """Runs in a child process: a fresh store, as in another web worker, updating the same file."""
+    store = SettingsStore(lambda: path, {})
+    for k in range(10):
+        store.update({f"worker{worker}-{k}": k})
+
+
+@pytest.fixture
+def settings_path(tmp_path):
+    return tmp_path / "settings.json"
+
+
+@pytest.fixture
+def store(settings_path):
+    return SettingsStore(lambda: str(settings_path), {"tts_provider": "gemini"})
+
+
+class TestSettingsStore:
+    """Tests for SettingsStore."""
+
+    def test_defaults_when_missing_or_invalid(self, store, settings_path):
+        """Test that the defaults are returned for a missing or corrupt file."""
+        assert store.load() == {"tts_provider": "gemini"}
+        settings_path.write_text("{not json")
+        assert store.load() == {"tts_provider": "gemini"}
+
+    def test_file_is_parsed_only_when_it_changes(self, store, settings_path):
+        """Test that the parsed settings are reused until the file's mtime changes."""
+        settings_path.write_text(json.dumps({"tts_provider": "elevenlabs"}))
+        with patch('settings_store.json.load', wraps=json.load) as mock_load:
+            assert store.load()["tts_provider"] == "elevenlabs"
+            store.load()
+            assert mock_load.call_count == 1
+
+            settings_path.write_text(json.dumps({"tts_provider": "gemini", "extra": 1}))
+            os.utime(settings_path, ns=(0, 10**9))
+            assert store.load() == {"tts_provider": "gemini", "extra": 1}
+            assert mock_load.call_count == 2
+
+    def test_returned_settings_are_copies(self, store):
+        """Test that modifying a loaded dict does not change the cache or the defaults."""
+        settings = store.load()
+        settings["tts_provider"] = "changed"
+        assert store.load()["tts_provider"] == "gemini"
+        assert store.defaults["tts_provider"] == "gemini"
+
+    def test_concurrent_updates_are_not_lost(self, store, settings_path):
+        """Test that concurrent read-modify-write updates all land in a valid file."""
+        threads = [threading.Thread(target=store.update, args=({f"key{i}": i},)) for i in range(20)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        saved = json.loads(settings_path.read_text())
+        assert all(saved[f"key{i}"] == i for i in range(20))
+        # No temporary file is left behind, only the lock file of cross-process updates
+        assert not [p.name for p in settings_path.parent.iterdir() if p.name.endswith(".tmp")]
+
+    @pytest.mark.skipif(sys.platform == "win32", reason="flock is not available on Windows")
+    def test_updates_from_several_processes_are_not_lost(self, settings_path):
+        """Test that read-modify-write updates from separate processes (web workers) all land."""
+        context = multiprocessing.get_context("spawn")
+        processes = [context.Process(target=update_in_process, args=(str(settings_path), i)) for i in range(4)]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join(30)
+        assert [process.exitcode for process in processes] == [0] * 4
+
+        saved = json.loads(settings_path.read_text())
+        assert all(saved[f"worker{i}-{k}"] == k for i in range(4) for k in range(10))
+
+
+class TestAnalysisPromptPath:
+    """Tests for the memoized get_analysis_prompt_path()."""
+
+    def test_prompt_path_is_memoized(self, monkeypatch):
+        """Test that the prompt location is probed once per TTL."""
+        transcript_analyzer._prompt_path_cache.clear()
+        with patch('transcript_analyzer._find_analysis_prompt_path', return_value="/tmp/prompt.txt") as mock_find:
+            assert transcript_analyzer.get_analysis_prompt_path() == "/tmp/prompt.txt"
+            assert transcript_analyzer.get_analysis_prompt_path() == "/tmp/prompt.txt"
+            assert mock_find.call_count == 1
+
+            monkeypatch.setattr(transcript_analyzer, 'PROMPT_PATH_CACHE_TTL', 0)
+            transcript_analyzer.get_analysis_prompt_path()
+            assert mock_find.call_count == 2
+        transcript_analyzer._prompt_path_cache.clear()
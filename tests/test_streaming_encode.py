@@ -0,0 +1,92 @@
+"""Tests for the streaming FFmpeg encoder used by Gemini synthesis."""
+import os
+import stat
+import pytest
+from unittest.mock import MagicMock, patch
+import sys
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import generate_podcast
+from generate_podcast import FFmpegStreamEncoder, GeminiTTS
+
+pytestmark = pytest.mark.skipif(sys.platform == "win32", reason="Uses a shell-script stand-in for FFmpeg")
+
+
+@pytest.fixture
+def fake_ffmpeg(tmp_path, monkeypatch):
+    """Install a stand-in for FFmpeg that copies stdin to the output file and records its arguments."""
+    script = tmp_path / "ffmpeg"
+    args_file = tmp_path / "ffmpeg_args.txt"
+    script.write_text(
+        f"#!{sys.executable}\n"
+        "import sys, shutil\n"
+        f"open({str(args_file)!r}, 'w').write(' '.join(sys.argv[1:]))\n"
+        "if '--fail' in sys.argv[-1]:\n"
+        "    sys.stderr.write('Invalid data found\\n'); sys.exit(1)\n"
+        "with open(sys.argv[-1], 'wb') as f:\n"
+        "    shutil.copyfileobj(sys.stdin.buffer, f)\n"
+    )
+    script.chmod(script.stat().st_mode | stat.S_IEXEC)
+    monkeypatch.setattr(generate_podcast, 'find_ffmpeg_path', lambda: str(script))
+    return args_file
+
+
+def make_chunk(data, mime_type="audio/L16;rate=24000"):
+    """Build a fake Gemini stream chunk carrying inline audio."""
+    chunk = MagicMock()
+    part = chunk.candidates[0].content.parts[0]
+    part.inline_data.data = data
+    part.inline_data.mime_type = mime_type
+    return chunk
+
+
+class TestFFmpegStreamEncoder:
+    """Tests for FFmpegStreamEncoder."""
+
+    def test_chunks_are_written_in_order(self, tmp_path, fake_ffmpeg):
+        """Test that every chunk reaches FFmpeg in order and the sample rate comes from the mime type."""
+        output = str(tmp_path / "out.bin")
+        encoder = FFmpegStreamEncoder(output, status_callback=lambda msg: None)
+        for data in (b"one", b"two", b"three"):
+            encoder.write(data, "audio/L16;rate=22050")
+        assert encoder.close() == output
+
+        assert Path(output).read_bytes() == b"onetwothree"
+        assert "-ar 22050" in fake_ffmpeg.read_text()
+        assert "pipe:0" in fake_ffmpeg.read_text()
+
+    def test_ffmpeg_failure_is_reported(self, tmp_path, fake_ffmpeg):
+        """Test that a failing FFmpeg process raises with its last error line."""
+        encoder = FFmpegStreamEncoder(str(tmp_path / "out--fail.bin"), status_callback=lambda msg: None)
+        with pytest.raises(Exception, match="Invalid data found"):
+            encoder.write(b"data", "audio/L16;rate=24000")
+            encoder.close()
+
+    def test_abort_removes_partial_file(self, tmp_path, fake_ffmpeg):
+        """Test that aborting stops FFmpeg and removes the partial output."""
+        output = tmp_path / "out.bin"
+        encoder = FFmpegStreamEncoder(str(output), status_callback=lambda msg: None)
+        encoder.write(b"partial", "audio/L16;rate=24000")
+        encoder.abort()
+        assert not output.exists()
+
+
+class TestGeminiStreamingSynthesis:
+    """Tests for the streaming path of GeminiTTS.synthesize."""
+
+    def test_synthesize_streams_into_ffmpeg(self, tmp_path, fake_ffmpeg, monkeypatch):
+        """Test that Gemini chunks are piped into FFmpeg without the buffered conversion."""
+        monkeypatch.setattr(generate_podcast, 'GEMINI_STREAMING_ENCODE', True)
+        with patch('generate_podcast.genai.Client') as mock_client, \
+                patch('generate_podcast._ffmpeg_convert_inline_audio_chunks') as mock_convert:
+            mock_client.return_value.models.generate_content_stream.return_value = [make_chunk(b"ab"), make_chunk(b"cd")]
+            output = str(tmp_path / "out.bin")
+
+            result = GeminiTTS(api_key="test_key").synthesize("John: Hello", {"John": "Puck"}, output, status_callback=lambda msg: None)
+
+            assert result == output
+            assert Path(output).read_bytes() == b"abcd"
+            mock_convert.assert_not_called()
@@ -0,0 +1,165 @@
+"""Tests for the per-turn timeline sidecar."""
+import pytest
+from unittest.mock import patch
+import sys
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from generate_podcast import GeminiTTS, TTSProvider, generate_incremental
+import base64
+from types import SimpleNamespace
+from generate_podcast import ElevenLabsTTS
+from timeline import alignment_to_words, build_timeline, get_timeline_path, load_timeline, mp3_sample_count, split_at_turn_starts, write_timeline
+
+# MPEG-1 Layer III, 128 kbps, 44.1 kHz, no padding: 417-byte frames of 1152 samples
+MP3_FRAME = b"\xff\xfb\x90\x00" + b"\x00" * 413
+XING_FRAME = b"\xff\xfb\x90\x00" + b"\x00" * 32 + b"Xing" + b"\x00" * 377
+
+
+def mp3(frames):
+    return XING_FRAME + MP3_FRAME * frames
+
+
+class TestBuildTimeline:
+    """Tests for build_timeline()."""
+
+    def test_single_turn_groups_are_exact(self):
+        """Test that per-turn audio gives exact, consecutive offsets."""
+        timeline = build_timeline([([("John", "Hi")], 24000), ([("Samantha", "Hello")], 12000)], 24000)
+        assert [(t["start_sample"], t["end_sample"]) for t in timeline["turns"]] == [(0, 24000), (24000, 36000)]
+        assert [(t["start"], t["end"]) for t in timeline["turns"]] == [(0.0, 1.0), (1.0, 1.5)]
+        assert not any(t["estimated"] for t in timeline["turns"])
+        assert timeline["total_samples"] == 36000
+
+    def test_turns_inside_a_group_are_estimated_by_characters(self):
+        """Test that a chunk's samples are shared out by text length and flagged as estimated."""
+        timeline = build_timeline([([("John", "aaa"), ("Samantha", "a")], 400), ([("John", "b")], 100)], 100)
+        assert [(t["start_sample"], t["end_sample"]) for t in timeline["turns"]] == [(0, 300), (300, 400), (400, 500)]
+        assert [t["estimated"] for t in timeline["turns"]] == [True, True, False]
+        assert [t["index"] for t in timeline["turns"]] == [0, 1, 2]
+
+
+class TestProviderAlignment:
+    """Tests for turning provider alignment data into timings."""
+
+    def test_characters_are_grouped_into_words(self):
+        """Test that words take the start of their first and the end of their last character."""
+        text = "[warmly] Hi, you"
+        starts = [0.1 * i for i in range(len(text))]
+        ends = [0.1 * i + 0.05 for i in range(len(text))]
+        words = alignment_to_words(text, starts, ends)
+        assert [w["word"] for w in words] == ["Hi,", "you"]
+        assert (words[0]["start"], words[0]["end"]) == (0.9, 1.15)
+
+    def test_turn_starts_split_a_request_exactly(self):
+        """Test that turn start times give exact, contiguous single-turn groups."""
+        turns = [("John", "a"), ("Samantha", "b"), ("John", "c")]
+        assert split_at_turn_starts(turns, 300, 100, {0: 0.1, 1: 1.0, 2: 2.5}) == [([turns[0]], 100), ([turns[1]], 150), ([turns[2]], 50)]
+        assert split_at_turn_starts(turns, 300, 100, {0: 0.0, 2: 2.5}) == [(turns, 300)]
+
+
+class TestMp3SampleCount:
+    """Tests for mp3_sample_count()."""
+
+    def test_counts_audio_frames(self):
+        """Test that ID3 tags and the Xing header frame are not counted as audio."""
+        id3 = b"ID3\x04\x00\x00\x00\x00\x00\x0a" + b"\x00" * 10
+        assert mp3_sample_count(id3 + mp3(3)) == (3 * 1152, 44100)
+
+    def test_resynchronizes_after_garbage(self):
+        """Test that bytes between frames are skipped."""
+        assert mp3_sample_count(MP3_FRAME + b"junk" + MP3_FRAME) == (2 * 1152, 44100)
+
+
+class TestTimelineSidecar:
+    """Tests for the sidecar written by the synthesis paths."""
+
+    def test_gemini_chunks_give_exact_offsets(self, tmp_path):
+        """Test that chunk PCM lengths become the turn boundaries of the sidecar."""
+        with patch('generate_podcast._ffmpeg_convert_inline_audio_chunks'), \
+                patch.object(GeminiTTS, '_generate_pcm') as mock_generate:
+            # 16-bit PCM: 2 bytes per sample, one second per character of the turn text
+            mock_generate.side_effect = lambda client, text, *args, **kwargs: ([b"\x00\x00" * 10 * len(text.split(": ", 1)[1])], "audio/L16;rate=10", "model")
+
+            tts = GeminiTTS(api_key="test_key", chunk_chars=10, timeline=True)
+            output = str(tmp_path / "out.mp3")
+            tts.synthesize("John: Hello\nSamantha: Hi", {"John": "Puck", "Samantha": "Kore"}, output, status_callback=lambda msg: None)
+
+        timeline = load_timeline(output)
+        assert timeline["audio"] == "out.mp3"
+        assert [(t["speaker"], t["start"], t["end"], t["estimated"]) for t in timeline["turns"]] == [("John", 0.0, 5.0, False), ("Samantha", 5.0, 7.0, False)]
+
+    def test_incremental_turns_use_mp3_frame_counts(self, tmp_path):
+        """Test that per-turn MP3 files give the offsets of an incremental generation."""
+        class FakeProvider(TTSProvider):
+            timeline = True
+
+            def synthesize_turns(self, turns, instruction, speaker_mapping, status_callback=print, stop_event=None):
+                return [mp3(len(text)) for _, text in turns]
+
+        output = str(tmp_path / "out.mp3")
+        with patch('generate_podcast._ffmpeg_concat_audio_segments'):
+            generate_incremental(FakeProvider(), "elevenlabs", "John: ab\nSamantha: abc", {"John": "v1", "Samantha": "v2"}, output, str(tmp_path / "art"), status_callback=lambda msg: None)
+
+        timeline = load_timeline(output)
+        assert get_timeline_path(output).endswith("out.timeline.json")
+        assert timeline["sample_rate"] == 44100
+        assert [(t["start_sample"], t["end_sample"]) for t in timeline["turns"]] == [(0, 2 * 1152), (2 * 1152, 5 * 1152)]
+
+    def test_disabled_by_default(self, tmp_path):
+        """Test that no sidecar is written unless enabled."""
+        with patch('generate_podcast._ffmpeg_convert_inline_audio_chunks'), \
+                patch.object(GeminiTTS, '_generate_pcm', return_value=([b"\x00\x00"], "audio/L16;rate=24000", "model")):
+            output = str(tmp_path / "out.mp3")
+            GeminiTTS(api_key="test_key", chunk_chars=10, timeline=False).synthesize("John: Hello", {"John": "Puck"}, output, status_callback=lambda msg: None)
+        assert load_timeline(output) is None
+
+    def test_disabled_synthesis_deletes_previous_sidecar(self, tmp_path):
+        """Test that a synthesis without a timeline does not leave the previous one next to the new audio."""
+        output = str(tmp_path / "out.mp3")
+        write_timeline(output, {"turns": [{"start": 0.0, "end": 1.0}]})
+        with patch('generate_podcast._ffmpeg_convert_inline_audio_chunks'), \
+                patch.object(GeminiTTS, '_generate_pcm', return_value=([b"\x00\x00"], "audio/L16;rate=24000", "model")):
+            GeminiTTS(api_key="test_key", chunk_chars=10, timeline=False).synthesize("John: Hello", {"John": "Puck"}, output, status_callback=lambda msg: None)
+        assert not Path(get_timeline_path(output)).exists()
+
+    @pytest.mark.parametrize("change", ["rewritten", "removed"])
+    def test_sidecar_of_other_audio_is_ignored(self, tmp_path, change):
+        """Test that the sidecar is ignored once its audio file is re-written or removed."""
+        audio = tmp_path / "out.mp3"
+        audio.write_bytes(b"first take")
+        write_timeline(str(audio), {"turns": [{"start": 0.0, "end": 1.0}]})
+        assert load_timeline(str(audio))["turns"] == [{"start": 0.0, "end": 1.0}]
+
+        if change == "rewritten":
+            audio.write_bytes(b"second, longer take")
+        else:
+            audio.unlink()
+        assert load_timeline(str(audio)) is None
+
+    def test_elevenlabs_timestamps_are_stored(self, tmp_path):
+        """Test that timestamped windows are shifted by the windows before them."""
+        def convert_with_timestamps(inputs):
+            text = " ".join(d["text"] for d in inputs)
+            return SimpleNamespace(
+                audio_base_64=base64.b64encode(mp3(len(text))).decode(),
+                alignment=SimpleNamespace(characters=list(text), character_start_times_seconds=[i * 0.01 for i in range(len(text))],
+                                          character_end_times_seconds=[i * 0.01 + 0.01 for i in range(len(text))]),
+                voice_segments=[SimpleNamespace(dialogue_input_index=0, start_time_seconds=0.0, end_time_seconds=0.5)],
+            )
+
+        with patch('generate_podcast.get_elevenlabs_client') as mock_elevenlabs, \
+                patch('generate_podcast._ffmpeg_concat_audio_segments') as mock_concat:
+            mock_elevenlabs.return_value.text_to_dialogue.convert_with_timestamps.side_effect = convert_with_timestamps
+            tts = ElevenLabsTTS(api_key="test_key", window_chars=5, timestamps=True)
+            output = str(tmp_path / "out.mp3")
+            tts.synthesize("John: Hello\nSamantha: Hi there", {"John": "v1", "Samantha": "v2"}, output, status_callback=lambda msg: None)
+
+        assert mock_concat.call_args[0][0] == [mp3(5), mp3(8)]
+        timeline = load_timeline(output)
+        offset = round(5 * 1152 / 44100, 3)
+        assert [w["word"] for w in timeline["words"]] == ["Hello", "Hi", "there"]
+        assert timeline["words"][1]["start"] == offset
+        assert [(t["start_sample"], t["end_sample"], t["estimated"]) for t in timeline["turns"]] == [(0, 5 * 1152, False), (5 * 1152, 13 * 1152, False)]
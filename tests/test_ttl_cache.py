@@ -0,0 +1,85 @@
+"""Tests for the TTL / single-flight cache used by /api/status and /api/voices."""
+import threading
+import time
+import pytest
+import sys
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from ttl_cache import TTLCache
+
+
+class TestTTLCache:
+    """Tests for TTLCache."""
+
+    def test_fresh_value_is_cached_and_refresh_reloads(self):
+        """Test that a fresh value is reused and refresh=True loads it again."""
+        cache = TTLCache(ttl=60)
+        calls = []
+        loader = lambda: calls.append(1) or len(calls)
+        assert cache.get("k", loader) == 1
+        assert cache.get("k", loader) == 1
+        assert cache.get("k", loader, refresh=True) == 2
+
+    def test_concurrent_misses_are_coalesced(self):
+        """Test that concurrent callers for a missing key trigger a single upstream call."""
+        cache = TTLCache(ttl=60)
+        calls = []
+        release = threading.Event()
+
+        def slow_loader():
+            calls.append(1)
+            release.wait(5)
+            return "voices"
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(cache.get("k", slow_loader))) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        time.sleep(0.1)
+        release.set()
+        for thread in threads:
+            thread.join(5)
+        assert results == ["voices"] * 5
+        assert len(calls) == 1
+
+    def test_stale_value_is_served_while_revalidating(self):
+        """Test that an expired value is returned immediately and refreshed in the background."""
+        cache = TTLCache(ttl=0.01, max_stale=60)
+        cache.get("k", lambda: "old")
+        time.sleep(0.02)
+        refreshed = threading.Event()
+
+        def loader():
+            refreshed.set()
+            return "new"
+
+        assert cache.get("k", loader) == "old"
+        assert refreshed.wait(5)
+        for _ in range(100):
+            if cache.get("k", loader) == "new":
+                break
+            time.sleep(0.01)
+        assert cache.get("k", loader) == "new"
+
+    def test_errors_fall_back_to_previous_value(self):
+        """Test that a failed refresh serves the previous value, and fails without one."""
+        cache = TTLCache(ttl=60)
+        cache.get("k", lambda: "cached")
+
+        def failing():
+            raise ConnectionError("upstream down")
+
+        assert cache.get("k", failing, refresh=True) == "cached"
+        with pytest.raises(ConnectionError):
+            cache.get("other", failing)
+
+    def test_uncacheable_values_are_not_stored(self):
+        """Test that values rejected by cacheable() are returned but loaded again next time."""
+        cache = TTLCache(ttl=60)
+        values = iter(["Network error", "Remaining: 5 / 10 characters"])
+        is_ok = lambda text: text != "Network error"
+        assert cache.get("k", lambda: next(values), cacheable=is_ok) == "Network error"
+        assert cache.get("k", lambda: next(values), cacheable=is_ok) == "Remaining: 5 / 10 characters"
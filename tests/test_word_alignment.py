@@ -0,0 +1,51 @@
+"""Tests for the banded script-to-ASR word alignment."""
+import random
+import sys
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from word_alignment import align_words
+
+
+def random_words(count, seed=0):
+    rng = random.Random(seed)
+    vocab = ["".join(rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(rng.randint(2, 9))) for _ in range(20000)]
+    return [rng.choice(vocab) for _ in range(count)]
+
+
+class TestAlignWords:
+    """Tests for align_words()."""
+
+    def test_identical_sequences(self):
+        """Test that identical sequences are paired word for word."""
+        words = ["hello", "world", "this", "is", "a", "test"]
+        assert align_words(words, words) == [0, 1, 2, 3, 4, 5]
+
+    def test_substitutions_and_prefix_matches(self):
+        """Test that a misrecognized word gets no match and a shared prefix counts as a match."""
+        assert align_words(["the", "colour", "of", "sky"], ["the", "color", "off", "sky"]) == [0, 1, -1, 3]
+
+    def test_empty_sequences(self):
+        """Test that missing words on either side leave every script word unmatched."""
+        assert align_words(["hello"], []) == [-1]
+        assert align_words([], ["hello"]) == []
+        assert align_words(["", "x"], ["", "x"]) == [-1, 1]
+
+    def test_long_asr_insertion_keeps_sync(self):
+        """Test that words the ASR inserted (music, ad) far beyond the band do not shift later matches."""
+        script = random_words(3000)
+        asr = script[:1000] + [f"noise{k}" for k in range(800)] + script[1000:]
+        mapping = align_words(script, asr, band=50)
+        assert mapping[:1000] == list(range(1000))
+        assert mapping[1000:] == list(range(1800, 3800))
+
+    def test_long_asr_deletion_keeps_sync(self):
+        """Test that script words missing from the transcription are skipped without losing later words."""
+        script = random_words(3000, seed=1)
+        asr = script[:1000] + script[1600:]
+        mapping = align_words(script, asr, band=50)
+        assert mapping[:1000] == list(range(1000))
+        assert mapping[1000:1600] == [-1] * 600
+        assert mapping[1600:] == list(range(1000, 2400))
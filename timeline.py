@@ -0,0 +1,205 @@
+import json
+import os
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+# The sidecar sits next to the audio file: episode.mp3 -> episode.timeline.json
+TIMELINE_SUFFIX = ".timeline.json"
+TIMELINE_VERSION = 1
+
+# MP3 frame header tables, indexed by the header's bitrate / sample rate bits
+_MP3_BITRATES_KBPS = {
+    (True, 1): (0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448),
+    (True, 2): (0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384),
+    (True, 3): (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320),
+    (False, 1): (0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256),
+    (False, 2): (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+    (False, 3): (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+}
+_MP3_SAMPLE_RATES = {3: (44100, 48000, 32000), 2: (22050, 24000, 16000), 0: (11025, 12000, 8000)}
+
+
+def get_timeline_path(audio_filepath: str) -> str:
+    return os.path.splitext(audio_filepath)[0] + TIMELINE_SUFFIX
+
+
+def _parse_mp3_header(data: bytes, pos: int) -> Optional[Tuple[int, int, int]]:
+    """Returns (frame length in bytes, samples per frame, sample rate) of the frame at pos, or None."""
+    if pos + 4 > len(data) or data[pos] != 0xFF or (data[pos + 1] & 0xE0) != 0xE0:
+        return None
+    version = (data[pos + 1] >> 3) & 0x03
+    layer = 4 - ((data[pos + 1] >> 1) & 0x03)
+    bitrate_index = data[pos + 2] >> 4
+    rate_index = (data[pos + 2] >> 2) & 0x03
+    if version == 1 or layer == 4 or bitrate_index in (0, 15) or rate_index == 3:
+        return None
+    mpeg1 = version == 3
+    bitrate = _MP3_BITRATES_KBPS[(mpeg1, layer)][bitrate_index] * 1000
+    sample_rate = _MP3_SAMPLE_RATES[version][rate_index]
+    padding = (data[pos + 2] >> 1) & 0x01
+    if layer == 1:
+        return (12 * bitrate // sample_rate + padding) * 4, 384, sample_rate
+    if layer == 2 or mpeg1:
+        return 144 * bitrate // sample_rate + padding, 1152, sample_rate
+    return 72 * bitrate // sample_rate + padding, 576, sample_rate
+
+
+def mp3_sample_count(data: bytes) -> Tuple[int, int]:
+    """
+    Counts the decoded samples of an MP3 file by walking its frame headers, without decoding.
+    Returns (samples, sample rate). ID3 tags and the Xing/Info header frame are skipped.
+    """
+    pos = 0
+    if data[:3] == b"ID3" and len(data) >= 10:
+        size = (data[6] << 21) | (data[7] << 14) | (data[8] << 7) | data[9]
+        pos = 10 + size + (10 if data[5] & 0x10 else 0)
+
+    samples = 0
+    sample_rate = 0
+    first_frame = True
+    while pos + 4 <= len(data):
+        header = _parse_mp3_header(data, pos)
+        if header is None:
+            # Not a frame header: resynchronize on the next sync word
+            pos = data.find(b"\xff", pos + 1)
+            if pos < 0:
+                break
+            continue
+        length, frame_samples, rate = header
+        if pos + length > len(data):
+            break
+        # The first frame of a VBR/LAME file only carries the Xing/Info header, not audio
+        if not (first_frame and any(tag in data[pos + 4:pos + 40] for tag in (b"Xing", b"Info", b"VBRI"))):
+            samples += frame_samples
+        sample_rate = sample_rate or rate
+        first_frame = False
+        pos += length
+    return samples, sample_rate
+
+
+def alignment_to_words(characters: Sequence[str], start_times: Sequence[float], end_times: Sequence[float]) -> List[Dict[str, Any]]:
+    """
+    Groups a provider's character-level alignment into timed words ({"word", "start", "end"}).
+    Characters inside [audio tags] are not spoken words and are skipped.
+    """
+    words: List[Dict[str, Any]] = []
+    current: List[str] = []
+    start = end = 0.0
+    tag_depth = 0
+
+    def flush():
+        if current:
+            words.append({"word": "".join(current), "start": round(start, 3), "end": round(end, 3)})
+            current.clear()
+
+    for char, char_start, char_end in zip(characters, start_times, end_times):
+        if char == "[":
+            flush()
+            tag_depth += 1
+        elif char == "]":
+            tag_depth = max(0, tag_depth - 1)
+        elif tag_depth or char.isspace():
+            flush()
+        else:
+            if not current:
+                start = char_start
+            current.append(char)
+            end = char_end
+    flush()
+    return words
+
+
+def split_at_turn_starts(turns: Sequence[Tuple[str, str]], samples: int, sample_rate: int, start_times: Dict[int, float]) -> List[Tuple[List[Tuple[str, str]], int]]:
+    """
+    Splits one piece of audio holding several turns into single-turn groups for build_timeline(),
+    using each turn's start time in seconds (keyed by its index in turns). Falls back to one
+    group for the whole piece when a turn's start time is missing.
+    """
+    if not sample_rate or any(index not in start_times for index in range(1, len(turns))):
+        return [(list(turns), samples)]
+    boundaries = [0]
+    for index in range(1, len(turns)):
+        boundaries.append(min(samples, max(boundaries[-1], round(start_times[index] * sample_rate))))
+    boundaries.append(samples)
+    return [([turn], boundaries[index + 1] - boundaries[index]) for index, turn in enumerate(turns)]
+
+
+def build_timeline(groups: Sequence[Tuple[Sequence[Tuple[str, str]], int]], sample_rate: int, words: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Any]:
+    """
+    Builds the turn timeline of an audio file made of consecutive pieces of audio.
+
+    Each group is (turns, samples): the (speaker, text) turns spoken in one piece of audio
+    (a turn, a chunk or a whole request) and that piece's length in samples. Offsets are exact
+    at group boundaries. Inside a group holding several turns they are estimated from each
+    turn's share of the group's characters, and those turns are flagged as estimated.
+    Word timings from the provider, if any, are stored as they are under "words".
+    """
+    turns: List[Dict[str, Any]] = []
+    offset = 0
+    for group_turns, samples in groups:
+        total_chars = sum(len(text) for _, text in group_turns) or 1
+        consumed_chars = 0
+        for speaker, text in group_turns:
+            start = offset + samples * consumed_chars // total_chars
+            consumed_chars += len(text)
+            end = offset + samples * consumed_chars // total_chars
+            turns.append({
+                "index": len(turns),
+                "speaker": speaker,
+                "text": text,
+                "start_sample": start,
+                "end_sample": end,
+                "start": round(start / sample_rate, 3) if sample_rate else 0.0,
+                "end": round(end / sample_rate, 3) if sample_rate else 0.0,
+                "estimated": len(group_turns) > 1,
+            })
+        offset += samples
+    timeline = {"version": TIMELINE_VERSION, "sample_rate": sample_rate, "total_samples": offset, "turns": turns}
+    if words is not None:
+        timeline["words"] = words
+    return timeline
+
+
+def audio_fingerprint(audio_filepath: str) -> Optional[Dict[str, int]]:
+    """Size and modification time of an audio file, or None if it does not exist."""
+    try:
+        stat = os.stat(audio_filepath)
+    except OSError:
+        return None
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def write_timeline(audio_filepath: str, timeline: Dict[str, Any]) -> str:
+    """
+    Writes the timeline sidecar of an audio file (replacing any previous one) and returns its path.
+    Call it once the audio file is final: the sidecar records the file's size and modification
+    time, and load_timeline() ignores it as soon as the audio changes.
+    """
+    path = get_timeline_path(audio_filepath)
+    timeline = dict(timeline, audio=os.path.basename(audio_filepath), audio_fingerprint=audio_fingerprint(audio_filepath))
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(timeline, f, indent=2, ensure_ascii=False)
+    os.replace(path + ".tmp", path)
+    return path
+
+
+def remove_timeline(audio_filepath: str) -> None:
+    """Deletes the timeline sidecar of an audio file, if any, so that it cannot describe newer audio."""
+    try:
+        os.remove(get_timeline_path(audio_filepath))
+    except FileNotFoundError:
+        pass
+
+
+def load_timeline(audio_filepath: str) -> Optional[Dict[str, Any]]:
+    """
+    Reads the timeline sidecar of an audio file. Returns None if there is none, or if it was
+    written for another version of the audio (the file was re-generated, edited or replaced).
+    """
+    try:
+        with open(get_timeline_path(audio_filepath), "r", encoding="utf-8") as f:
+            timeline = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+    if not isinstance(timeline, dict) or timeline.get("audio_fingerprint") != audio_fingerprint(audio_filepath):
+        return None
+    return timeline
@@ -4,16 +4,25 @@ Module for analyzing transcripts using Gemini API and generating DOCX documents.
 
 import os
 import re
+import threading
+import time
 from docx import Document
 from docx.shared import Pt, RGBColor
 from docx.enum.text import WD_ALIGN_PARAGRAPH
-import google.genai as genai
 from google.genai import types
 from generate_podcast import setup_logging
 from utils import get_asset_path
+from clients import get_gemini_client
 
 logger = setup_logging()
 
+# The prompt file location is probed at most every PROMPT_PATH_CACHE_TTL seconds,
+# and its content is re-read only when the file changes.
+PROMPT_PATH_CACHE_TTL = 30.0
+_prompt_cache_lock = threading.Lock()
+_prompt_path_cache = {}
+_prompt_content_cache = {}
+
 
 def get_analysis_prompt_path():
     """
@@ -22,16 +31,30 @@ def get_analysis_prompt_path():
     1. ./config/analysis_prompt.txt (for Docker and local config directory)
     2. app data directory (user-editable location)
     3. asset path (for bundled apps)
+    The result is memoized for PROMPT_PATH_CACHE_TTL seconds.
     """
     from utils import get_app_data_dir
 
+    key = (os.getcwd(), get_app_data_dir())
+    with _prompt_cache_lock:
+        cached = _prompt_path_cache.get(key)
+    if cached and time.monotonic() - cached[1] < PROMPT_PATH_CACHE_TTL:
+        return cached[0]
+
+    prompt_path = _find_analysis_prompt_path(*key)
+    with _prompt_cache_lock:
+        _prompt_path_cache[key] = (prompt_path, time.monotonic())
+    return prompt_path
+
+
+def _find_analysis_prompt_path(cwd, app_data_dir):
     # First check in config directory (Docker and local development)
-    config_dir_prompt = os.path.join(os.getcwd(), "config", "analysis_prompt.txt")
+    config_dir_prompt = os.path.join(cwd, "config", "analysis_prompt.txt")
     if os.path.exists(config_dir_prompt):
         return config_dir_prompt
 
     # Then check in app data directory (user-editable location)
-    app_data_prompt = os.path.join(get_app_data_dir(), "analysis_prompt.txt")
+    app_data_prompt = os.path.join(app_data_dir, "analysis_prompt.txt")
     if os.path.exists(app_data_prompt):
         return app_data_prompt
 
@@ -53,8 +76,16 @@ def load_analysis_prompt():
         return None
 
     try:
+        mtime = os.stat(prompt_path).st_mtime_ns
+        with _prompt_cache_lock:
+            cached = _prompt_content_cache.get(prompt_path)
+        if cached and cached[0] == mtime:
+            return cached[1]
         with open(prompt_path, 'r', encoding='utf-8') as f:
-            return f.read().strip()
+            prompt = f.read().strip()
+        with _prompt_cache_lock:
+            _prompt_content_cache[prompt_path] = (mtime, prompt)
+        return prompt
     except Exception as e:
         logger.error(f"Error reading analysis prompt file: {e}")
         return None
@@ -100,7 +131,7 @@ def analyze_transcript_with_gemini(transcript: str, api_key: str = None) -> str:
     model_name = os.environ.get("GEMINI_ANALYSIS_MODEL", "gemini-2.5-flash")
 
     try:
-        client = genai.Client(api_key=api_key)
+        client = get_gemini_client(api_key)
         prompt = generate_prompt(transcript)
 
         response = client.models.generate_content(
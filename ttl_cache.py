@@ -0,0 +1,93 @@
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, Hashable, Optional
+
+logger = logging.getLogger("PodcastGenerator")
+
+
+class _Entry:
+    def __init__(self, value: Any, loaded_at: float):
+        self.value = value
+        self.loaded_at = loaded_at
+
+
+class TTLCache:
+    """
+    In-process cache for slow upstream lookups, with request coalescing.
+
+    - A value younger than `ttl` is served from the cache.
+    - An older value, up to `ttl + max_stale`, is still served straight away while a single
+      background refresh loads a new one (stale-while-revalidate).
+    - A missing value, or a forced refresh, is loaded by one caller; concurrent callers for
+      the same key wait for that result instead of calling upstream too (single-flight).
+    - If a load fails and a previous value exists, the previous value is served.
+    """
+
+    def __init__(self, ttl: float, max_stale: float = 0.0):
+        self.ttl = ttl
+        self.max_stale = max_stale
+        self._entries: Dict[Hashable, _Entry] = {}
+        self._inflight: Dict[Hashable, threading.Event] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, loader: Callable[[], Any], refresh: bool = False, cacheable: Optional[Callable[[Any], bool]] = None) -> Any:
+        """
+        Returns the value for key, calling loader() when it must be (re)loaded.
+        Values for which cacheable(value) is False are returned but not stored.
+        """
+        while True:
+            with self._lock:
+                entry = self._entries.get(key)
+                age = time.monotonic() - entry.loaded_at if entry else None
+                if entry and not refresh:
+                    if age < self.ttl:
+                        return entry.value
+                    if age < self.ttl + self.max_stale:
+                        if key not in self._inflight:
+                            self._inflight[key] = threading.Event()
+                            threading.Thread(target=self._load, args=(key, loader, cacheable), daemon=True).start()
+                        return entry.value
+                inflight = self._inflight.get(key)
+                if inflight is None:
+                    self._inflight[key] = threading.Event()
+                    break
+            # Someone else is loading this key: wait for their result
+            inflight.wait()
+            refresh = False
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry and time.monotonic() - entry.loaded_at < self.ttl:
+                    return entry.value
+        return self._load(key, loader, cacheable, raise_errors=True)
+
+    def _load(self, key: Hashable, loader: Callable[[], Any], cacheable: Optional[Callable[[Any], bool]] = None, raise_errors: bool = False) -> Any:
+        try:
+            value = loader()
+            with self._lock:
+                if cacheable is None or cacheable(value):
+                    self._entries[key] = _Entry(value, time.monotonic())
+            return value
+        except Exception as e:
+            with self._lock:
+                entry = self._entries.get(key)
+            if entry:
+                logger.warning(f"Refreshing cached {key!r} failed, serving the previous value: {e}")
+                return entry.value
+            if raise_errors:
+                raise
+            logger.warning(f"Refreshing cached {key!r} failed: {e}")
+            return None
+        finally:
+            with self._lock:
+                event = self._inflight.pop(key, None)
+            if event:
+                event.set()
+
+    def invalidate(self, key: Optional[Hashable] = None) -> None:
+        """Forgets one key, or every key."""
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
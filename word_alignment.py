@@ -0,0 +1,165 @@
+from bisect import bisect_left
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+
+# Needleman-Wunsch scores. A substitution costs less than a deletion plus an insertion, so a
+# misrecognized word stays paired with its position; only real matches carry a timing over.
+MATCH_SCORE = 2.0
+PREFIX_MATCH_SCORE = 1.0
+MISMATCH_SCORE = -1.0
+GAP_SCORE = -1.0
+
+# Half-width of the band, in words, around a guide path drawn through anchors: word trigrams
+# that occur exactly once in both sequences. The band follows long ASR insertions or deletions
+# as long as they sit between anchors.
+DEFAULT_BAND = 200
+ANCHOR_LENGTH = 3
+PREFIX_LENGTH = 4
+
+
+def _encode(script_tokens: Sequence[str], asr_tokens: Sequence[str]) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Maps the tokens of both sequences to integer ids: one id per normalized word, and one per
+    prefix of PREFIX_LENGTH characters (the cheap fuzzy key: "colour"/"color", "alignment"/"aligned").
+    Empty tokens and prefixes of shorter words get an id that never matches the other side.
+    """
+    words: dict = {}
+    prefixes: dict = {}
+
+    def encode(tokens, no_match):
+        exact = np.array([words.setdefault(t, len(words)) if t else no_match for t in tokens], dtype=np.int64)
+        prefix = np.array([prefixes.setdefault(t[:PREFIX_LENGTH], len(prefixes)) if len(t) >= PREFIX_LENGTH else no_match for t in tokens], dtype=np.int64)
+        return exact, prefix
+
+    script_exact, script_prefix = encode(script_tokens, -1)
+    asr_exact, asr_prefix = encode(asr_tokens, -2)
+    return script_exact, script_prefix, asr_exact, asr_prefix
+
+
+def _unique_ngrams(ids: np.ndarray) -> Dict[tuple, int]:
+    """Returns the position of every ANCHOR_LENGTH-gram occurring exactly once in ids."""
+    positions: Dict[tuple, int] = {}
+    repeated = set()
+    values = ids.tolist()
+    for k in range(len(values) - ANCHOR_LENGTH + 1):
+        key = tuple(values[k:k + ANCHOR_LENGTH])
+        if key in positions:
+            repeated.add(key)
+        else:
+            positions[key] = k
+    for key in repeated:
+        del positions[key]
+    return positions
+
+
+def _guide_path(script_exact: np.ndarray, asr_exact: np.ndarray) -> np.ndarray:
+    """
+    Returns, for each DP row 0..n, the column the alignment path is expected to cross: a line
+    through the anchors kept in increasing order (longest increasing subsequence), joined to
+    (0, 0) and (n, m). Without anchors this is the diagonal.
+    """
+    n, m = len(script_exact), len(asr_exact)
+    asr_ngrams = _unique_ngrams(asr_exact)
+    pairs = sorted((i, asr_ngrams[key]) for key, i in _unique_ngrams(script_exact).items() if key in asr_ngrams)
+
+    # Longest increasing subsequence of the ASR positions (patience sorting)
+    tails: List[int] = []
+    tail_indices: List[int] = []
+    previous = [-1] * len(pairs)
+    for index, (_, j) in enumerate(pairs):
+        k = bisect_left(tails, j)
+        if k == len(tails):
+            tails.append(j)
+            tail_indices.append(index)
+        else:
+            tails[k] = j
+            tail_indices[k] = index
+        previous[index] = tail_indices[k - 1] if k else -1
+    anchors = []
+    index = tail_indices[-1] if tail_indices else -1
+    while index >= 0:
+        anchors.append(pairs[index])
+        index = previous[index]
+    anchors.reverse()
+
+    # An anchor pairs script words i..i+2 with ASR words j..j+2: the path goes through DP cells
+    # (i + 1, j + 1) to (i + 3, j + 3). Both ends are kept so the guide only bends between anchors.
+    rows, cols = [0], [0]
+    for i, j in anchors:
+        for offset in (1, ANCHOR_LENGTH):
+            if i + offset > rows[-1] and j + offset > cols[-1]:
+                rows.append(i + offset)
+                cols.append(j + offset)
+    # The path must end on the last cell, (n, m)
+    while rows[-1] >= n or cols[-1] >= m:
+        rows.pop()
+        cols.pop()
+    rows.append(n)
+    cols.append(m)
+    return np.rint(np.interp(np.arange(n + 1), rows, cols)).astype(np.int64)
+
+
+def align_words(script_tokens: Sequence[str], asr_tokens: Sequence[str], band: int = DEFAULT_BAND) -> List[int]:
+    """
+    Globally aligns two sequences of normalized words (Needleman-Wunsch restricted to a band
+    around the anchor guide path) and returns, for each script token, the index of the ASR token
+    it matches, or -1. Runs in O(n * band + m) time and memory.
+    """
+    n, m = len(script_tokens), len(asr_tokens)
+    mapping = [-1] * n
+    if not n or not m:
+        return mapping
+    band = max(1, band)
+    script_exact, script_prefix, asr_exact, asr_prefix = _encode(script_tokens, asr_tokens)
+
+    guide = _guide_path(script_exact, asr_exact)
+
+    # Row i holds the scores of the first i script words against ASR prefixes lo..hi
+    lo, hi = 0, min(m, guide[1] + band)
+    prev = GAP_SCORE * np.arange(lo, hi + 1, dtype=np.float64)
+    prev_lo, prev_hi = lo, hi
+    bounds = [(lo, hi)]
+    pointers = [np.full(hi - lo + 1, 2, dtype=np.int8)]  # 0 = diagonal, 1 = up, 2 = left
+
+    for i in range(1, n + 1):
+        # Spanning the band from the previous row's guide to the next row's keeps consecutive
+        # rows overlapping, and a long insertion fits in the row where the guide jumps over it
+        lo, hi = max(0, guide[i - 1] - band), min(m, guide[min(n, i + 1)] + band)
+        cols = np.arange(lo, hi + 1)
+
+        up = np.full(cols.size, -np.inf)
+        inside = (cols >= prev_lo) & (cols <= prev_hi)
+        up[inside] = prev[cols[inside] - prev_lo] + GAP_SCORE
+
+        diag = np.full(cols.size, -np.inf)
+        inside = (cols >= 1) & (cols - 1 >= prev_lo) & (cols - 1 <= prev_hi)
+        asr_index = cols[inside] - 1
+        scores = np.where(asr_exact[asr_index] == script_exact[i - 1], MATCH_SCORE,
+                          np.where(asr_prefix[asr_index] == script_prefix[i - 1], PREFIX_MATCH_SCORE, MISMATCH_SCORE))
+        diag[inside] = prev[asr_index - prev_lo] + scores
+
+        best = np.maximum(diag, up)
+        # Insertions along the row: H[j] = max(best[j], H[j-1] + gap), as one cumulative maximum
+        row = GAP_SCORE * cols + np.maximum.accumulate(best - GAP_SCORE * cols)
+        pointer = np.where(diag >= up, 0, 1).astype(np.int8)
+        pointer[row > best] = 2
+
+        pointers.append(pointer)
+        bounds.append((lo, hi))
+        prev, prev_lo, prev_hi = row, lo, hi
+
+    i, j = n, m
+    while i > 0 and j > 0:
+        lo, _ = bounds[i]
+        move = pointers[i][j - lo]
+        if move == 0:
+            if script_exact[i - 1] == asr_exact[j - 1] or script_prefix[i - 1] == asr_prefix[j - 1]:
+                mapping[i - 1] = j - 1
+            i -= 1
+            j -= 1
+        elif move == 1:
+            i -= 1
+        else:
+            j -= 1
+    return mapping